@@ -8,6 +8,9 @@ from langchain_mcp_adapters.client import MultiServerMCPClient
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain_groq import ChatGroq
 import tempfile
+import time
+import uuid
+from utils import intent_router
 
 load_dotenv()
 
@@ -44,6 +47,11 @@ SERVERS = {
     }
 }
 
+PAGES_PER_VIEW = 5
+# Tool calls of one chat turn run concurrently, at most TOOL_CONCURRENCY at a time
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", "4"))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "300"))
+
 # -------------------------------------------------
 # State Management
 # -------------------------------------------------
@@ -53,11 +61,19 @@ if "messages" not in st.session_state:
 # New: Store a list of resources instead of a single one
 if "resources" not in st.session_state:
     st.session_state.resources = [] 
-    # Structure: [{'id': 0, 'type': 'pdf', 'name': 'filename', 'data': path/json}, ...]
+    # Structure: [{'id': '<uuid>', 'type': 'pdf', 'name': 'filename', 'path'/'url': ..., 'metadata': json}, ...]
 
 if "active_resource_index" not in st.session_state:
     st.session_state.active_resource_index = None
 
+# Stable ID for this browser session: every tool call spawns a new server
+# process, so usage accounting and budgets are keyed on this instead.
+# Kept in the URL so a page reload resumes the session and its resources.
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+SERVERS["Analysis Tools"]["env"] = {"ANALYZER_SESSION": st.session_state.session_id}
+
 # -------------------------------------------------
 # Logic
 # -------------------------------------------------
@@ -96,7 +112,65 @@ async def call_specific_tool(tool_name: str, tool_args: dict):
     except Exception as e:
         return f"Connection Error: {str(e)}"
 
-async def run_chat_with_tools(user_input, context=None):
+def _parse_result(result) -> dict:
+    """Tool result as a dict ({"error": ...} if it is not JSON)."""
+    if isinstance(result, dict):
+        return result
+    try:
+        return json.loads(result)
+    except Exception:
+        return {"error": str(result)}
+
+def add_resource(resource: dict):
+    """Adds a resource to this session's list unless it is already there."""
+    if not any(r["id"] == resource["id"] for r in st.session_state.resources):
+        st.session_state.resources.append(resource)
+
+async def _run_tool_calls(tool_calls, named_tools, status):
+    """
+    Executes tool calls ({"name", "args"}) concurrently (bounded by
+    TOOL_CONCURRENCY, each limited to TOOL_TIMEOUT seconds), writes each
+    result to the status panel as soon as it finishes and returns the
+    formatted outputs in the original call order
+    """
+    semaphore = asyncio.Semaphore(max(1, TOOL_CONCURRENCY))
+
+    async def run_one(i, tc):
+        tool_name = tc["name"]
+        tool_args = tc.get("args", {})
+        if tool_name not in named_tools:
+            return i, f"❌ Tool '{tool_name}' not found"
+
+        async with semaphore:
+            status.write(f"▶️ Executing: **{tool_name}** with Args:**{tool_args}**")
+            started = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(named_tools[tool_name].ainvoke(tool_args), TOOL_TIMEOUT)
+                if isinstance(result, list) and len(result) > 0 and hasattr(result[0], 'get'):
+                    text_res = result[0].get('text', str(result))
+                elif hasattr(result, 'content'):
+                     text_res = result.content
+                else:
+                    text_res = str(result)
+            except asyncio.TimeoutError:
+                text_res = f"Tool Execution Error: {tool_name} timed out after {TOOL_TIMEOUT:.0f}s"
+            except Exception as tool_err:
+                text_res = f"Tool Execution Error: {tool_err}"
+            status.write(f"✔️ **{tool_name}** finished in {time.perf_counter() - started:.1f}s")
+        return i, f"### 🔧 {tool_name}\n\n{text_res}"
+
+    tool_outputs = [None] * len(tool_calls)
+    for finished in asyncio.as_completed([run_one(i, tc) for i, tc in enumerate(tool_calls)]):
+        i, output = await finished
+        tool_outputs[i] = output
+        if len(tool_calls) > 1:
+            # Partial results show up while slower tools are still running
+            # (st.status is an expander, so no nested expanders here)
+            preview = output if len(output) <= 800 else output[:800] + " …"
+            status.markdown(f"**Result {i + 1}/{len(tool_calls)}**\n\n{preview}")
+    return tool_outputs
+
+async def run_chat_with_tools(user_input, context=None, resource=None):
     """Run chat with intelligent tool selection"""
     status = st.status("⚙️ Processing your request...", expanded=True)
     
@@ -110,7 +184,20 @@ async def run_chat_with_tools(user_input, context=None):
         
         named_tools = {tool.name: tool for tool in tools}
         status.write(f"✅ Available Tools: {list(named_tools.keys())}")
-        
+
+        # Obvious requests are routed locally, skipping the routing LLM call
+        decision = intent_router.route(user_input, resource, available=set(named_tools))
+        if decision:
+            status.write(
+                f"🧭 Routed locally to **{decision['tool']}** "
+                f"({decision['intent']}, {decision['source']}, confidence {decision['confidence']})"
+            )
+            tool_outputs = await _run_tool_calls(
+                [{"name": decision["tool"], "args": decision["args"]}], named_tools, status
+            )
+            status.update(label="✅ Complete", state="complete", expanded=False)
+            return "\n\n---\n\n".join(tool_outputs)
+
         llm = get_llm_model()
         llm_with_tools = llm.bind_tools(tools)
         
@@ -122,7 +209,9 @@ async def run_chat_with_tools(user_input, context=None):
             "2. If user asks for SUMMARY, ONLY call 'youtube_summary' tool\n"
             "3. If user asks about PDF content or questions, call 'pdf_qa' tool\n"
             "4. If user asks to VIEW FULL CONTENT or a specific page content, call 'extract_pdf_text' tool\n"
-            "5. Always use the user's original input for tool arguments."
+            "5. If user asks a QUESTION about a YouTube video, call 'youtube_qa' tool\n"
+            "6. If user asks to summarize a PLAYLIST, a CHANNEL or SEVERAL videos, call 'youtube_batch_summary' tool once with all of them\n"
+            "7. Always use the user's original input for tool arguments."
         )
         # st.write(context)
         
@@ -138,33 +227,17 @@ async def run_chat_with_tools(user_input, context=None):
         
         status.write("🤔 AI is analyzing your request...")
         response = await llm_with_tools.ainvoke(messages)
+        intent_router.log_decision(user_input, resource, {
+            "outcome": "llm",
+            "tools": [tc["name"] for tc in getattr(response, "tool_calls", None) or []]
+        })
         
         if not getattr(response, "tool_calls", None):
             status.update(label="✅ Response Ready", state="complete", expanded=False)
             return response.content
         
-        tool_outputs = []
         status.write(f"🛠️ Calling {len(response.tool_calls)} tool(s)")
-        
-        for tc in response.tool_calls:
-            tool_name = tc["name"]
-            tool_args = tc.get("args", {})
-            status.write(f"▶️ Executing: **{tool_name}** with Args:**{tool_args}**")
-            
-            if tool_name in named_tools:
-                try:
-                    result = await named_tools[tool_name].ainvoke(tool_args)
-                    if isinstance(result, list) and len(result) > 0 and hasattr(result[0], 'get'):
-                        text_res = result[0].get('text', str(result))
-                    elif hasattr(result, 'content'):
-                         text_res = result.content
-                    else:
-                        text_res = str(result)
-                except Exception as tool_err:
-                    text_res = f"Tool Execution Error: {tool_err}"
-                tool_outputs.append(f"### 🔧 {tool_name}\n\n{text_res}")
-            else:
-                tool_outputs.append(f"❌ Tool '{tool_name}' not found")
+        tool_outputs = await _run_tool_calls(response.tool_calls, named_tools, status)
         
         status.update(label="✅ Complete", state="complete", expanded=False)
         return "\n\n---\n\n".join(tool_outputs)
@@ -173,6 +246,13 @@ async def run_chat_with_tools(user_input, context=None):
         status.update(label="❌ Critical Error", state="error", expanded=True)
         return f"⚠️ System Error: {str(e)}"
 
+# Restore this session's resources from the server-side registry (page reloads)
+if "resources_loaded" not in st.session_state:
+    restored = _parse_result(asyncio.run(call_specific_tool("list_resources", {})))
+    for r in reversed(restored.get("resources", [])):
+        add_resource(r)
+    st.session_state.resources_loaded = True
+
 # -------------------------------------------------
 # UI Layout
 # -------------------------------------------------
@@ -186,7 +266,7 @@ with st.sidebar:
     with st.expander("➕ Add New Resource", expanded=True):
         resource_type = st.selectbox(
             "Type",
-            ["📄 PDF Document", "🎥 YouTube Video", "🌐 Website URL"]
+            ["📄 PDF Document", "🎥 YouTube Video", "🌐 Website URL", "📚 Library"]
         )
         
         if resource_type == "📄 PDF Document":
@@ -197,8 +277,10 @@ with st.sidebar:
                     tmp_path = tmp_file.name
                 
                 with st.spinner("Processing PDF..."):
-                    # Call process_pdf tool to get JSON metadata
-                    result = asyncio.run(call_specific_tool("process_pdf", {"pdf_path": tmp_path}))
+                    # Call process_pdf tool to get JSON metadata (instant for a PDF anyone added before)
+                    result = asyncio.run(call_specific_tool("process_pdf", {
+                        "pdf_path": tmp_path, "background": True, "name": uploaded_file.name
+                    }))
                     
                     try:
                         if isinstance(result, dict):
@@ -208,20 +290,25 @@ with st.sidebar:
                         
                         if "error" not in result_data:
                             # Store the processed JSON and path
-                            st.session_state.resources.append({
-                                "id": len(st.session_state.resources),
+                            add_resource({
+                                "id": result_data.get("resource_id") or uuid.uuid4().hex,
                                 "type": "pdf",
                                 "name": uploaded_file.name,
-                                "path": tmp_path,
+                                "path": result_data.get("pdf_path", tmp_path),
                                 "metadata": result_data # Storing the JSON here
                             })
-                            st.success("PDF added to resources!")
+                            if result_data.get("reused"):
+                                st.success("PDF added! Already processed before, reusing it.")
+                            elif result_data.get("status") == "queued":
+                                st.success(f"PDF added! Ingestion running in background (job {result_data['job_id'][:8]}). You can keep chatting.")
+                            else:
+                                st.success("PDF added to resources!")
                         else:
                             st.error(result_data['error'])
                     except Exception as e:
                         # Fallback
                         st.session_state.resources.append({
-                            "id": len(st.session_state.resources),
+                            "id": uuid.uuid4().hex,
                             "type": "pdf",
                             "name": uploaded_file.name,
                             "path": tmp_path,
@@ -232,13 +319,18 @@ with st.sidebar:
         elif resource_type == "🎥 YouTube Video":
             video_url = st.text_input("Enter YouTube URL:")
             if video_url and st.button("Add Video", type="primary"):
-                st.session_state.resources.append({
-                    "id": len(st.session_state.resources),
+                with st.spinner("Fetching transcript..."):
+                    result_data = _parse_result(asyncio.run(call_specific_tool("add_youtube_resource", {"video_url": video_url})))
+                if "error" in result_data:
+                    st.warning(result_data["error"])
+                add_resource({
+                    "id": result_data.get("resource_id") or uuid.uuid4().hex,
                     "type": "youtube",
                     "name": f"Video ({video_url[:30]}...)",
-                    "url": video_url
+                    "url": video_url,
+                    "metadata": result_data
                 })
-                st.success("Video added to resources!")
+                st.success("Video added! Already known, reusing its transcript." if result_data.get("reused") else "Video added to resources!")
 
         elif resource_type == "🌐 Website URL":
             web_url = st.text_input("Enter Website URL:")
@@ -251,14 +343,38 @@ with st.sidebar:
                         result_data = json.loads(result)
 
                 st.write(result_data)
-                st.session_state.resources.append({
-                    "id": len(st.session_state.resources),
+                add_resource({
+                    "id": result_data.get("resource_id") or uuid.uuid4().hex,
                     "type": "website",
                     "name": f"Web ({web_url[:30]}...)",
                     "url": web_url,
                     "metadata":result_data
                 })
-                st.success("Website added to resources!")
+                st.success("Website added! Already known, reusing its content." if result_data.get("reused") else "Website added to resources!")
+
+        elif resource_type == "📚 Library":
+            # Resources added by any session; adding one resolves instantly on the server
+            if st.button("🔄 Load Library"):
+                st.session_state.library = _parse_result(
+                    asyncio.run(call_specific_tool("list_resources", {"all_sessions": True}))
+                ).get("resources", [])
+            library = st.session_state.get("library", [])
+            if library:
+                choice = st.selectbox("Known resources:", range(len(library)),
+                                      format_func=lambda i: f"{library[i]['type'].upper()}: {library[i]['name']}")
+                if st.button("Add Resource", type="primary"):
+                    item = library[choice]
+                    tool, args = {
+                        "pdf": ("process_pdf", {"pdf_path": item.get("path"), "background": True, "name": item["name"]}),
+                        "youtube": ("add_youtube_resource", {"video_url": item.get("url")}),
+                        "website": ("scrape_web_url", {"url": item.get("url")}),
+                    }[item["type"]]
+                    result_data = _parse_result(asyncio.run(call_specific_tool(tool, args)))
+                    if "error" in result_data:
+                        st.error(result_data["error"])
+                    else:
+                        add_resource({**item, "id": result_data.get("resource_id", item["id"]), "metadata": result_data})
+                        st.success(f"{item['name']} added to resources!")
 
     st.divider()
 
@@ -284,15 +400,61 @@ with st.sidebar:
         
         # PDF Specific Quick View Button
         if active_res['type'] == 'pdf':
+            # Paged viewer: only PAGES_PER_VIEW pages are transferred per click
+            viewer = st.session_state.setdefault("pdf_viewer", {})
             if st.button("📖 View Full Content"):
-                 res = asyncio.run(call_specific_tool("extract_pdf_text", {
-                        "pdf_path": active_res['path'], 
-                        "page_numbers": "all"
+                viewer[active_res['id']] = "1"
+            cursor = viewer.get(active_res['id'])
+            if cursor:
+                res = asyncio.run(call_specific_tool("read_pdf_pages", {
+                        "pdf_path": active_res['path'],
+                        "cursor": cursor,
+                        "page_limit": PAGES_PER_VIEW
                     }))
-                 st.text_area("Content", res, height=200)
+                try:
+                    page = res if isinstance(res, dict) else json.loads(res)
+                except Exception:
+                    page = {"content": str(res)}
+                if "error" in page:
+                    st.error(page["error"])
+                else:
+                    st.caption(f"Pages {page.get('first_page')}-{page.get('last_page')} of {page.get('page_count')}")
+                    st.text_area("Content", page["content"], height=200)
+                    col_prev, col_next = st.columns(2)
+                    if int(cursor) > 1 and col_prev.button("⬅️ Previous"):
+                        viewer[active_res['id']] = str(max(1, int(cursor) - PAGES_PER_VIEW))
+                        st.rerun()
+                    if page.get("next_cursor") and col_next.button("Next ➡️"):
+                        viewer[active_res['id']] = page["next_cursor"]
+                        st.rerun()
+
+            # Background ingestion progress
+            job_id = active_res.get('metadata', {}).get('job_id')
+            if job_id and active_res['metadata'].get('status') == "queued":
+                if st.button("🔄 Refresh Ingestion Status"):
+                    res = asyncio.run(call_specific_tool("ingestion_status", {"job_id": job_id}))
+                    try:
+                        job = res if isinstance(res, dict) else json.loads(res)
+                    except Exception:
+                        job = {"status": "unknown", "error": str(res)}
+                    if job.get("status") == "completed":
+                        # ingestion_status recorded the result in the resource registry;
+                        # mirror it in the session copy
+                        metadata = active_res['metadata']
+                        metadata.update(status="success", namespace=job["namespace"], chunk_count=job["chunk_count"])
+                        metadata["txt_path"] = metadata.get("txt_path") or job.get("txt_path")
+                        metadata.pop("job_id", None)
+                        st.success(f"Ingestion complete: {job['chunk_count']} chunks")
+                    elif job.get("status") == "failed":
+                        st.error(f"Ingestion failed: {job.get('error')}")
+                    else:
+                        st.info(f"{job.get('status')}: {job.get('chunks_done', 0)}/{job.get('chunks_total') or '?'} chunks")
 
 
     if st.button("🗑️ Clear All Resources"):
+        # Drop this session's references; the server deletes vectors no other session uses
+        for r in st.session_state.resources:
+            asyncio.run(call_specific_tool("release_resource", {"resource_id": r["id"]}))
         st.session_state.resources = []
         st.session_state.active_resource_index = None
         st.session_state.messages = []
@@ -321,16 +483,17 @@ if prompt := st.chat_input("Ask a question..."):
         res = st.session_state.resources[st.session_state.active_resource_index]
         
         if res['type'] == 'youtube':
-            context = f"Resource Type: YouTube Video\nURL: {res['url']}\nInstruction: Use tools to get transcript/summary for this URL."
+            context = f"Resource Type: YouTube Video\nURL: {res['url']}\nInstruction: Use tools to get transcript/summary or answer questions (youtube_qa) for this URL."
         elif res['type'] == 'website':
             context = f"Resource Type: Website\nURL: {res['metadata']}\nInstruction: Use web tools to analyze this URL."
         elif res['type'] == 'pdf':
             # Pass the path AND the stored JSON metadata
             context = f"Resource Type: PDF\nPath: {res['path']}\nMetadata (JSON): {res['metadata']}\nInstruction: Use pdf tools to answer user query"
     else:
+        res = None
         context = None # General chat
         
     with st.chat_message("assistant"):
-        response_text = asyncio.run(run_chat_with_tools(prompt, context))
+        response_text = asyncio.run(run_chat_with_tools(prompt, context, res))
         st.markdown(response_text)
         st.session_state.messages.append({"role": "assistant", "content": response_text})
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Runs server.py with Groq, Pinecone and YouTube replaced by the local fakes
+(benchmarks/fakes.py), so the MCP server can be driven over its real
+transport without API keys. Used by benchmarks/load_test.py.
+
+Usage:
+    python -m benchmarks.fake_server                      # stdio
+    MCP_TRANSPORT=http MCP_PORT=8765 python -m benchmarks.fake_server
+
+Environment:
+    FAKE_LATENCY_SCALE        multiplier for the injected latency (default 1)
+    FAKE_TRANSCRIPT_MINUTES   length of the synthetic transcript returned for any video (default 10)
+    RATE_LIMITS               defaults to "off"; set it to load-test the rate-limit scheduler
+"""
+
+import os
+
+from benchmarks import fakes
+
+
+def main():
+    fakes.LATENCY_SCALE = float(os.getenv("FAKE_LATENCY_SCALE", "1"))
+    fakes.AUTO_TRANSCRIPT_MINUTES = int(os.getenv("FAKE_TRANSCRIPT_MINUTES", "10"))
+    os.environ.setdefault("RATE_LIMITS", "off")
+
+    import server
+    with fakes.installed():
+        server.main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Deterministic local stand-ins for the Groq, Pinecone and YouTube clients.
+
+Each fake mimics only the calls this repo makes and sleeps for a
+configurable latency (seconds, scaled by LATENCY_SCALE) so benchmarks
+include realistic network wait without any network access:
+
+    llm_ttft          before the first streamed token
+    llm_tokens_per_s  generation speed after the first token
+    embed             per pinecone.inference.embed call
+    embed_per_input   extra per embedded text
+    upsert            per Index.upsert call
+    vector_query      per Index.query call
+    transcript        per transcript fetch
+
+Vectors live in a process-wide store, so separate `Pinecone()` instances
+(ingestion, then Q&A) see the same data, as with the real service.
+"""
+
+import hashlib
+import importlib
+import math
+import re
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+LATENCY = {
+    "llm_ttft": 0.25,
+    "llm_tokens_per_s": 400.0,
+    "embed": 0.08,
+    "embed_per_input": 0.002,
+    "upsert": 0.05,
+    "vector_query": 0.03,
+    "transcript": 0.15,
+}
+LATENCY_SCALE = 1.0
+AUTO_TRANSCRIPT_MINUTES = 0     # > 0: unknown video IDs get a synthetic transcript of this length
+COMPLETION_WORDS = 150
+CHARS_PER_TOKEN = 4
+
+# Where the real clients are looked up: (module, attribute, fake)
+PATCH_TARGETS = (
+    ("utils.llm_call", "Groq", "FakeGroq"),
+    ("services.qa", "Pinecone", "FakePinecone"),
+    ("services.pdf.pdf_ingestion", "Pinecone", "FakePinecone"),
+    ("services.pdf.bulk_ingestion", "Pinecone", "FakePinecone"),
+    ("services.youtube_ingestion", "Pinecone", "FakePinecone"),
+    ("services.namespaces", "Pinecone", "FakePinecone"),
+    ("services.transcripts", "YouTubeTranscriptApi", "FakeYouTubeTranscriptApi"),
+)
+
+_TOKEN = re.compile(r"\w+")
+_store_lock = threading.Lock()
+_indexes = {}       # index name -> namespace -> id -> (values, metadata)
+TRANSCRIPTS = {}    # video id -> list of {"text", "start", "duration"}
+
+
+def _wait(seconds: float) -> None:
+    seconds *= LATENCY_SCALE
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def reset() -> None:
+    """Drops all stored vectors and registered transcripts."""
+    with _store_lock:
+        _indexes.clear()
+    TRANSCRIPTS.clear()
+
+
+# --------------------------------------------------
+# Groq
+# --------------------------------------------------
+
+class _Completions:
+    def create(self, model, messages, stream=False, **kwargs):
+        prompt = messages[-1]["content"]
+        words = _completion(prompt)
+        prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+        completion_tokens = max(1, len(" ".join(words)) // CHARS_PER_TOKEN)
+        usage = SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                                total_tokens=prompt_tokens + completion_tokens)
+
+        if not stream:
+            _wait(LATENCY["llm_ttft"] + completion_tokens / LATENCY["llm_tokens_per_s"])
+            message = SimpleNamespace(content=" ".join(words))
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+        return self._stream(words, usage)
+
+    def _stream(self, words, usage):
+        _wait(LATENCY["llm_ttft"])
+        per_word = usage.completion_tokens / len(words) / LATENCY["llm_tokens_per_s"]
+        for i in range(0, len(words), 16):
+            batch = words[i:i + 16]
+            if i:
+                _wait(per_word * len(batch))
+            text = " ".join(batch) + " "
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], x_groq=None)
+        yield SimpleNamespace(choices=[], x_groq=SimpleNamespace(usage=usage))
+
+
+def _completion(prompt: str) -> list[str]:
+    """Same prompt, same answer: words drawn from the prompt by its hash."""
+    tokens = _TOKEN.findall(prompt) or ["empty"]
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+    return [tokens[(seed + i * 7919) % len(tokens)] for i in range(COMPLETION_WORDS)]
+
+
+class FakeGroq:
+    def __init__(self, api_key=None, **kwargs):
+        self.chat = SimpleNamespace(completions=_Completions())
+
+
+# --------------------------------------------------
+# Pinecone
+# --------------------------------------------------
+
+class _Embeddings(list):
+    """List of {"values": [...]} with a `usage` attribute, like EmbeddingsList."""
+
+    def __init__(self, items, total_tokens):
+        super().__init__(items)
+        self.usage = {"total_tokens": total_tokens}
+
+
+def embed_text(text: str, dimension: int) -> list[float]:
+    """Hashed bag of words, L2-normalised: similar texts get similar vectors."""
+    values = [0.0] * dimension
+    for token in _TOKEN.findall(text.lower()):
+        h = zlib.crc32(token.encode("utf-8"))
+        values[h % dimension] += 1.0 if h & 1 << 31 else -1.0
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class _Inference:
+    def __init__(self, dimension):
+        self.dimension = dimension
+
+    def embed(self, model, inputs, parameters=None):
+        _wait(LATENCY["embed"] + LATENCY["embed_per_input"] * len(inputs))
+        tokens = sum(len(text) // CHARS_PER_TOKEN for text in inputs)
+        return _Embeddings([{"values": embed_text(text, self.dimension)} for text in inputs], tokens)
+
+
+class FakeIndex:
+    def __init__(self, name):
+        self.name = name
+
+    def upsert(self, vectors, namespace=""):
+        _wait(LATENCY["upsert"])
+        with _store_lock:
+            ns = _indexes.setdefault(self.name, {}).setdefault(namespace, {})
+            for v in vectors:
+                ns[v["id"]] = (v["values"], v.get("metadata", {}))
+        return {"upserted_count": len(vectors)}
+
+    def query(self, vector, top_k=10, namespace="", include_metadata=False, **kwargs):
+        _wait(LATENCY["vector_query"])
+        with _store_lock:
+            items = list(_indexes.get(self.name, {}).get(namespace, {}).items())
+        scored = sorted(
+            ((sum(a * b for a, b in zip(vector, values)), vid, meta) for vid, (values, meta) in items),
+            key=lambda item: item[0],
+            reverse=True
+        )[:top_k]
+        return {
+            "matches": [
+                {"id": vid, "score": score, **({"metadata": meta} if include_metadata else {})}
+                for score, vid, meta in scored
+            ],
+            "namespace": namespace
+        }
+
+    def delete(self, ids=None, delete_all=False, namespace=""):
+        with _store_lock:
+            ns = _indexes.get(self.name, {}).get(namespace, {})
+            if delete_all:
+                ns.clear()
+            for vid in ids or ():
+                ns.pop(vid, None)
+
+    def describe_index_stats(self):
+        with _store_lock:
+            namespaces = {ns: {"vector_count": len(v)} for ns, v in _indexes.get(self.name, {}).items()}
+        return {"namespaces": namespaces, "total_vector_count": sum(n["vector_count"] for n in namespaces.values())}
+
+
+class _IndexList(list):
+    def names(self):
+        return list(self)
+
+
+class FakePinecone:
+    DIMENSION = 1024
+
+    def __init__(self, api_key=None, **kwargs):
+        self.inference = _Inference(self.DIMENSION)
+
+    def list_indexes(self):
+        with _store_lock:
+            return _IndexList(_indexes)
+
+    def create_index(self, name, dimension=None, metric=None, spec=None, **kwargs):
+        with _store_lock:
+            _indexes.setdefault(name, {})
+
+    def describe_index(self, name):
+        return SimpleNamespace(status={"ready": True})
+
+    def Index(self, name):
+        return FakeIndex(name)
+
+
+# --------------------------------------------------
+# YouTube
+# --------------------------------------------------
+
+class FakeYouTubeTranscriptApi:
+    def fetch(self, video_id, languages=("en",)):
+        _wait(LATENCY["transcript"])
+        if video_id not in TRANSCRIPTS and AUTO_TRANSCRIPT_MINUTES:
+            from benchmarks.synthetic import make_transcript
+            TRANSCRIPTS[video_id] = make_transcript(video_id, AUTO_TRANSCRIPT_MINUTES)
+        if video_id not in TRANSCRIPTS:
+            raise ValueError(f"No transcript registered for {video_id}")
+        return [SimpleNamespace(**segment) for segment in TRANSCRIPTS[video_id]]
+
+
+@contextmanager
+def installed():
+    """Replaces the real clients in every module that uses them, then restores them."""
+    saved = []
+    try:
+        for module_name, attr, fake in PATCH_TARGETS:
+            module = importlib.import_module(module_name)
+            saved.append((module, attr, getattr(module, attr)))
+            setattr(module, attr, globals()[fake])
+        yield
+    finally:
+        for module, attr, original in reversed(saved):
+            setattr(module, attr, original)
@@ -0,0 +1,80 @@
+"""
+Benchmark the HTML-to-text engines in services/web/extractors.py.
+
+Runs every engine over the saved pages in benchmarks/fixtures/html (or a
+directory passed with --fixtures), reports throughput in MB/s and checks
+output parity against the "bs4" baseline.
+
+Usage:
+    python -m benchmarks.html_extraction
+    python -m benchmarks.html_extraction --fixtures ./saved_pages --repeat 20
+"""
+
+import argparse
+import difflib
+import time
+from pathlib import Path
+
+from services.web.extractors import ENGINES
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+BASELINE = "bs4"
+
+
+def run(fixtures_dir: Path, repeat: int) -> dict:
+    pages = {p.name: p.read_bytes() for p in sorted(fixtures_dir.glob("*.htm*"))}
+    if not pages:
+        raise SystemExit(f"No HTML fixtures found in {fixtures_dir}")
+    total_bytes = sum(len(b) for b in pages.values()) * repeat
+
+    outputs = {}
+    results = {}
+    for name, engine in ENGINES.items():
+        outputs[name] = {page: engine(html) for page, html in pages.items()}   # warm-up + parity
+
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for html in pages.values():
+                engine(html)
+        elapsed = time.perf_counter() - started
+
+        results[name] = {
+            "seconds": round(elapsed, 4),
+            "mb_per_s": round(total_bytes / (1024 * 1024) / elapsed, 2)
+        }
+
+    for name in ENGINES:
+        identical = 0
+        similarity = []
+        for page in pages:
+            base_title, base_text = outputs[BASELINE][page]
+            title, text = outputs[name][page]
+            if (title, text) == (base_title, base_text):
+                identical += 1
+            similarity.append(difflib.SequenceMatcher(None, base_text.splitlines(), text.splitlines()).ratio())
+        results[name]["identical_pages"] = f"{identical}/{len(pages)}"
+        results[name]["min_similarity"] = round(min(similarity), 4)
+
+    return {"pages": len(pages), "bytes_per_pass": total_bytes // repeat, "repeat": repeat, "engines": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTML extraction engines")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR, help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=10, help="Passes over the corpus per engine")
+    args = parser.parse_args()
+
+    report = run(args.fixtures, args.repeat)
+    print(f"{report['pages']} pages, {report['bytes_per_pass'] / 1024:.1f} KB per pass, {report['repeat']} passes\n")
+    print(f"{'engine':<8} {'MB/s':>8} {'seconds':>9} {'identical':>10} {'min sim':>8}")
+    for name, r in report["engines"].items():
+        print(f"{name:<8} {r['mb_per_s']:>8} {r['seconds']:>9} {r['identical_pages']:>10} {r['min_similarity']:>8}")
+
+    baseline = report["engines"][BASELINE]["mb_per_s"]
+    for name, r in report["engines"].items():
+        if name != BASELINE:
+            print(f"\n{name} is {r['mb_per_s'] / baseline:.1f}x {BASELINE}")
+
+
+if __name__ == "__main__":
+    main()
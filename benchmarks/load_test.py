@@ -0,0 +1,389 @@
+"""
+Concurrent load test that drives the MCP server over its real transport.
+
+Opens N client sessions and replays a weighted mix of tool calls at a target
+rate (open loop: calls are started on schedule whether or not earlier ones
+have finished), then reports per-tool latency distributions, errors and
+queue depth.
+
+Transports:
+    stdio  one server process per session, as the Streamlit app connects
+    http   one long-lived server process (MCP_TRANSPORT=http) shared by all
+           sessions; shows how many concurrent users a single process
+           sustains and whether blocking work stalls its event loop
+
+Backends:
+    fake   benchmarks.fake_server: Groq, Pinecone and YouTube are local fakes
+           (FAKE_LATENCY_SCALE via --latency-scale), inputs are synthetic
+    live   server.py with the real services (needs API keys)
+
+Queue depth is sampled every --sample-interval seconds: calls outstanding
+on the client side, and, from a monitor session calling `get_metrics`, the
+server's in-flight tool calls and background job queue. The monitor call's
+own latency is reported as "probe": with the http transport it rises when
+tools block the server's event loop.
+
+Usage:
+    python -m benchmarks.load_test --sessions 8 --rate 4 --duration 30
+    python -m benchmarks.load_test --transport http --mix pdf_qa=5,scrape_web_url=2
+    python -m benchmarks.load_test --backend live --pdf ./doc.pdf --video-url https://youtu.be/...
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from datetime import datetime
+from pathlib import Path
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+
+try:
+    from mcp.client.streamable_http import streamable_http_client
+except ImportError:     # older mcp releases
+    from mcp.client.streamable_http import streamablehttp_client as streamable_http_client
+
+from benchmarks import synthetic
+from benchmarks.offline import git_commit, percentile, serve_site
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+TOOLS = ("process_pdf", "pdf_qa", "youtube_summary", "scrape_web_url")
+DEFAULT_MIX = "process_pdf=1,pdf_qa=4,youtube_summary=1,scrape_web_url=2"
+QUESTIONS = [f"What does section {i} say about {topic}?" for i, topic in enumerate(synthetic.TOPICS, 1)]
+
+
+def _parse_mix(value: str) -> dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in TOOLS:
+            raise argparse.ArgumentTypeError(f"Unknown tool in mix: {name} (choose from {', '.join(TOOLS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _result_text(result) -> str:
+    return "".join(getattr(c, "text", "") for c in getattr(result, "content", None) or [])
+
+
+def _is_error(result) -> bool:
+    if getattr(result, "isError", False):
+        return True
+    text = _result_text(result).lstrip()
+    if text.startswith("Error"):
+        return True
+    if text.startswith("{"):
+        try:
+            return "error" in json.loads(text)
+        except ValueError:
+            return False
+    return False
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.latencies = {tool: [] for tool in args.mix}
+        self.errors = {tool: 0 for tool in args.mix}
+        self.error_samples = {}
+        self.timeouts = {tool: 0 for tool in args.mix}
+        self.outstanding = 0
+        self.queue_samples = []
+        self.probe_latencies = []
+        self.inputs = {}
+
+    # ---------------- server / sessions ----------------
+
+    def _server_command(self) -> list[str]:
+        if self.args.backend == "fake":
+            return [sys.executable, "-m", "benchmarks.fake_server"]
+        return [sys.executable, str(PROJECT_ROOT / "server.py")]
+
+    def _server_env(self, state_dir: str, **extra) -> dict:
+        return {
+            **os.environ,
+            "ANALYZER_STATE_DIR": state_dir,
+            "ANALYZER_SESSION": "load_test",
+            "FAKE_LATENCY_SCALE": str(self.args.latency_scale),
+            "PYTHONPATH": str(PROJECT_ROOT),
+            **extra
+        }
+
+    async def _open_session(self, stack: AsyncExitStack, state_dir: str, url: str | None) -> ClientSession:
+        if url:
+            streams = await stack.enter_async_context(streamable_http_client(url))
+        else:
+            params = StdioServerParameters(
+                command=self._server_command()[0],
+                args=self._server_command()[1:],
+                env=self._server_env(state_dir),
+                cwd=str(PROJECT_ROOT)
+            )
+            streams = await stack.enter_async_context(stdio_client(params, errlog=self.server_log))
+        session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+        await session.initialize()
+        return session
+
+    async def _start_http_server(self, state_dir: str) -> tuple[subprocess.Popen, str]:
+        port = _free_port()
+        proc = subprocess.Popen(
+            self._server_command(),
+            env=self._server_env(state_dir, MCP_TRANSPORT="http", MCP_PORT=str(port)),
+            cwd=str(PROJECT_ROOT),
+            stdout=self.server_log,
+            stderr=self.server_log
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Server exited with code {proc.returncode} (see {self.server_log.name})")
+            try:
+                with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                    return proc, f"http://127.0.0.1:{port}/mcp"
+            except OSError:
+                await asyncio.sleep(0.2)
+        proc.kill()
+        raise RuntimeError("Server did not start listening within 30s")
+
+    # ---------------- inputs ----------------
+
+    async def _prepare_inputs(self, session: ClientSession, workdir: Path) -> None:
+        args = self.args
+        pdf = args.pdf or str(synthetic.make_pdf(workdir / "load_test.pdf", args.pdf_pages))
+        self.inputs["pdf_path"] = pdf
+
+        if "pdf_qa" in args.mix:
+            # One real process_pdf up front gives pdf_qa the metadata it needs
+            result = await session.call_tool("process_pdf", {"pdf_path": pdf})
+            if _is_error(result):
+                raise RuntimeError(f"Could not prepare pdf_qa input: {_result_text(result)[:300]}")
+            self.inputs["pdf_info"] = getattr(result, "structuredContent", None) or json.loads(_result_text(result))
+
+        self.inputs["video_urls"] = args.video_url or [
+            f"https://www.youtube.com/watch?v=loadtest{i:03d}" for i in range(8)
+        ]
+
+        if args.url:
+            self.inputs["urls"] = args.url
+        elif "scrape_web_url" in args.mix:
+            site = synthetic.make_site(args.site_pages)
+            self.httpd = serve_site(site, args.http_latency * args.latency_scale)
+            base = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+            self.inputs["urls"] = [f"{base}{path}" for path in site if path != "/"]
+
+    def _arguments(self, tool: str) -> dict:
+        if tool == "process_pdf":
+            return {"pdf_path": self.inputs["pdf_path"]}
+        if tool == "pdf_qa":
+            return {"pdf_info": self.inputs["pdf_info"], "question": self.rng.choice(QUESTIONS)}
+        if tool == "youtube_summary":
+            return {"video_url": self.rng.choice(self.inputs["video_urls"])}
+        return {"url": self.rng.choice(self.inputs["urls"])}
+
+    # ---------------- load ----------------
+
+    async def _call(self, session: ClientSession, tool: str) -> None:
+        self.outstanding += 1
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(session.call_tool(tool, self._arguments(tool)), self.args.timeout)
+            if _is_error(result):
+                self.errors[tool] += 1
+                self.error_samples.setdefault(tool, _result_text(result)[:300])
+        except asyncio.TimeoutError:
+            self.timeouts[tool] += 1
+        except Exception as e:
+            self.errors[tool] += 1
+            self.error_samples.setdefault(tool, f"{type(e).__name__}: {e}"[:300])
+        finally:
+            self.latencies[tool].append(time.perf_counter() - started)
+            self.outstanding -= 1
+
+    async def _generate(self, sessions: list[ClientSession]) -> float:
+        loop = asyncio.get_running_loop()
+        tools, weights = zip(*self.args.mix.items())
+        tasks = []
+        started = loop.time()
+        next_at = started
+        end = started + self.args.duration
+        while next_at < end:
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            tool = self.rng.choices(tools, weights)[0]
+            session = sessions[len(tasks) % len(sessions)]
+            tasks.append(asyncio.create_task(self._call(session, tool)))
+            gap = self.rng.expovariate(self.args.rate) if self.args.poisson else 1 / self.args.rate
+            next_at += gap
+        await asyncio.gather(*tasks)
+        return loop.time() - started
+
+    async def _monitor(self, session: ClientSession, stop: asyncio.Event) -> None:
+        started = time.perf_counter()
+        while not stop.is_set():
+            probe_started = time.perf_counter()
+            sample = {"t": round(probe_started - started, 2), "client_outstanding": self.outstanding}
+            try:
+                result = await asyncio.wait_for(session.call_tool("get_metrics", {"format": "json"}), self.args.timeout)
+                self.probe_latencies.append(time.perf_counter() - probe_started)
+                snapshot = getattr(result, "structuredContent", None) or json.loads(_result_text(result))
+                # The probe itself is one of the in-flight calls
+                sample["server_in_flight"] = max(0, snapshot.get("gauges", {}).get("tool_calls_in_flight", 1) - 1)
+                sample["jobs"] = snapshot.get("jobs", {})
+            except Exception as e:
+                sample["error"] = f"{type(e).__name__}: {e}"[:200]
+            self.queue_samples.append(sample)
+            try:
+                await asyncio.wait_for(stop.wait(), self.args.sample_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run(self) -> dict:
+        args = self.args
+        workdir = Path(tempfile.mkdtemp(prefix="analyzer_load_"))
+        state_dir = str(workdir / "state")
+        self.server_log = open(workdir / "server.log", "w")
+        self.httpd = None
+        proc = None
+
+        try:
+            async with AsyncExitStack() as stack:
+                url = None
+                if args.transport == "http":
+                    proc, url = await self._start_http_server(state_dir)
+
+                opened = time.perf_counter()
+                # Sequential: anyio transports must be closed by the task that opened them
+                sessions = [await self._open_session(stack, state_dir, url) for _ in range(args.sessions)]
+                connect_s = time.perf_counter() - opened
+                monitor_session = await self._open_session(stack, state_dir, url)
+
+                await self._prepare_inputs(sessions[0], workdir)
+
+                stop = asyncio.Event()
+                monitor = asyncio.create_task(self._monitor(monitor_session, stop))
+                elapsed = await self._generate(sessions)
+                stop.set()
+                await monitor
+
+            return self._report(elapsed, connect_s, workdir)
+        finally:
+            if self.httpd:
+                self.httpd.shutdown()
+            if proc:
+                proc.terminate()
+                proc.wait(timeout=10)
+            self.server_log.close()
+
+    # ---------------- report ----------------
+
+    def _report(self, elapsed: float, connect_s: float, workdir: Path) -> dict:
+        def dist(samples):
+            return {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(samples, 0.99) * 1000, 2),
+                "max_ms": round(max(samples) * 1000, 2) if samples else 0.0
+            }
+
+        tools = {}
+        for tool, samples in self.latencies.items():
+            tools[tool] = {**dist(samples), "errors": self.errors[tool], "timeouts": self.timeouts[tool]}
+            if tool in self.error_samples:
+                tools[tool]["first_error"] = self.error_samples[tool]
+
+        depth = [s["client_outstanding"] for s in self.queue_samples]
+        in_flight = [s["server_in_flight"] for s in self.queue_samples if "server_in_flight" in s]
+        completed = sum(len(s) for s in self.latencies.values())
+        failed = sum(self.errors.values()) + sum(self.timeouts.values())
+
+        return {
+            **git_commit(),
+            "timestamp": datetime.now().isoformat(),
+            "config": {k: v for k, v in vars(self.args).items() if k != "output"},
+            "connect_s": round(connect_s, 2),
+            "elapsed_s": round(elapsed, 2),
+            "calls": completed,
+            "failed": failed,
+            "achieved_rate": round(completed / elapsed, 2) if elapsed else 0.0,
+            "success_rate": round((completed - failed) / elapsed, 2) if elapsed else 0.0,
+            "tools": tools,
+            "probe": dist(self.probe_latencies),
+            "queue_depth": {
+                "client_max": max(depth, default=0),
+                "client_mean": round(sum(depth) / len(depth), 2) if depth else 0.0,
+                "server_in_flight_max": max(in_flight, default=0),
+                "samples": self.queue_samples
+            },
+            "server_log": str(workdir / "server.log")
+        }
+
+
+def print_report(report: dict) -> None:
+    cfg = report["config"]
+    print(f"commit {report['commit']}{' (dirty)' if report['dirty'] else ''}: {cfg['sessions']} sessions over "
+          f"{cfg['transport']} ({cfg['backend']} backend), target {cfg['rate']}/s for {cfg['duration']}s")
+    print(f"connected in {report['connect_s']}s; {report['calls']} calls in {report['elapsed_s']}s = "
+          f"{report['achieved_rate']}/s ({report['success_rate']}/s successful)\n")
+    print(f"{'tool':<18} {'n':>5} {'err':>4} {'t/o':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for tool, r in {**report["tools"], "probe (get_metrics)": {**report["probe"], "errors": 0, "timeouts": 0}}.items():
+        print(f"{tool:<18} {r['count']:>5} {r['errors']:>4} {r['timeouts']:>4} "
+              f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9}")
+    q = report["queue_depth"]
+    print(f"\nqueue depth: client outstanding max {q['client_max']} (mean {q['client_mean']}), "
+          f"server in-flight max {q['server_in_flight_max']}")
+    for tool, r in report["tools"].items():
+        if r.get("first_error"):
+            print(f"first {tool} error: {r['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent MCP load test")
+    parser.add_argument("--sessions", type=int, default=4, help="Concurrent client sessions")
+    parser.add_argument("--rate", type=float, default=2.0, help="Target tool calls per second (all sessions)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix(DEFAULT_MIX), help=f"Tool weights, e.g. {DEFAULT_MIX}")
+    parser.add_argument("--poisson", action="store_true", help="Exponential inter-arrival times instead of a fixed interval")
+    parser.add_argument("--transport", choices=("stdio", "http"), default="stdio")
+    parser.add_argument("--backend", choices=("fake", "live"), default="fake")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Injected latency multiplier (fake backend)")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="Latency of the local test site (seconds)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-call timeout in seconds")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Seconds between queue-depth samples")
+    parser.add_argument("--pdf", help="PDF for process_pdf / pdf_qa (default: synthetic)")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages of the synthetic PDF")
+    parser.add_argument("--video-url", action="append", help="Video URL for youtube_summary (repeatable)")
+    parser.add_argument("--url", action="append", help="URL for scrape_web_url (repeatable, default: local test site)")
+    parser.add_argument("--site-pages", type=int, default=20, help="Pages of the local test site")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Write the JSON report here")
+    args = parser.parse_args()
+
+    if sys.platform.startswith("win"):
+        asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+    report = asyncio.run(LoadTest(args).run())
+    print_report(report)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, default=str), encoding="utf-8")
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
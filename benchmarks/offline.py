@@ -0,0 +1,398 @@
+"""
+Offline end-to-end benchmark of the MCP tools.
+
+Runs the real tool functions from server.py against synthetic inputs
+(benchmarks/synthetic.py) with Groq, Pinecone and YouTube replaced by the
+deterministic fakes in benchmarks/fakes.py, and web pages served by a local
+HTTP server. No API keys or network access are needed.
+
+Scenarios:
+    ingestion      process_pdf on PDFs of --pages sizes (simple/local/vector)
+    qa             pdf_qa against every ingested PDF, web_content_qa on a crawl
+    summarization  youtube_summary on transcripts of --video-minutes lengths,
+                   extract_pdf_text(summarization=True)
+    scraping       scrape_web_url (cold and revalidated) and crawl_website
+
+For every operation it reports throughput and p50/p95/p99 latency, and
+writes a JSON report (by default benchmarks/results/<commit>.json) that
+`--compare` diffs against an earlier run.
+
+Usage:
+    python -m benchmarks.offline
+    python -m benchmarks.offline --pages 2,20,200,1000 --repeat 5
+    python -m benchmarks.offline --latency-scale 0 --scenarios ingestion,qa
+    python -m benchmarks.offline --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+from benchmarks import synthetic
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SCENARIOS = ("ingestion", "qa", "summarization", "scraping")
+DEFAULT_PAGES = (2, 20, 200, 1000)
+DEFAULT_VIDEO_MINUTES = (5, 30, 120)
+HTTP_LATENCY = 0.02
+PLAYLIST_VIDEOS = 20
+
+
+class FakeContext:
+    """Enough of fastmcp.Context for the tools: progress and logging are dropped."""
+
+    session_id = "benchmark"
+
+    def __init__(self):
+        self.session = SimpleNamespace(send_resource_list_changed=self._noop)
+
+    async def _noop(self, *args, **kwargs):
+        pass
+
+    report_progress = info = debug = warning = error = _noop
+
+
+# --------------------------------------------------
+# Local web server for the scraping scenario
+# --------------------------------------------------
+
+def serve_site(site: dict[str, bytes], latency: float) -> ThreadingHTTPServer:
+    etags = {path: f'"{hash(body) & 0xffffffff:x}"' for path, body in site.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            path = self.path.split("?", 1)[0]
+            body = site.get(path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            if self.headers.get("If-None-Match") == etags[path]:
+                self.send_response(304)
+                self.send_header("ETag", etags[path])
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etags[path])
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# --------------------------------------------------
+# Measurement
+# --------------------------------------------------
+
+def percentile(samples: list[float], q: float) -> float:
+    """Linear interpolation between closest ranks."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    pos = (len(ordered) - 1) * q
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def _failed(result) -> bool:
+    if isinstance(result, dict):
+        return "error" in result
+    return isinstance(result, str) and result.startswith("Error")
+
+
+def _summarize(samples: list[float], errors: int, units: float = 0, unit: str = "", **extra) -> dict:
+    elapsed = sum(samples)
+    summary = {
+        "samples": len(samples),
+        "errors": errors,
+        "ops_per_s": round(len(samples) / elapsed, 3) if elapsed else 0.0,
+        "mean_ms": round(elapsed / len(samples) * 1000, 2) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 2)
+    }
+    if unit:
+        summary[f"{unit}_per_s"] = round(units / elapsed, 2) if elapsed else 0.0
+    summary.update(extra)
+    return summary
+
+
+async def _measure(call, repeat: int):
+    """Runs `call()` `repeat` times; returns (latencies, errors, last result)."""
+    samples, errors, result = [], 0, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = await call()
+        samples.append(time.perf_counter() - started)
+        errors += _failed(result)
+    return samples, errors, result
+
+
+def _tool(server, name):
+    tool = getattr(server, name)
+    return getattr(tool, "fn", tool)    # decorated tools may be wrapped in a Tool object
+
+
+async def _maybe_await(value):
+    return await value if asyncio.iscoroutine(value) else value
+
+
+# --------------------------------------------------
+# Scenarios
+# --------------------------------------------------
+
+async def bench_ingestion(server, workdir: Path, pages: list[int], repeat: int, state: dict) -> dict:
+    process_pdf = _tool(server, "process_pdf")
+    results = {}
+    for count in pages:
+        # A different document per run: identical content would reuse its namespace
+        paths = [synthetic.make_pdf(workdir / f"synthetic_{count}p_{i}.pdf", count, seed=i) for i in range(repeat)]
+        it = iter(paths)
+        samples, errors, info = await _measure(lambda: process_pdf(str(next(it)), FakeContext()), repeat)
+        results[f"process_pdf[{count}p]"] = _summarize(
+            samples, errors, units=count * len(samples), unit="pages",
+            processing_type=info.get("processing_type") if isinstance(info, dict) else None,
+            file_mb=round(paths[0].stat().st_size / 1024 / 1024, 2)
+        )
+        if _failed(info):
+            continue
+        state["pdfs"][count] = info
+        # Same document again: resolved from the resource registry
+        samples, errors, _ = await _measure(lambda: process_pdf(str(paths[-1]), FakeContext()), repeat)
+        results[f"process_pdf[{count}p,reused]"] = _summarize(samples, errors, units=count * len(samples), unit="pages")
+    return results
+
+
+async def bench_qa(server, questions: int, state: dict) -> dict:
+    pdf_qa = _tool(server, "pdf_qa")
+    web_content_qa = _tool(server, "web_content_qa")
+    results = {}
+
+    for count, info in state["pdfs"].items():
+        asked = [f"What does section {1 + i % count} say about {synthetic.TOPICS[i % len(synthetic.TOPICS)]}?"
+                 for i in range(questions)]
+        it = iter(asked)
+        samples, errors, _ = await _measure(lambda: pdf_qa(info, next(it), FakeContext()), questions)
+        results[f"pdf_qa[{info['processing_type']},{count}p]"] = _summarize(samples, errors)
+
+    crawl_result = state.get("crawl")
+    if crawl_result:
+        asked = iter(f"How is {topic} handled?" for topic in synthetic.TOPICS * questions)
+        samples, errors, _ = await _measure(
+            lambda: _maybe_await(web_content_qa(crawl_result["txt_path"], next(asked), FakeContext(), crawl_result["index_path"])),
+            questions
+        )
+        results["web_content_qa[crawl]"] = _summarize(samples, errors)
+    return results
+
+
+async def bench_summarization(server, fakes, workdir: Path, minutes: list[int], repeat: int) -> dict:
+    youtube_summary = _tool(server, "youtube_summary")
+    extract_pdf_text = _tool(server, "extract_pdf_text")
+    results = {}
+
+    for m in minutes:
+        video_id = f"bench{m:04d}min"
+        fakes.TRANSCRIPTS[video_id] = synthetic.make_transcript(video_id, m)
+        url = f"https://www.youtube.com/watch?v={video_id}"
+        samples, errors, _ = await _measure(lambda: youtube_summary(url, FakeContext(), "concise"), repeat)
+        results[f"youtube_summary[{m}min]"] = _summarize(samples, errors, units=m * len(samples), unit="video_minutes")
+
+    batch = _tool(server, "youtube_batch_summary")
+    urls = []
+    for i in range(PLAYLIST_VIDEOS):
+        video_id = f"benchlist{i:03d}"
+        fakes.TRANSCRIPTS[video_id] = synthetic.make_transcript(video_id, 10)
+        urls.append(f"https://www.youtube.com/watch?v={video_id}")
+    samples, errors, _ = await _measure(lambda: batch(FakeContext(), video_urls=urls, digest=True), repeat)
+    results[f"youtube_batch_summary[{PLAYLIST_VIDEOS}x10min]"] = _summarize(
+        samples, errors, units=PLAYLIST_VIDEOS * len(samples), unit="videos"
+    )
+
+    pdf_path = synthetic.make_pdf(workdir / "synthetic_summary.pdf", 10)
+    samples, errors, _ = await _measure(
+        lambda: extract_pdf_text(str(pdf_path), FakeContext(), "1-5", True), repeat
+    )
+    results["extract_pdf_text[summary,5p]"] = _summarize(samples, errors, units=5 * len(samples), unit="pages")
+    return results
+
+
+async def bench_scraping(server, site_pages: int, repeat: int, latency: float, state: dict) -> dict:
+    scrape_web_url = _tool(server, "scrape_web_url")
+    crawl_website = _tool(server, "crawl_website")
+    site = synthetic.make_site(site_pages)
+    site_bytes = sum(len(b) for b in site.values())
+    httpd = serve_site(site, latency)
+    base = f"http://127.0.0.1:{httpd.server_address[1]}"
+    results = {}
+
+    try:
+        urls = [f"{base}{path}" for path in site if path != "/"]
+        page_bytes = sum(len(site[path]) for path in site if path != "/")
+
+        it = iter(urls)
+        samples, errors, _ = await _measure(lambda: scrape_web_url(next(it), FakeContext()), len(urls))
+        results["scrape_web_url[cold]"] = _summarize(samples, errors, units=page_bytes / 1024 / 1024, unit="mb")
+
+        it = iter(urls)
+        samples, errors, _ = await _measure(lambda: scrape_web_url(next(it), FakeContext(), refresh=True), len(urls))
+        results["scrape_web_url[revalidated]"] = _summarize(samples, errors, units=page_bytes / 1024 / 1024, unit="mb")
+
+        # Known URLs resolve from the resource registry without a request
+        it = iter(urls)
+        samples, errors, _ = await _measure(lambda: scrape_web_url(next(it), FakeContext()), len(urls))
+        results["scrape_web_url[known]"] = _summarize(samples, errors, units=page_bytes / 1024 / 1024, unit="mb")
+
+        samples, errors, result = await _measure(
+            lambda: crawl_website(f"{base}/", FakeContext(), max_depth=2, max_pages=site_pages + 1, delay_seconds=0),
+            repeat
+        )
+        crawled = result.get("pages_crawled", 0) if isinstance(result, dict) else 0
+        results["crawl_website"] = _summarize(samples, errors, units=crawled * len(samples), unit="pages",
+                                              site_mb=round(site_bytes / 1024 / 1024, 2))
+        if not _failed(result):
+            state["crawl"] = result
+    finally:
+        httpd.shutdown()
+    return results
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+
+def git_commit() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10,
+                                  cwd=Path(__file__).parent).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "--short", "HEAD") or "unknown", "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    print(f"commit {report['commit']}{' (dirty)' if report['dirty'] else ''}, latency scale {report['config']['latency_scale']}")
+    for scenario, ops in report["scenarios"].items():
+        print(f"\n== {scenario} ==")
+        print(f"{'operation':<34} {'n':>4} {'err':>4} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  throughput")
+        for name, r in ops.items():
+            rate = next((f"{v} {k[:-6]}/s" for k, v in r.items() if k.endswith("_per_s") and k != "ops_per_s"), "")
+            line = (f"{name:<34} {r['samples']:>4} {r['errors']:>4} {r['ops_per_s']:>8} "
+                    f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}  {rate}")
+            base = (baseline or {}).get("scenarios", {}).get(scenario, {}).get(name)
+            if base and base.get("p50_ms"):
+                line += f"  (p50 {100 * (r['p50_ms'] - base['p50_ms']) / base['p50_ms']:+.1f}% vs {baseline['commit']})"
+            print(line)
+
+
+async def run(args, workdir: Path) -> dict:
+    # Imported here so ANALYZER_STATE_DIR already points at the scratch directory
+    import server
+    from benchmarks import fakes
+    from utils import metrics
+
+    fakes.LATENCY_SCALE = args.latency_scale
+    state = {"pdfs": {}}
+    scenarios = {}
+
+    with fakes.installed():
+        # stdout is the report; route the tools' own prints to stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            if "ingestion" in args.scenarios or "qa" in args.scenarios:
+                scenarios["ingestion"] = await bench_ingestion(server, workdir, args.pages, args.repeat, state)
+            if "scraping" in args.scenarios or "qa" in args.scenarios:
+                scenarios["scraping"] = await bench_scraping(
+                    server, args.site_pages, args.repeat, HTTP_LATENCY * args.latency_scale, state
+                )
+            if "qa" in args.scenarios:
+                scenarios["qa"] = await bench_qa(server, args.questions, state)
+            if "summarization" in args.scenarios:
+                scenarios["summarization"] = await bench_summarization(server, fakes, workdir, args.video_minutes, args.repeat)
+
+    return {
+        **git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "pages": args.pages,
+            "repeat": args.repeat,
+            "questions": args.questions,
+            "video_minutes": args.video_minutes,
+            "site_pages": args.site_pages,
+            "latency_scale": args.latency_scale,
+            "latency": fakes.LATENCY,
+            "http_latency": HTTP_LATENCY
+        },
+        "scenarios": {name: scenarios[name] for name in SCENARIOS if name in scenarios},
+        "stages": metrics.snapshot()["stages"]
+    }
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the MCP tools with local fakes")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Comma-separated subset of {', '.join(SCENARIOS)}")
+    parser.add_argument("--pages", type=_int_list, default=list(DEFAULT_PAGES), help="PDF sizes in pages")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per operation")
+    parser.add_argument("--questions", type=int, default=20, help="Questions per ingested document")
+    parser.add_argument("--video-minutes", type=_int_list, default=list(DEFAULT_VIDEO_MINUTES), help="Transcript lengths")
+    parser.add_argument("--site-pages", type=int, default=30, help="Pages in the synthetic website")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiplier for injected latency (0 = none)")
+    parser.add_argument("--output", type=Path, help="JSON report path (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON report to diff p50 latencies against")
+    parser.add_argument("--keep-state", action="store_true", help="Keep the scratch state directory")
+    args = parser.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = Path(tempfile.mkdtemp(prefix="analyzer_bench_"))
+    os.environ["ANALYZER_STATE_DIR"] = str(workdir / "state")
+    # The fakes have no quotas; measure the code, not the free-tier rate limits
+    os.environ.setdefault("RATE_LIMITS", "off")
+    try:
+        report = asyncio.run(run(args, workdir))
+    finally:
+        if not args.keep_state:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None
+    print_report(report, baseline)
+
+    output = args.output or RESULTS_DIR / f"{report['commit']}{'-dirty' if report['dirty'] else ''}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
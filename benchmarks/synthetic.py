@@ -0,0 +1,114 @@
+"""
+Deterministic synthetic inputs for the offline benchmarks: PDFs, HTML sites
+and YouTube transcripts. The same seed always produces the same bytes, so
+results stay comparable across commits.
+"""
+
+import random
+from pathlib import Path
+
+_SYLLABLES = ("ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "be", "da", "fe", "go", "hu", "ji", "po", "ze")
+TOPICS = ("latency", "throughput", "storage", "pipeline", "network", "budget", "cache", "index")
+
+
+def vocabulary(size: int = 2000, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(1, 4))))
+    return sorted(words) + list(TOPICS)
+
+
+def sentence(rng: random.Random, vocab: list[str], words: int) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(words))
+
+
+def make_pdf(path: Path, pages: int, lines_per_page: int = 40, words_per_line: int = 12, seed: int = 0) -> Path:
+    """
+    Writes an uncompressed PDF with `pages` pages of text (Helvetica, one
+    content stream per page). Each page starts with a "Section <n>" heading
+    naming a topic, which gives the Q&A benchmark something to retrieve.
+    """
+    rng = random.Random(seed * 1_000_003 + pages)
+    vocab = vocabulary(seed=seed)
+
+    # Object numbers: 1 catalog, 2 page tree, 3 font, then (page, content) pairs
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for page in range(pages):
+        page_obj, content_obj = 4 + 2 * page, 5 + 2 * page
+        kids.append(f"{page_obj} 0 R")
+
+        lines = [f"Section {page + 1}: {TOPICS[page % len(TOPICS)]}"]
+        lines += [sentence(rng, vocab, words_per_line) for _ in range(lines_per_page - 1)]
+        ops = ["BT", "/F1 10 Tf", "14 TL", "50 790 Td"]
+        for line in lines:
+            ops.append(f"({line}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+
+        objects[page_obj] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_obj} 0 R >>"
+        ).encode("latin-1")
+        objects[content_obj] = b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>".encode("latin-1")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = len(out)
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, objects[number])
+
+    xref_at = len(out)
+    count = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % count
+    for number in range(1, count):
+        out += b"%010d 00000 n \n" % offsets[number]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (count, xref_at)
+
+    path = Path(path)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def make_site(pages: int, paragraphs: int = 30, seed: int = 0) -> dict[str, bytes]:
+    """
+    A small documentation-style site: `/` links to every page, each page links
+    to its neighbours and carries navigation, scripts and article text.
+
+    Returns:
+        dict[str, bytes]: URL path -> HTML body
+    """
+    rng = random.Random(seed)
+    vocab = vocabulary(seed=seed)
+    site = {}
+
+    index_links = "".join(f'<li><a href="/docs/page-{i}">Page {i}</a></li>' for i in range(pages))
+    site["/"] = f"<html><head><title>Docs</title></head><body><ul>{index_links}</ul></body></html>".encode()
+
+    for i in range(pages):
+        nav = "".join(f'<a href="/docs/page-{j}?utm_source=nav">Page {j}</a> ' for j in (i - 1, i + 1) if 0 <= j < pages)
+        body = "".join(f"<p>{sentence(rng, vocab, 60)}</p>" for _ in range(paragraphs))
+        site[f"/docs/page-{i}"] = (
+            f"<html><head><title>Page {i}: {TOPICS[i % len(TOPICS)]}</title>"
+            f"<script>var analytics = {{id: {i}}};</script><style>p {{margin: 0}}</style></head>"
+            f"<body><nav>{nav}</nav><article><h1>Page {i}</h1>{body}</article>"
+            f"<footer>Footer text</footer></body></html>"
+        ).encode()
+
+    return site
+
+
+def make_transcript(video_id: str, minutes: int, seed: int = 0) -> list[dict]:
+    """Transcript segments (~2.5 words/s, 5 s each) in the YouTube API shape."""
+    rng = random.Random(f"{seed}:{video_id}")
+    vocab = vocabulary(seed=seed)
+    return [
+        {"text": sentence(rng, vocab, 12), "start": float(start), "duration": 5.0}
+        for start in range(0, minutes * 60, 5)
+    ]
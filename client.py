@@ -69,11 +69,17 @@ async def main():
             print("Available Tools : ",await session.list_tools())
             print("🔄 Calling tool...\n")
             
+            # python client.py <pdf>          -> process_pdf
+            # python client.py --bulk <source> -> bulk_ingest_pdfs (directory, glob or zip)
+            if len(sys.argv) > 2 and sys.argv[1] == "--bulk":
+                tool_name, arguments = "bulk_ingest_pdfs", {"source": sys.argv[2]}
+            else:
+                pdf_path = sys.argv[1] if len(sys.argv) > 1 else r"C:\Users\LokeshSharma\Downloads\New folder\pdf_files\LokeshSharma_Resume .pdf"
+                tool_name, arguments = "process_pdf", {"pdf_path": pdf_path}
+
             result = await session.call_tool(
-                "process_pdf",
-                arguments={
-                    "pdf_path": r"C:\Users\LokeshSharma\Downloads\New folder\pdf_files\LokeshSharma_Resume .pdf"
-                },
+                tool_name,
+                arguments=arguments,
                 progress_callback=handle_progress
             )
             
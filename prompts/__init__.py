@@ -15,4 +15,27 @@ QA_prompt= """Based on the following PDF content, please answer the question acc
 
         Question: {question}
         
-        Answer:"""
\ No newline at end of file
+        Answer:"""
+
+youtube_qa_prompt = """Answer the question using only the following excerpts of a video transcript.
+        Each excerpt starts with its [start - end] timestamp.
+        Cite the timestamp(s) of the excerpts you used, e.g. (at 12:34).
+        If the excerpts do not contain the answer, say so.
+
+        Transcript excerpts:
+        {transcript}
+
+        Question: {question}
+
+        Answer:"""
+
+youtube_digest_prompt = """Combine the following video summaries into one digest.
+    Requirements:
+    - Start with a short overview of the common themes.
+    - Then list the most important points per video, with its link.
+    - Merge overlapping points instead of repeating them.
+    - Do not add information not present in the summaries.
+
+    Summaries:
+    {summaries}
+    """
@@ -12,16 +12,26 @@ from mcp.shared.exceptions import UrlElicitationRequiredError
 from mcp.types import ElicitRequestURLParams
 # Add these imports at the top of server.py
 import requests
-from bs4 import BeautifulSoup
 from urllib.parse import urlparse
-import hashlib
 from datetime import datetime
 import sys,os
-from services.pdf.pdf_ingestion import ingest_pdf_to_pinecone
+import asyncio
+import time
+from services.pdf.pdf_ingestion import ingest_pdf
+from services import jobs, artifacts, namespaces, resources
 from services.pdf import loader
-from services.qa import _pdf_qa_simple, _pdf_qa_vector,_qa_from_web
-from services.transcripts import extract_yt_transcript
+from services.pdf.bulk_ingestion import bulk_ingest
+from services.pdf.strategy import SAMPLE_PAGES, choose_strategy, estimate_strategy
+from services.pdf.local_index import build_local_index, save_local_index
+from services.qa import _pdf_qa_simple, _pdf_qa_local, _pdf_qa_vector,_qa_from_web,_qa_from_web_index,_youtube_qa
+from services.transcripts import extract_yt_transcript, fetch_transcript_segments, join_segments
 from services.summarizer import get_yt_summary, get_pdf_summary
+from services.youtube_ingestion import index_youtube_transcript
+from services import youtube_batch
+from services.web import fetcher, extractors
+from services.web.crawler import crawl
+from utils import hooks, metrics, scheduler, tracing, usage
+from utils.hooks import with_hooks
 # 1. FORCE SILENCE: Redirect standard output to standard error
 # This prevents libraries from printing text that breaks the JSON connection
 # sys.stdout = sys.stderr
@@ -30,11 +40,23 @@ from services.summarizer import get_yt_summary, get_pdf_summary
 # --------------------------------------------------
 mcp = FastMCP("Analysis Tools")
 
+# Opt-in tracing/profiling (TRACE_TOOLS, TRACE_SAMPLE_RATE, _meta.trace)
+hooks.register(tracing.tool_trace)
+# Per-tool latency / in-flight / error metrics
+hooks.register(metrics.tool_call)
+# Attribute LLM/embedding usage to the tool, resource and session
+hooks.register(usage.tool_scope)
+
+# Upper bounds for a single tool response; larger content is paginated
+MAX_TOOL_PAGES = 20
+MAX_TOOL_CHARS = 50_000
+
 # --------------------------------------------------
 # YouTube Tools
 # --------------------------------------------------
 
 @mcp.tool()
+@with_hooks
 def get_youtube_transcript(video_url: str) -> str:
     """
     Get the raw transcript of a YouTube video.
@@ -46,12 +68,77 @@ def get_youtube_transcript(video_url: str) -> str:
         The complete video transcript as text
     """
     try:
-        return extract_yt_transcript(video_url)
+        return _youtube_transcript(video_url)
     except Exception as e:
         return f"Error getting transcript: {str(e)}"
 
 
+def _youtube_transcript(video_url: str) -> str:
+    """Transcript stored with the video's resource entry, fetched if there is none."""
+    entry = resources.get(resources.resource_key("youtube", video_url))
+    txt_path = entry["metadata"].get("txt_path") if entry else None
+    if txt_path and artifacts.exists(txt_path):
+        return artifacts.load_text(txt_path)
+    return extract_yt_transcript(video_url)
+
+
+def _youtube_segments(video_url: str) -> list[dict] | None:
+    """Timestamped transcript segments stored with the video's resource entry, if any."""
+    entry = resources.get(resources.resource_key("youtube", video_url))
+    segments_path = entry["metadata"].get("segments_path") if entry else None
+    if segments_path and artifacts.exists(segments_path):
+        return json.loads(artifacts.load_text(segments_path))
+    return None
+
+
 @mcp.tool()
+@with_hooks
+def add_youtube_resource(video_url: str, ctx: Context) -> dict:
+    """
+    Register a YouTube video (or playlist/channel) as a resource. The
+    transcript is fetched once and stored; a video that is already known,
+    under any of its URL forms, resolves to its stored entry instantly.
+
+    Args:
+        video_url: YouTube video, playlist or channel URL
+
+    Returns:
+        dict: Metadata (video_id, txt_path of the transcript, segments_path of
+        its timestamped segments, word_count, namespace once indexed),
+        resource_id and whether it was reused
+    """
+    try:
+        key = resources.resource_key("youtube", video_url)
+        known = resources.lookup(key)
+        if known:
+            return {**known["metadata"], "resource_id": known["id"], "reused": True}
+
+        # Same rule as the key: a URL naming a video (even inside a playlist,
+        # watch?v=ID&list=...) is that video; only the rest are collections
+        if not resources.is_video_key(key) and youtube_batch.is_collection(video_url):
+            metadata = {"status": "success", "url": video_url, "collection": True}
+            name = f"Playlist ({video_url[:30]}...)"
+        else:
+            # One fetch: the text for summaries and the timestamps for youtube_qa
+            _, segments = fetch_transcript_segments(video_url)
+            transcript = join_segments(segments)
+            metadata = {
+                "status": "success",
+                "url": video_url,
+                "video_id": key.split(":", 1)[1],
+                "txt_path": artifacts.put_text(transcript, source=video_url, kind="youtube_transcript"),
+                "segments_path": artifacts.put_text(json.dumps(segments), source=video_url, kind="youtube_segments"),
+                "word_count": len(transcript.split())
+            }
+            name = f"Video ({video_url[:30]}...)"
+        entry = resources.register("youtube", video_url, name, metadata, url=video_url)
+        return {**entry["metadata"], "resource_id": entry["id"], "reused": False}
+    except Exception as e:
+        return {"error": f"Error adding video: {str(e)}"}
+
+
+@mcp.tool()
+@with_hooks
 async def youtube_summary(video_url: str,ctx: Context, summary_style: str = "concise") -> str:
     """
     Summarize a YouTube video from its transcript.
@@ -67,81 +154,349 @@ async def youtube_summary(video_url: str,ctx: Context, summary_style: str = "con
     await ctx.report_progress(0.1, total=1.0, message="Fetching Transcript...")
     await ctx.info(f"Starting summary for {video_url} [{summary_style}]")
     try:
-        transcript = extract_yt_transcript(video_url)
-        return get_yt_summary(
+        # Off the event loop: the LLM call may wait for its rate limit
+        transcript = await asyncio.to_thread(_youtube_transcript, video_url)
+        return await asyncio.to_thread(
+            get_yt_summary,
             yt_transcript=transcript,
             level=summary_style
         )
     except Exception as e:
         return f"Error summarizing video: {str(e)}"
 
+@mcp.tool()
+@with_hooks
+async def youtube_batch_summary(
+    ctx: Context,
+    playlist_url: str = "",
+    video_urls: list[str] | None = None,
+    summary_style: str = "concise",
+    digest: bool = False,
+    max_videos: int = 50,
+    workers: int = 0
+) -> dict:
+    """
+    Summarize many YouTube videos at once: a playlist, a channel's latest
+    uploads, or a list of video URLs.
+
+    Videos are processed concurrently; each summary is streamed as a log
+    message as soon as it is ready. A video that fails (e.g. no transcript)
+    is reported in its own result and does not stop the others.
+
+    Args:
+        playlist_url: Playlist URL (with `list=`) or channel URL (e.g. https://www.youtube.com/@name)
+        video_urls: Individual video URLs (can be combined with playlist_url)
+        summary_style: "concise" (default), "detailed", or "bullet_points"
+        digest: Also combine all summaries into one digest
+        max_videos: Maximum number of videos to summarize
+        workers: Videos processed in parallel (0 = server default)
+
+    Returns:
+        dict: Per-video results (summary or error), the optional digest and stats
+    """
+    if not playlist_url and not video_urls:
+        return {"error": "Provide playlist_url or video_urls"}
+
+    loop = asyncio.get_running_loop()
+
+    async def stream(result, done, total):
+        await ctx.report_progress(done, total=total, message=f"Summarized {done}/{total} videos")
+        if result["status"] == "success":
+            await ctx.info(f"[{done}/{total}] {result['url']}\n{result['summary']}")
+        else:
+            await ctx.warning(f"[{done}/{total}] {result['url']} failed: {result['error']}")
+
+    def on_result(result, done, total):
+        asyncio.run_coroutine_threadsafe(stream(result, done, total), loop)
+
+    try:
+        started = time.perf_counter()
+        videos = await asyncio.to_thread(youtube_batch.resolve_videos, playlist_url, video_urls, max_videos)
+        if not videos:
+            return {"error": "No videos found"}
+        await ctx.info(f"Summarizing {len(videos)} videos [{summary_style}]")
+
+        results = await asyncio.to_thread(youtube_batch.summarize_videos, videos, summary_style, workers, on_result)
+        response = {"status": "success", "results": results}
+        if digest:
+            await ctx.report_progress(len(videos), total=len(videos), message="Writing digest...")
+            try:
+                response["digest"] = await asyncio.to_thread(youtube_batch.build_digest, results, workers)
+            except Exception as e:
+                response["digest_error"] = str(e)
+        response["stats"] = youtube_batch.batch_stats(results, started)
+        return response
+    except Exception as e:
+        return {"error": f"Error summarizing videos: {str(e)}"}
+
+@mcp.tool()
+@with_hooks
+async def youtube_qa(video_url: str, question: str, ctx: Context) -> str:
+    """
+    Answer a question about a YouTube video, citing timestamps.
+
+    The transcript is chunked with its timestamps and indexed in the vector
+    database on first use (namespace `yt_<video_id>`), from the segments
+    stored by `add_youtube_resource` when the video is registered; later
+    questions about the same video reuse the index. Only the most relevant transcript
+    segments are sent to the LLM, so long videos are as fast as short ones.
+
+    Args:
+        video_url: YouTube video URL (e.g., https://www.youtube.com/watch?v=...)
+        question: Question about the video content
+
+    Returns:
+        The answer followed by links to the cited timestamps
+    """
+    try:
+        await ctx.report_progress(0.1, total=1.0, message="Indexing transcript...")
+        segments = _youtube_segments(video_url)
+        indexed = await asyncio.to_thread(index_youtube_transcript, video_url, segments=segments)
+        if indexed["already_indexed"]:
+            await ctx.info(f"Transcript already indexed ({indexed['namespace']})")
+        else:
+            await ctx.info(f"Indexed {indexed['chunks']} transcript chunks ({indexed['namespace']})")
+
+        await ctx.report_progress(0.6, total=1.0, message="Answering...")
+        return await asyncio.to_thread(_youtube_qa, question, indexed["namespace"], indexed["video_id"])
+    except Exception as e:
+        return f"Error answering question about video: {str(e)}"
+
 # --------------------------------------------------
 # PDF Processing Tool (NO SERVER STATE)
 # --------------------------------------------------
 
 @mcp.tool()
-async def process_pdf(pdf_path: str,ctx:Context) -> dict:
+@with_hooks
+async def process_pdf(pdf_path: str,ctx:Context,background: bool = False,name: str = "") -> dict:
     """
-    Smart PDF processor that checks page count and processes accordingly.
-    - For PDFs with <= 2 pages: Saves content to .txt file
-    - For PDFs with > 2 pages: Creates vector database
+    Smart PDF processor that measures the extracted text and processes accordingly.
+    - Small documents (simple): Saves content to .txt file, Q&A uses the full text
+    - Mid-size documents (local): Saves .txt plus a local passage index,
+      Q&A retrieves the best passages without embeddings
+    - Large documents (vector): Creates vector database
+    The token thresholds are configured with PDF_SIMPLE_MAX_TOKENS and
+    PDF_LOCAL_INDEX_MAX_TOKENS; the decision is returned under "strategy".
     
     Args:
         pdf_path: Path to the PDF file
+        background: If True, vector ingestion is queued as a background job and
+            the result contains a `job_id` to poll with `ingestion_status`
+        name: Display name for the resource registry (default: the file name)
+    
+    A PDF already in the resource registry (same content, any file name or
+    user) returns its stored result with `reused: True`. Results carry a
+    `resource_id` and a `pdf_path` that stays valid after the input file is gone.
     
     Returns:
-        dict: Processing result with type, page_count, and relevant paths/info
+        dict: Processing result with type, page_count, strategy and relevant paths/info
     """
     try:
+        # Resources and vector namespaces are keyed by content hash: a document
+        # anyone already processed is reused without extracting or embedding it again
+        sha = namespaces.file_sha256(pdf_path)
+        known = resources.lookup(resources.resource_key("pdf", sha))
+        if known:
+            await ctx.info(f"Already processed as resource {known['id']}, reusing it.")
+            return {**known["metadata"], "resource_id": known["id"], "reused": True}
+
         reader = pypdf.PdfReader(pdf_path)
         page_count = len(reader.pages)
         pdf_file = Path(pdf_path)
-        pdf_name = pdf_file.stem
+        name = name or pdf_file.name
+        namespace = namespaces.namespace_for_hash(sha)
+        existing = namespaces.reuse(namespace)
+        if existing:
+            await ctx.info(f"Already ingested as {namespace}, reusing it.")
+            return _register_pdf(sha, pdf_path, name, {
+                "status": "success",
+                "processing_type": "vector",
+                "pdf_path":pdf_path,
+                "page_count": page_count,
+                "namespace": namespace,
+                "chunk_count": existing["vectors"],
+                "txt_path": existing["artifacts"][0] if existing["artifacts"] else None,
+                "reused": True,
+                "strategy": {"processing_type": "vector", "reason": "already ingested"}
+            })
 
-        if page_count <= 2:
-            await ctx.report_progress(0.5, message="Extracting text (Simple Mode)")
-            content, status = loader.extract_text_from_pdf(pdf_path, "all")
-            if not status:
-                return {"error": "Failed to extract PDF content"}
+        if background and page_count > SAMPLE_PAGES:
+            # Size a long document from its first pages: if it clearly needs
+            # vector ingestion, the worker does the full extraction
+            sample, status = await asyncio.to_thread(loader.extract_text_from_pdf, pdf_path, f"1-{SAMPLE_PAGES}")
+            if status:
+                strategy = estimate_strategy(sample, SAMPLE_PAGES, page_count)
+                if strategy["processing_type"] == "vector":
+                    await ctx.info(f"Strategy: vector ({strategy['reason']})")
+                    return await _queue_pdf_ingestion(ctx, sha, pdf_path, name, page_count, strategy)
 
-            txt_path = pdf_file.with_suffix(".txt")
-            txt_path.write_text(content, encoding="utf-8")
-            # Notify client that a new file exists
-            await ctx.session.send_resource_list_changed()
-            await ctx.info(f"Created text file: {txt_path}")
+        await ctx.report_progress(0.2, message="Extracting text")
+        content, status = await asyncio.to_thread(loader.extract_text_from_pdf, pdf_path, "all")
+        if not status:
+            return {"error": "Failed to extract PDF content"}
+
+        strategy = choose_strategy(content, page_count)
+        processing_type = strategy["processing_type"]
+        await ctx.info(f"Strategy: {processing_type} ({strategy['reason']})")
 
-            return {
+        if processing_type in ("simple", "local"):
+            txt_key = artifacts.put_text(content, source=str(pdf_file), kind="pdf_text")
+            result = {
                 "status": "success",
-                "processing_type": "simple",
+                "processing_type": processing_type,
                 "pdf_path":pdf_path,
                 "page_count": page_count,
-                "txt_path": str(txt_path)
+                "txt_path": txt_key,
+                "strategy": strategy
             }
 
-        # Vector PDF
-        # --- Strategy 2: Vector Ingestion ---
+            if processing_type == "local":
+                await ctx.report_progress(0.6, message="Building local passage index")
+                index = await asyncio.to_thread(build_local_index, content)
+                result["index_path"] = save_local_index(index, source=str(pdf_file))
+                result["passage_count"] = len(index["passages"])
+
+            # Notify client that a new resource exists (file://<txt_path>)
+            await ctx.session.send_resource_list_changed()
+            await ctx.info(f"Stored text artifact: {txt_key}")
+            return _register_pdf(sha, pdf_path, name, result)
+
+        # --- Vector Ingestion ---
+        # Keep the extracted text with the namespace (readable via file://, evicted with it)
+        txt_key = artifacts.put_text(content, source=str(pdf_file), kind="pdf_text")
+        if background:
+            return await _queue_pdf_ingestion(ctx, sha, pdf_path, name, page_count, strategy, txt_key)
+        namespaces.acquire(namespace, "pdf", sha, pdf_file.name, pdf_file.stat().st_size)
+        namespaces.attach_artifacts(namespace, [txt_key])
+
         await ctx.report_progress(progress=0.3, message="Starting Vector Ingestion (Pinecone)")
-        await ctx.info("PDF > 2 pages. Switching to Vector Strategy.")
-        result = await ingest_pdf_to_pinecone(pdf_path)
+        result = await asyncio.to_thread(ingest_pdf, pdf_path, text=content)
         await ctx.session.send_resource_list_changed()
 
-        return {
+        return _register_pdf(sha, pdf_path, name, {
             "status": "success",
             "processing_type": "vector",
             "pdf_path":pdf_path,
             "page_count": page_count,
             "namespace": result["namespace"],
-            "chunk_count": result["chunks"]
-        }
+            "chunk_count": result["chunks"],
+            "txt_path": txt_key,
+            "strategy": strategy
+        })
 
     except Exception as e:
         return {"error": f"Error processing PDF: {str(e)}"}
 
+
+async def _queue_pdf_ingestion(ctx: Context, sha: str, pdf_path: str, name: str, page_count: int,
+                               strategy: dict, txt_key: str | None = None) -> dict:
+    """
+    Queues vector ingestion of the registry's copy of a PDF (the caller's
+    file may be a temp upload gone before the worker reaches the job).
+    The worker embeds the text stored under `txt_key`; without one it extracts
+    the PDF itself and stores the text artifact.
+    """
+    durable = str(resources.store_pdf(pdf_path, sha))
+    namespace = namespaces.namespace_for_hash(sha)
+    namespaces.acquire(namespace, "pdf", sha, Path(pdf_path).name, Path(durable).stat().st_size)
+    if txt_key:
+        namespaces.attach_artifacts(namespace, [txt_key])
+    job = jobs.enqueue_ingestion(durable, txt_path=txt_key)
+    await ctx.info(f"Queued vector ingestion job {job['job_id']}.")
+    return _register_pdf(sha, durable, name, {
+        "status": "queued",
+        "processing_type": "vector",
+        "pdf_path": durable,
+        "page_count": page_count,
+        "namespace": namespace,
+        "txt_path": txt_key,
+        "job_id": job["job_id"],
+        "strategy": strategy
+    })
+
+
+def _register_pdf(sha: str, pdf_path: str, name: str, result: dict) -> dict:
+    """Stores a process_pdf result in the resource registry; adds its resource_id."""
+    entry = resources.register("pdf", sha, name, result, path=pdf_path)
+    return {**entry["metadata"], "resource_id": entry["id"]}
+
+@mcp.tool()
+@with_hooks
+def ingestion_status(job_id: str) -> dict:
+    """
+    Report the progress of a background PDF ingestion job.
+
+    Args:
+        job_id: The `job_id` returned by `process_pdf(background=True)`
+
+    Returns:
+        dict: status ("queued", "running", "completed" or "failed"),
+        pages/chunks progress and, once completed, `namespace`, `chunk_count`
+        and `txt_path`; the resource that queued the job is then marked "success"
+    """
+    job = jobs.get_job(job_id)
+    if job is None:
+        return {"error": f"Unknown job: {job_id}"}
+    if job["status"] in ("queued", "running"):
+        # Restart the worker if it died since the job was queued
+        jobs.ensure_worker()
+
+    result = {
+        "job_id": job_id,
+        "status": job["status"],
+        "pages_done": job["pages_done"],
+        "pages_total": job["pages_total"],
+        "chunks_done": job["chunks_done"],
+        "chunks_total": job["chunks_total"],
+        "updated_at": job["updated_at"]
+    }
+    if job["status"] == "completed":
+        result.update(processing_type="vector", namespace=job["namespace"], chunk_count=job["chunk_count"],
+                      txt_path=job.get("txt_path"))
+        resources.record_ingestion(job)
+    if job["error"]:
+        result["error"] = job["error"]
+    return result
+
+@mcp.tool()
+@with_hooks
+async def bulk_ingest_pdfs(source: str,ctx:Context,workers: int = 0) -> dict:
+    """
+    Ingest a whole corpus of PDFs into the vector database.
+
+    Extraction runs on a process pool and chunks from all documents share
+    one embedding/upsert pipeline. Files already ingested (same content hash)
+    are skipped.
+
+    Args:
+        source: A directory, a glob pattern (e.g. "docs/**/*.pdf") or a .zip archive
+        workers: Number of extraction processes (0 = number of CPUs)
+
+    Returns:
+        dict: Per-document namespaces/chunk counts and throughput stats (pages/s, chunks/s)
+    """
+    await ctx.info(f"Bulk ingestion from {source}")
+    loop = asyncio.get_running_loop()
+
+    def on_progress(done, total):
+        asyncio.run_coroutine_threadsafe(
+            ctx.report_progress(done, total=total, message=f"Extracted {done}/{total} files"), loop
+        )
+
+    try:
+        stats = await asyncio.to_thread(bulk_ingest, source, workers, on_progress)
+        await ctx.session.send_resource_list_changed()
+        await ctx.info(f"Ingested {stats['files_ingested']} files at {stats['pages_per_s']} pages/s, {stats['chunks_per_s']} chunks/s")
+        return stats
+    except Exception as e:
+        return {"error": f"Error in bulk ingestion: {str(e)}"}
+
 # --------------------------------------------------
 # PDF Q&A Tool (CLIENT PROVIDES METADATA)
 # --------------------------------------------------
 
 @mcp.tool()
+@with_hooks
 async def pdf_qa(pdf_info: dict,question: str,ctx:Context) -> str:
     """
     Smart Q&A tool that answers questions from a processed PDF.
@@ -153,6 +508,9 @@ async def pdf_qa(pdf_info: dict,question: str,ctx:Context) -> str:
     - Simple PDFs:
         Uses full extracted text (from .txt or in-memory content)
         and sends it directly to the LLM.
+    - Local PDFs:
+        Retrieves the best passages from the local passage index
+        and sends only those to the LLM.
     - Vector PDFs:
         Retrieves relevant chunks from the vector database (RAG)
         and generates an answer using those chunks.
@@ -160,9 +518,11 @@ async def pdf_qa(pdf_info: dict,question: str,ctx:Context) -> str:
     Args:
         pdf_info (dict):
             Metadata returned by `process_pdf`, must include:
-            - processing_type: "simple" or "vector"
+            - processing_type: "simple", "local" or "vector"
             - For simple PDFs:
                 - txt_path OR content
+            - For local PDFs:
+                - index_path
             - For vector PDFs:
                 - namespace
         question (str):
@@ -176,29 +536,67 @@ async def pdf_qa(pdf_info: dict,question: str,ctx:Context) -> str:
     processing_type = pdf_info['processing_type']
     await ctx.debug(f"QA Request | Type: {processing_type} | Q: {question}")
     try:
+        # Off the event loop: embedding, query and LLM calls may wait for their rate limits
         if processing_type == "simple":
-            return _pdf_qa_simple(question, pdf_info)
+            return await asyncio.to_thread(_pdf_qa_simple, question, pdf_info)
+
+        if processing_type == "local":
+            return await asyncio.to_thread(_pdf_qa_local, question, pdf_info)
 
         if processing_type == "vector":
-            return _pdf_qa_vector(question, pdf_info)
+            # A queued background ingestion has nothing (or only part) to retrieve yet
+            pending = _ingestion_pending(pdf_info)
+            if pending:
+                return pending
+            return await asyncio.to_thread(_pdf_qa_vector, question, pdf_info)
 
         return "Error: Invalid processing type"
 
     except Exception as e:
         return f"Error answering question: {str(e)}"
 
+def _ingestion_pending(pdf_info: dict) -> str | None:
+    """
+    Message for a vector PDF whose ingestion has not completed (progress of
+    its background job, or the failure); None once the namespace is ready.
+    """
+    job = jobs.get_job(pdf_info["job_id"]) if pdf_info.get("job_id") else None
+    if job and job["status"] in ("queued", "running"):
+        jobs.ensure_worker()
+        if job["chunks_total"]:
+            progress = f"{job['chunks_done']}/{job['chunks_total']} chunks"
+        elif job["pages_total"]:
+            progress = f"{job['pages_done']}/{job['pages_total']} pages"
+        else:
+            progress = job["status"]
+        return (f"The PDF is still ingesting ({progress}). Ask again once "
+                f"ingestion_status(\"{job['job_id']}\") reports \"completed\".")
+    if job and job["status"] == "failed":
+        return f"Error: Ingestion of this PDF failed: {job['error']}"
+
+    entry = namespaces.get(pdf_info["namespace"])
+    if entry and entry["status"] == "ingesting":
+        return "The PDF is still ingesting. Ask again once its ingestion has completed."
+    if entry and entry["status"] == "failed":
+        return f"Error: Ingestion of this PDF failed: {entry.get('error')}"
+    return None
+
 # --------------------------------------------------
 # PDF Text Extraction Tool
 # --------------------------------------------------
 
 @mcp.tool()
+@with_hooks
 async def extract_pdf_text(pdf_path: str,ctx:Context,page_numbers: str = "all",summarization: bool = False) -> str:
     """
     Extract raw text from PDF pages or Extract text from a specific page of a PDF
     
     Args:
         pdf_path: Path to the PDF file
-        page_numbers: Page numbers to extract (e.g., "1,3,5" or "all")
+        page_numbers: Page numbers to extract (e.g., "1,3,5", "2-6" or "all").
+            At most MAX_TOOL_PAGES pages are returned per call; the response
+            ends with the selection to request next. Use `read_pdf_pages`
+            to page through whole documents.
         summarization: Boolen (If user want summary of specific pages summarization = True else False)
     
     Returns:
@@ -206,12 +604,31 @@ async def extract_pdf_text(pdf_path: str,ctx:Context,page_numbers: str = "all",s
     """
     await ctx.info(f"Extracting text from {pdf_path} (Pages: {page_numbers})")
     try:
-        content, status = loader.extract_text_from_pdf(pdf_path, page_numbers)
+        if page_numbers == "all" and not summarization:
+            # Bound the response size: large documents are read page by page
+            window = await asyncio.to_thread(loader.read_pdf_page_window, pdf_path, 1, MAX_TOOL_PAGES)
+            if window["next_page"] is None:
+                return window["content"]
+            return (
+                f"{window['content']}\n\n[Showing pages 1-{window['last_page']} of {window['page_count']}. "
+                f"Call read_pdf_pages with cursor=\"{window['next_page']}\" for more.]"
+            )
+
+        if not summarization:
+            selection = await asyncio.to_thread(loader.read_pdf_selection, pdf_path, page_numbers, MAX_TOOL_PAGES)
+            if not selection["remaining"]:
+                return selection["content"]
+            return (
+                f"{selection['content']}\n\n[Showing pages {loader.format_page_numbers(selection['pages'])} "
+                f"of the selection. Call extract_pdf_text with page_numbers=\"{selection['remaining']}\" for more.]"
+            )
+
+        content, status = await asyncio.to_thread(loader.extract_text_from_pdf, pdf_path, page_numbers)
         if not status:
             return "Error extracting text"
 
         if summarization:
-            return get_pdf_summary(content)
+            return await asyncio.to_thread(get_pdf_summary, content)
 
         return content
 
@@ -220,12 +637,81 @@ async def extract_pdf_text(pdf_path: str,ctx:Context,page_numbers: str = "all",s
 
 
 @mcp.tool()
-async def scrape_web_url(url: str,ctx:Context) -> dict:
+@with_hooks
+def read_pdf_pages(pdf_path: str, cursor: str = "", page_limit: int = 10) -> dict:
+    """
+    Read a PDF page by page (cursor-based pagination).
+
+    Only the requested pages are parsed and returned, so viewing a large
+    document never transfers more than `page_limit` pages at once.
+
+    Args:
+        pdf_path: Path to the PDF file
+        cursor: `next_cursor` from the previous call (empty = first page)
+        page_limit: Maximum pages to return (capped at MAX_TOOL_PAGES)
+
+    Returns:
+        dict: content, first_page, last_page, page_count and next_cursor
+        (null when the end of the document was reached)
+    """
+    try:
+        start = int(cursor) if cursor else 1
+        window = loader.read_pdf_page_window(pdf_path, start, max(1, min(page_limit, MAX_TOOL_PAGES)))
+        next_page = window.pop("next_page")
+        window["next_cursor"] = str(next_page) if next_page else None
+        return window
+    except ValueError:
+        return {"error": f"Invalid cursor: {cursor}"}
+    except Exception as e:
+        return {"error": f"Error reading PDF pages: {str(e)}"}
+
+
+@mcp.tool()
+@with_hooks
+def read_content(txt_path: str, ctx: Context, cursor: str = "", max_chars: int = MAX_TOOL_CHARS) -> dict:
+    """
+    Read stored text (processed PDF text, scraped page, crawl) in slices.
+
+    Args:
+        txt_path: The `txt_path` returned by `process_pdf`, `scrape_web_url` or `crawl_website`
+        cursor: `next_cursor` from the previous call (empty = start of the text)
+        max_chars: Maximum characters to return (capped at MAX_TOOL_CHARS)
+
+    Returns:
+        dict: content, start, end, total_chars and next_cursor (null at the end)
+    """
+    try:
+        start = int(cursor) if cursor else 0
+        text = artifacts.load_text(txt_path)
+        if not 0 <= start <= len(text):
+            return {"error": f"Invalid cursor: {cursor}"}
+        end = min(len(text), start + max(1, min(max_chars, MAX_TOOL_CHARS)))
+        return {
+            "content": text[start:end],
+            "start": start,
+            "end": end,
+            "total_chars": len(text),
+            "next_cursor": str(end) if end < len(text) else None
+        }
+    except ValueError:
+        return {"error": f"Invalid cursor: {cursor}"}
+    except FileNotFoundError:
+        return {"error": f"File not found: {txt_path}"}
+    except Exception as e:
+        return {"error": f"Error reading content: {str(e)}"}
+
+
+@mcp.tool()
+@with_hooks
+async def scrape_web_url(url: str,ctx:Context,refresh: bool = False) -> dict:
     """
     Scrape content from a web URL and save it to a text file.
+    A URL already in the resource registry (compared after normalization)
+    returns its stored result with `reused: True` without fetching.
     
     Args:
         url: The web URL to scrape (e.g., https://example.com/article)
+        refresh: Fetch the page again even if it is already a known resource
     
     Returns:
         dict: Contains status, url, txt_path, title, word_count, and timestamp
@@ -237,52 +723,48 @@ async def scrape_web_url(url: str,ctx:Context) -> dict:
         parsed = urlparse(url)
         if not parsed.scheme or not parsed.netloc:
             return {"error": "Invalid URL format"}
+
+        known = None if refresh else resources.lookup(resources.resource_key("website", url))
+        if known:
+            await ctx.report_progress(1.0, message="Known resource, using stored content")
+            return {**known["metadata"], "resource_id": known["id"], "reused": True}
         
-        # Send request
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        # Send request (pooled session, conditional GET against the HTTP cache)
+        response = await asyncio.to_thread(fetcher.fetch, url)
+
+        # Unchanged page with a previous result: skip parsing entirely
+        previous = response["extra"].get("scrape_result")
+        if response["not_modified"] and previous and artifacts.exists(previous["txt_path"]):
+            await ctx.report_progress(1.0, message="Page not modified, using cached content")
+            return _register_web(url, {**previous, "timestamp": datetime.now().isoformat(), "not_modified": True})
         
         # Parse HTML
         await ctx.report_progress(0.5, message="Parsing HTML...")
 
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer", "header"]):
-            script.decompose()
-        
-        # Extract text
-        text = soup.get_text(separator='\n', strip=True)
-        lines = [line.strip() for line in text.splitlines() if line.strip()]
-        content = '\n'.join(lines)
+        title, content = await asyncio.to_thread(
+            extractors.extract_text, response["content"], None, response["encoding"]
+        )
         
         # Get title
-        title = soup.title.string if soup.title else parsed.netloc
-        
-        # Generate filename from URL hash
-        url_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        safe_title = "".join(c for c in title[:50] if c.isalnum() or c in (' ', '-', '_')).strip()
-        filename = f"web_{safe_title}_{url_hash}.txt"
+        title = title or parsed.netloc
         
-        # Save to file
-        txt_path = Path(filename)
-        txt_path.write_text(content, encoding='utf-8')
+        # Save to the artifact store
+        txt_key = artifacts.put_text(content, source=url, kind="web_text")
 
-        await ctx.report_progress(1.0, message="Saved to file")
+        await ctx.report_progress(1.0, message="Saved to artifact store")
         await ctx.session.send_resource_list_changed()
         
-        return {
+        result = {
             "status": "success",
             "url": url,
-            "txt_path": str(txt_path),
+            "txt_path": txt_key,
             "title": title,
             "word_count": len(content.split()),
             "timestamp": datetime.now().isoformat(),
             "file_size_kb": round(len(content) / 1024, 2)
         }
+        fetcher.remember(url, response["cache_id"], scrape_result=result)
+        return _register_web(url, result)
         
     except requests.exceptions.Timeout:
         return {"error": "Request timeout - website took too long to respond"}
@@ -290,29 +772,97 @@ async def scrape_web_url(url: str,ctx:Context) -> dict:
         return {"error": "Connection error - check your internet or the URL"}
     except requests.exceptions.HTTPError as e:
         return {"error": f"HTTP error: {e.response.status_code}"}
+    except fetcher.ResponseTooLarge as e:
+        return {"error": f"Page too large: {str(e)}"}
     except Exception as e:
         return {"error": f"Error scraping URL: {str(e)}"}
 
 
+def _register_web(url: str, result: dict) -> dict:
+    """Stores a scrape_web_url result in the resource registry; adds its resource_id."""
+    entry = resources.register("website", url, f"Web ({result.get('title') or url[:30]})", result, url=url)
+    return {**entry["metadata"], "resource_id": entry["id"]}
+
+
+@mcp.tool()
+@with_hooks
+async def crawl_website(
+    seed_url: str,
+    ctx: Context,
+    max_depth: int = 2,
+    max_pages: int = 50,
+    same_domain: bool = True,
+    per_host_concurrency: int = 4,
+    delay_seconds: float = 0.5
+) -> dict:
+    """
+    Crawl a website (e.g. a documentation site) starting from a seed URL and
+    combine all pages into one searchable text resource.
+
+    Pages are fetched concurrently with per-host limits, robots.txt is
+    respected, and duplicate URLs/pages are skipped. Use `web_content_qa`
+    with the returned `txt_path` and `index_path` to ask questions.
+    
+    Args:
+        seed_url: The URL to start crawling from
+        max_depth: How many links deep to follow from the seed page
+        max_pages: Maximum number of pages to save
+        same_domain: Only follow links on the seed URL's domain
+        per_host_concurrency: Parallel requests per host
+        delay_seconds: Minimum delay between requests to the same host
+    
+    Returns:
+        dict: status, txt_path, index_path, pages_crawled, throughput and the list of pages
+    """
+    await ctx.info(f"Crawling {seed_url} (depth {max_depth}, max {max_pages} pages)")
+    try:
+        parsed = urlparse(seed_url)
+        if not parsed.scheme or not parsed.netloc:
+            return {"error": "Invalid URL format"}
+
+        async def on_page(saved, total, url):
+            await ctx.report_progress(saved, total=total, message=f"Saved {url}")
+
+        result = await crawl(
+            seed_url,
+            max_depth=max_depth,
+            max_pages=max_pages,
+            same_domain=same_domain,
+            per_host_concurrency=per_host_concurrency,
+            delay=delay_seconds,
+            on_page=on_page
+        )
+        await ctx.session.send_resource_list_changed()
+        return {"status": "success", "timestamp": datetime.now().isoformat(), **result}
+
+    except Exception as e:
+        return {"error": f"Error crawling website: {str(e)}"}
+
+
 @mcp.tool()
-def web_content_qa(txt_path: str, query: str) -> str:
+@with_hooks
+def web_content_qa(txt_path: str, query: str, ctx: Context, index_path: str = "") -> str:
     """
     Answer questions about scraped web content from a text file.
     
     Args:
-        txt_path: Path to the text file containing scraped content
+        txt_path: Artifact key (or path) of the scraped content
         query: User's question about the web content
+        index_path: Passage index returned by `crawl_website`; when given,
+            only the most relevant passages are sent to the LLM
     
     Returns:
         str: Answer to the user's question based on the content
     """
     try:
+        if index_path and artifacts.exists(index_path):
+            return _qa_from_web_index(question=query, index_path=index_path)
+
         # Read the content
-        file_path = Path(txt_path)
-        if not file_path.exists():
+        if not artifacts.exists(txt_path):
             return f"Error: File not found at {txt_path}"
         
-        content = file_path.read_text(encoding='utf-8')
+        content = artifacts.load_text(txt_path)
         
         if not content.strip():
             return "Error: The text file is empty"
@@ -346,16 +896,231 @@ Transcript:
 
 @mcp.resource("file://{filename}")
 def get_file_content(filename: str) -> str:
-    """Read a processed text file"""
-    file_path = Path.cwd() / filename
-    if file_path.exists():
-        return file_path.read_text(encoding="utf-8")
-    return "Error: File not found."
+    """Read the first MAX_TOOL_CHARS characters of a processed text artifact (or legacy text file)"""
+    try:
+        text = artifacts.load_text(filename)
+    except FileNotFoundError:
+        return "Error: File not found."
+    if len(text) <= MAX_TOOL_CHARS:
+        return text
+    return (f"{text[:MAX_TOOL_CHARS]}\n\n[Truncated: {len(text)} characters in total. next_cursor: {MAX_TOOL_CHARS} "
+            f"(read_content), or file://{filename}/range/{MAX_TOOL_CHARS}/{2 * MAX_TOOL_CHARS}]")
+
+@mcp.resource("file://{filename}/range/{start}/{end}")
+def get_file_range(filename: str, start: str, end: str) -> str:
+    """Read characters [start, end) of a processed text artifact"""
+    try:
+        start_i, end_i = int(start), int(end)
+        if start_i < 0 or end_i < start_i:
+            return "Error: Invalid range."
+        if end_i - start_i > MAX_TOOL_CHARS:
+            end_i = start_i + MAX_TOOL_CHARS
+        return artifacts.load_text(filename)[start_i:end_i]
+    except ValueError:
+        return "Error: Invalid range."
+    except FileNotFoundError:
+        return "Error: File not found."
+
+# --------------------------------------------------
+# Instrumentation
+# --------------------------------------------------
+
+@mcp.tool()
+@with_hooks
+def get_metrics(format: str = "json"):
+    """
+    Per-stage latency and throughput metrics of this server process
+    (PDF open/page extraction, chunking, embedding, upsert, vector query,
+    LLM call and time to first token, HTTP fetch, HTML parse, tool calls).
+
+    Args:
+        format: "json" (count, mean, p50/p95/p99 per stage, plus the
+            background job queue and rate-limit buckets) or "prometheus"
+
+    Returns:
+        dict | str: Metrics snapshot
+    """
+    if format == "prometheus":
+        return metrics.render_prometheus()
+    return {**metrics.snapshot(), "jobs": jobs.queue_depth(), "rate_limits": scheduler.status()}
+
+@mcp.resource("metrics://stages", mime_type="application/json")
+def metrics_stages() -> str:
+    """Per-stage latency histograms, counters and gauges as JSON"""
+    return json.dumps(metrics.snapshot(), indent=2)
+
+@mcp.resource("metrics://prometheus", mime_type="text/plain")
+def metrics_prometheus() -> str:
+    """Metrics in Prometheus text exposition format"""
+    return metrics.render_prometheus()
+
+@mcp.tool()
+@with_hooks
+def get_usage(group_by: str = "tool", session: str = "") -> dict:
+    """
+    Token and embedding usage totals, for finding which tool, document or
+    session is consuming the Groq and Pinecone quota.
+
+    Args:
+        group_by: "tool", "resource", "session" or "model"
+        session: Only include this session (empty = all sessions)
+
+    Returns:
+        dict: Per-group LLM calls/prompt/completion tokens and embedding
+        calls/inputs/tokens, overall totals and the configured budgets
+    """
+    if group_by not in ("tool", "resource", "session", "model"):
+        return {"error": f"Invalid group_by: {group_by}"}
+    result = usage.summary(group_by=group_by, session=session or None)
+    if session:
+        result["session_totals"] = usage.session_totals(session)
+    return result
+
+@mcp.resource("usage://totals", mime_type="application/json")
+def usage_totals() -> str:
+    """LLM token and embedding usage per tool"""
+    return json.dumps(usage.summary("tool"), indent=2)
+
+@mcp.tool()
+@with_hooks
+def get_traces(trace_id: str = "", limit: int = 20) -> dict:
+    """
+    Traces of slow tool calls. Tracing is opt-in: set TRACE_TOOLS or
+    TRACE_SAMPLE_RATE on the server, or send `_meta: {"trace": true}`
+    ("profile" to also capture a cProfile dump) with a tool request.
+
+    Args:
+        trace_id: Trace to summarize (empty = list the most recent traces)
+        limit: Number of traces to list
+
+    Returns:
+        dict: Recent traces, or one trace's time per stage (count, total and
+        self time) plus the paths of its Chrome trace file and profile
+    """
+    if not trace_id:
+        return {"traces": tracing.list_traces(limit)}
+    summary = tracing.load_trace(trace_id)
+    if summary is None:
+        return {"error": f"Unknown trace: {trace_id}"}
+    return summary
+
+@mcp.tool()
+@with_hooks
+def list_namespaces() -> dict:
+    """
+    Admin: Pinecone namespaces created by this server, most recently used
+    first, with content hash, source, size, vector count, live reference
+    count and last access.
+
+    Returns:
+        dict: namespaces, total vectors and the eviction settings
+    """
+    entries = namespaces.list_namespaces()
+    return {
+        "namespaces": entries,
+        "total_vectors": sum(e["vectors"] for e in entries),
+        "ttl_days": namespaces.TTL_DAYS,
+        "max_vectors": namespaces.MAX_VECTORS
+    }
+
+@mcp.tool()
+@with_hooks
+def release_namespace(namespace: str, ctx: Context) -> dict:
+    """
+    Drop this session's reference to a namespace (e.g. when the user removes
+    the document). The vectors are deleted once no session references it.
+
+    Args:
+        namespace: Namespace returned by `process_pdf` or `youtube_qa`
+
+    Returns:
+        dict: The remaining reference count
+    """
+    remaining = namespaces.release(namespace)
+    if remaining is None:
+        return {"error": f"Unknown namespace: {namespace}"}
+    return {"namespace": namespace, "refcount": remaining}
+
+@mcp.tool()
+@with_hooks
+def purge_namespace(namespace: str = "", force: bool = False) -> dict:
+    """
+    Admin: delete a namespace's vectors and its local artifacts, or run an
+    eviction pass.
+
+    Args:
+        namespace: Namespace to delete (empty = evict every unreferenced
+            namespace, then least recently used ones above NAMESPACE_MAX_VECTORS)
+        force: Delete the namespace even if sessions still reference it
+
+    Returns:
+        dict: What was purged, or an error
+    """
+    try:
+        if not namespace:
+            return namespaces.evict()
+        return namespaces.purge(namespace, force=force)
+    except Exception as e:
+        return {"error": f"Error purging namespace: {str(e)}"}
+
+@mcp.tool()
+@with_hooks
+def list_resources(ctx: Context, all_sessions: bool = False) -> dict:
+    """
+    Resources (PDFs, videos, websites) this session has added, most recently
+    used first, e.g. to restore the app's resource list after a reload.
+
+    Args:
+        all_sessions: List every known resource, shared by all sessions and users
+
+    Returns:
+        dict: resources with id, type, name, path/url and metadata
+    """
+    entries = resources.list_resources(all_owners=all_sessions)
+    return {
+        "resources": [
+            {field: e[field] for field in ("id", "type", "name", "path", "url", "metadata", "hits") if field in e}
+            for e in entries
+        ]
+    }
+
+@mcp.tool()
+@with_hooks
+def release_resource(resource_id: str, ctx: Context) -> dict:
+    """
+    Remove a resource from this session. It stays available to other
+    sessions; its vectors are deleted once no session references them.
+
+    Args:
+        resource_id: `resource_id` returned when the resource was added
+
+    Returns:
+        dict: The released resource's id and key
+    """
+    entry = resources.release(resource_id)
+    if entry is None:
+        return {"error": f"Unknown resource: {resource_id}"}
+    return {"resource_id": entry["id"], "key": entry["key"], "released": True}
 
 # --------------------------------------------------
 # Server Entry
 # --------------------------------------------------
 
+def main():
+    artifacts.gc()
+    fetcher.gc()
+    resources.gc()
+    namespaces.start_background_eviction()
+    jobs.resume_pending()
+    # stdio (default) spawns one server per client; "http" serves many
+    # sessions from one long-lived process
+    transport = os.getenv("MCP_TRANSPORT", "stdio")
+    if transport == "stdio":
+        mcp.run()
+    else:
+        mcp.run(transport=transport, host=os.getenv("MCP_HOST", "127.0.0.1"), port=int(os.getenv("MCP_PORT", "8000")))
+
+
 if __name__ == "__main__":
-    mcp.run()
+    main()
 
@@ -0,0 +1,377 @@
+"""
+Content-addressed store for extracted text (PDF text, scraped pages, crawls,
+passage indexes).
+
+- Key: SHA-256 of the UTF-8 text, so storing the same text twice is free.
+- Compression: zstd when `zstandard` is installed, gzip otherwise. The codec is
+  recorded per artifact, so stores written with either can be read back.
+- Index: sharded by the first two hex digits of the key (index/<xx>.json),
+  with source, kind, sizes and creation time. A shard is changed only under
+  its cross-process lock, since every stdio server process and the jobs
+  worker write it, and only when an artifact is added or removed.
+- Last access is the blob's mtime: reads and repeated puts refresh it
+  without rewriting the index.
+- Garbage collection by age (last access) and total stored size, plus a
+  sweep of blobs the index does not know (e.g. from a crashed writer). Blobs
+  are deleted outside the index locks.
+- Reads go through an in-process LRU of decoded text bounded in bytes. Entries
+  never go stale because a key always maps to the same content.
+
+Keys look like file names (64 hex chars), so they can be passed anywhere a
+`txt_path` used to be expected and are served by the `file://{filename}`
+resource. `load_text` still accepts the *.txt files older metadata points to,
+but only inside the working directory (where they were written).
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+from utils import tracing
+from utils.state import locked, read_json, state_dir, update_json
+
+try:
+    import zstandard
+    _HAS_ZSTD = True
+except ImportError:
+    _HAS_ZSTD = False
+
+MAX_STORE_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))
+MAX_AGE_DAYS = float(os.getenv("ARTIFACT_MAX_AGE_DAYS", "30"))
+CACHE_BYTES = int(os.getenv("ARTIFACT_CACHE_BYTES", str(64 * 1024 * 1024)))
+CODEC = "zstd" if _HAS_ZSTD else "gzip"
+_EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+_cache = OrderedDict()
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_last_touch = {}
+TOUCH_INTERVAL = 3600   # cached reads refresh the blob mtime at most hourly
+ORPHAN_GRACE = 3600     # unindexed blobs younger than this may be a put in progress
+
+
+def _store_dir() -> Path:
+    return state_dir("artifacts")
+
+
+def _shard_path(key: str) -> Path:
+    return _store_dir() / "index" / f"{key[:2]}.json"
+
+
+def _legacy_index_path() -> Path:
+    return _store_dir() / "index.json"
+
+
+def _migrate_legacy_index() -> None:
+    """Moves the entries of a single index.json (older stores) into the shards."""
+    legacy = _legacy_index_path()
+    if not legacy.exists():
+        return
+    with locked(legacy):
+        entries = read_json(legacy)
+        if entries is None:
+            return
+        by_shard = {}
+        for key, entry in entries.items():
+            by_shard.setdefault(key[:2], {})[key] = entry
+        for prefix, shard_entries in by_shard.items():
+            with update_json(_shard_path(prefix), {}) as shard:
+                for key, entry in shard_entries.items():
+                    shard.setdefault(key, entry)
+        legacy.unlink(missing_ok=True)
+
+
+def _read_shard(key: str) -> dict:
+    _migrate_legacy_index()
+    return read_json(_shard_path(key), {})
+
+
+def _entries() -> dict:
+    """All index entries (a snapshot: each shard is read on its own)."""
+    _migrate_legacy_index()
+    entries = {}
+    for shard in (_store_dir() / "index").glob("??.json"):
+        entries.update(read_json(shard, {}))
+    return entries
+
+
+def _blob_path(key: str, codec: str) -> Path:
+    return _store_dir() / key[:2] / f"{key}{_EXTENSIONS[codec]}"
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if not _HAS_ZSTD:
+            raise RuntimeError("Artifact is zstd-compressed but 'zstandard' is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def is_key(ref: str) -> bool:
+    return len(ref) == 64 and all(c in "0123456789abcdef" for c in ref)
+
+
+def _write_blob(key: str, data: bytes, source: str, kind: str) -> dict:
+    """Writes the compressed blob atomically and returns its index entry."""
+    compressed = _compress(data, CODEC)
+    blob = _blob_path(key, CODEC)
+    blob.parent.mkdir(parents=True, exist_ok=True)
+    tmp = blob.with_name(f".{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp.write_bytes(compressed)
+    os.replace(tmp, blob)
+    return {
+        "source": source,
+        "kind": kind,
+        "size": len(data),
+        "stored_size": len(compressed),
+        "codec": CODEC,
+        "created_at": datetime.now().isoformat()
+    }
+
+
+def put_text(text: str, source: str, kind: str) -> str:
+    """
+    Stores text and returns its key. Storing existing content only refreshes
+    its last access time.
+
+    Args:
+        text (str): Text to store
+        source (str): Where it came from (PDF path, URL, ...)
+        kind (str): Artifact type, e.g. "pdf_text", "web_text", "passage_index"
+
+    Returns:
+        str: Content key (SHA-256 hex)
+    """
+    data = text.encode("utf-8")
+    key = hashlib.sha256(data).hexdigest()
+
+    with tracing.span("artifact_put", kind=kind, size=len(data)):
+        entry = describe(key)
+        if entry is not None:
+            # Known content: refresh its last access, the index stays as it is.
+            # Under the shard lock, so gc cannot remove the blob in between.
+            with locked(_shard_path(key)):
+                try:
+                    os.utime(_blob_path(key, entry["codec"]))
+                    stored = key in read_json(_shard_path(key), {})
+                except FileNotFoundError:
+                    stored = False
+            if stored:
+                _cache_put(key, text)
+                return key
+
+        # Compress and write outside the index lock; the same key always has the same bytes
+        fresh = _write_blob(key, data, source, kind)
+        with update_json(_shard_path(key), {}) as shard:
+            entry = shard.get(key)
+            if entry is None or not _blob_path(key, entry["codec"]).exists():
+                shard[key] = fresh
+
+    _cache_put(key, text)
+    return key
+
+
+def get_text(key: str) -> str:
+    """Returns the text stored under `key` (KeyError if unknown)."""
+    with _cache_lock:
+        text = _cache.get(key)
+        if text is not None:
+            _cache.move_to_end(key)
+    if text is not None:
+        if time.time() - _last_touch.get(key, 0) > TOUCH_INTERVAL:
+            _touch(key)
+        return text
+
+    entry = describe(key)
+    if entry is None:
+        raise KeyError(f"Unknown artifact: {key}")
+
+    with tracing.span("artifact_read", codec=entry["codec"]):
+        try:
+            compressed = _blob_path(key, entry["codec"]).read_bytes()
+        except FileNotFoundError:
+            raise KeyError(f"Artifact was just removed: {key}") from None
+        text = _decompress(compressed, entry["codec"]).decode("utf-8")
+    _touch(key)
+    _cache_put(key, text)
+    return text
+
+
+def _legacy_path(ref: str) -> Path | None:
+    """The *.txt file under the working directory `ref` names, if it is one."""
+    if not ref:
+        return None
+    path = (Path.cwd() / ref).resolve()
+    if path.suffix != ".txt" or not path.is_relative_to(Path.cwd().resolve()):
+        return None
+    return path
+
+
+def exists(ref: str) -> bool:
+    """True if `ref` is a stored artifact key or an existing legacy text file."""
+    if is_key(ref):
+        return ref in _read_shard(ref)
+    path = _legacy_path(ref)
+    return path is not None and path.is_file()
+
+
+def load_text(ref: str) -> str:
+    """
+    Reads text by artifact key, falling back to a *.txt file in the working
+    directory (metadata produced before the artifact store existed). Any
+    other path is refused.
+
+    Raises:
+        FileNotFoundError: neither an artifact nor an allowed legacy file
+    """
+    if is_key(ref):
+        try:
+            return get_text(ref)
+        except KeyError:
+            pass
+    path = _legacy_path(ref)
+    if path is None or not path.is_file():
+        raise FileNotFoundError(f"No artifact or file found for {ref}")
+    return path.read_text(encoding="utf-8")
+
+
+def describe(key: str) -> dict | None:
+    """Index entry (source, kind, sizes, creation time) for a key."""
+    return _read_shard(key).get(key)
+
+
+def delete(key: str) -> bool:
+    """Removes an artifact. Returns False if it did not exist."""
+    with update_json(_shard_path(key), {}) as shard:
+        entry = shard.pop(key, None)
+        if entry is not None:
+            _blob_path(key, entry["codec"]).unlink(missing_ok=True)
+    if entry is None:
+        return False
+    with _cache_lock:
+        _cache_drop(key)
+    return True
+
+
+def gc(max_bytes: int = MAX_STORE_BYTES, max_age_days: float = MAX_AGE_DAYS) -> dict:
+    """
+    Deletes artifacts not accessed for `max_age_days`, then the least recently
+    used ones until the stored size is below `max_bytes`, then blobs that are
+    not in the index (older than ORPHAN_GRACE).
+
+    Decisions are made on a snapshot of the index. Each shard is then locked
+    only to drop the chosen entries that were not accessed since, moving their
+    blobs aside; the blobs are deleted after the lock is released.
+
+    Returns:
+        dict: Number of removed artifacts and orphans, freed bytes and remaining totals
+    """
+    now = time.time()
+    cutoff = now - max_age_days * 86400
+
+    by_age = []
+    for key, entry in _entries().items():
+        try:
+            last_access = _blob_path(key, entry["codec"]).stat().st_mtime
+        except FileNotFoundError:
+            last_access = 0.0       # blob already gone: drop the entry first
+        by_age.append((last_access, key, entry))
+    by_age.sort(key=lambda item: item[0])
+    total = sum(entry["stored_size"] for _, _, entry in by_age)
+
+    doomed = {}     # shard prefix -> {key: last access seen}
+    for last_access, key, entry in by_age:
+        if last_access >= cutoff and total <= max_bytes:
+            break
+        doomed.setdefault(key[:2], {})[key] = last_access
+        total -= entry["stored_size"]
+
+    removed = 0
+    freed = 0
+    trash = []
+    for prefix, keys in doomed.items():
+        with update_json(_shard_path(prefix), {}) as shard:
+            for key, seen in keys.items():
+                entry = shard.get(key)
+                if entry is None:
+                    continue
+                blob = _blob_path(key, entry["codec"])
+                try:
+                    if blob.stat().st_mtime > seen:
+                        continue        # read or stored again since the snapshot: keep it
+                    aside = blob.with_name(f".{blob.name}.{uuid.uuid4().hex}.gc")
+                    os.replace(blob, aside)
+                    trash.append(aside)
+                except FileNotFoundError:
+                    pass
+                del shard[key]
+                removed += 1
+                freed += entry["stored_size"]
+                with _cache_lock:
+                    _cache_drop(key)
+    for path in trash:
+        path.unlink(missing_ok=True)
+
+    # Blobs (and temp files) no index entry points to
+    index = _entries()
+    indexed = {_blob_path(key, entry["codec"]) for key, entry in index.items()}
+    orphans = 0
+    for blob in _store_dir().glob("??/*"):
+        try:
+            stat = blob.stat()
+            if blob in indexed or now - stat.st_mtime < ORPHAN_GRACE:
+                continue
+            blob.unlink()
+        except FileNotFoundError:
+            continue
+        orphans += 1
+        freed += stat.st_size
+
+    stored = sum(entry["stored_size"] for entry in index.values())
+    return {"removed": removed, "orphans": orphans, "freed_bytes": freed, "artifacts": len(index), "stored_bytes": stored}
+
+
+def _touch(key: str) -> None:
+    """Refreshes the last access time (the blob's mtime); the index is not rewritten."""
+    _last_touch[key] = time.time()
+    entry = describe(key)
+    if entry is not None:
+        try:
+            os.utime(_blob_path(key, entry["codec"]))
+        except FileNotFoundError:
+            pass
+
+
+def _cache_put(key: str, text: str) -> None:
+    global _cache_bytes
+    size = len(text)
+    if size > CACHE_BYTES:
+        return
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return
+        _cache[key] = text
+        _cache_bytes += size
+        while _cache_bytes > CACHE_BYTES:
+            _, old = _cache.popitem(last=False)
+            _cache_bytes -= len(old)
+
+
+def _cache_drop(key: str) -> None:
+    global _cache_bytes
+    text = _cache.pop(key, None)
+    if text is not None:
+        _cache_bytes -= len(text)
@@ -0,0 +1,343 @@
+"""
+Background ingestion jobs.
+
+Each stdio client session gets its own short-lived server process, so work
+cannot be left running inside the server. Jobs are persisted as JSON files
+under the state directory and executed by a detached worker process that runs
+a bounded thread pool. The worker keeps a heartbeat file; any server call that
+finds the heartbeat stale starts a new worker, which re-queues jobs left
+"running" by a crashed worker and resumes them from their last upserted chunk
+(at most INGEST_MAX_ATTEMPTS runs per job; then it is marked failed).
+
+A running job is leased to the worker that claimed it: the worker renews the
+lease with its heartbeat and only writes progress or results while the job is
+still its own. Jobs are re-queued only once their lease has expired, so a
+worker that lost the worker lock finishes (and renews) the jobs it already
+started instead of having them run a second time.
+
+Run a worker manually with:
+    python -m services.jobs
+"""
+
+import os
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from services import artifacts, namespaces
+from services.pdf.pdf_ingestion import ingest_pdf
+from utils import scheduler, usage
+from utils.state import STATE_DIR, read_json, state_dir, state_path, update_json, write_json
+
+MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+HEARTBEAT_INTERVAL = 2      # seconds between worker heartbeats
+STALE_AFTER = 30            # heartbeat age after which the worker is considered dead
+IDLE_EXIT_AFTER = 60        # worker exits after this many idle seconds
+MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))   # runs before a job that keeps dying is failed
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def _jobs_dir() -> Path:
+    return state_dir("jobs")
+
+
+def _job_path(job_id: str) -> Path:
+    return _jobs_dir() / f"{job_id}.json"
+
+
+def _lock_path() -> Path:
+    return _jobs_dir() / "worker.lock"
+
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+
+# --------------------------------------------------
+# Server side: enqueue / inspect
+# --------------------------------------------------
+
+def enqueue_ingestion(pdf_path: str, txt_path: str | None = None) -> dict:
+    """
+    Persists a new ingestion job and makes sure a worker is running.
+
+    Args:
+        pdf_path (str): Path to the PDF to ingest into Pinecone
+        txt_path (str | None): Artifact key of the already extracted text;
+            the worker then skips extracting the PDF again
+
+    Returns:
+        dict: The stored job record
+    """
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "kind": "pdf_ingestion",
+        "session": usage.current_scope()["session"],
+        "pdf_path": str(Path(pdf_path).resolve()),
+        "status": "queued",
+        "pages_done": 0,
+        "pages_total": None,
+        "chunks_done": 0,
+        "chunks_total": None,
+        "namespace": None,
+        "chunk_count": None,
+        "txt_path": txt_path,
+        "error": None,
+        "attempts": 0,
+        "created_at": _now(),
+        "updated_at": _now(),
+    }
+    write_json(_job_path(job["job_id"]), job)
+    ensure_worker()
+    return job
+
+
+def get_job(job_id: str) -> dict | None:
+    """Returns the job record, or None if the ID is unknown."""
+    if not job_id.isalnum():
+        return None
+    return read_json(_job_path(job_id))
+
+
+def list_jobs() -> list[dict]:
+    """Returns all job records, oldest first."""
+    jobs = [read_json(p) for p in _jobs_dir().glob("*.json")]
+    jobs = [j for j in jobs if j]
+    return sorted(jobs, key=lambda j: j["created_at"])
+
+
+def queue_depth() -> dict:
+    """Number of queued and running jobs."""
+    counts = {"queued": 0, "running": 0}
+    for job in list_jobs():
+        if job["status"] in counts:
+            counts[job["status"]] += 1
+    return counts
+
+
+def worker_alive() -> bool:
+    """True if a worker has written a heartbeat recently."""
+    lock = read_json(_lock_path())
+    return bool(lock) and time.time() - lock.get("heartbeat", 0) < STALE_AFTER
+
+
+def ensure_worker() -> None:
+    """
+    Starts a detached worker process if none is alive. A duplicate worker
+    started by a concurrent server simply fails to take the lock and exits.
+    """
+    if worker_alive():
+        return
+
+    env = dict(os.environ)
+    env["ANALYZER_STATE_DIR"] = str(STATE_DIR.resolve())
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    log = open(state_path("jobs", "worker.log"), "a", encoding="utf-8")
+
+    kwargs = {}
+    if sys.platform.startswith("win"):
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    subprocess.Popen(
+        [sys.executable, "-m", "services.jobs"],
+        cwd=os.getcwd(),
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=log,
+        stderr=log,
+        **kwargs
+    )
+    log.close()
+
+
+def resume_pending() -> int:
+    """
+    Restarts the worker if unfinished jobs were left behind (e.g. after a
+    crash or reboot). Returns the number of unfinished jobs.
+    """
+    pending = [j for j in list_jobs() if j["status"] in ("queued", "running")]
+    if pending:
+        ensure_worker()
+    return len(pending)
+
+
+# --------------------------------------------------
+# Worker side
+# --------------------------------------------------
+
+class LeaseLost(Exception):
+    """The job was re-queued and claimed by another worker."""
+
+
+def _update(job: dict, **fields) -> None:
+    """
+    Writes `fields` to the job record, provided it is still held by the
+    worker `job` was read or claimed as (raises LeaseLost otherwise).
+    """
+    with update_json(_job_path(job["job_id"]), {}) as stored:
+        if stored.get("worker") != job.get("worker"):
+            raise LeaseLost(job["job_id"])
+        stored.update(fields, updated_at=_now())
+    job.update(stored)
+
+
+def _claim(job_id: str, worker: str) -> dict | None:
+    """Leases a queued job to `worker` and marks it running; None if it is no longer queued."""
+    with update_json(_job_path(job_id), {}) as stored:
+        if stored.get("status") != "queued":
+            return None
+        stored.update(status="running", worker=worker, lease=time.time(),
+                      attempts=stored.get("attempts", 0) + 1, updated_at=_now())
+    return stored
+
+
+def _renew(job_id: str, worker: str) -> None:
+    """Extends the lease of a job `worker` is still running."""
+    with update_json(_job_path(job_id), {}) as stored:
+        if stored.get("worker") == worker and stored.get("status") == "running":
+            stored["lease"] = time.time()
+
+
+def _run_job(job: dict, worker: str) -> None:
+    def on_progress(stage, done, total):
+        if stage == "pages":
+            _update(job, pages_done=done, pages_total=total)
+        else:
+            _update(job, chunks_done=done, chunks_total=total)
+
+    job = _claim(job["job_id"], worker)
+    if job is None:
+        return
+    try:
+        try:
+            with usage.scope("process_pdf", resource=job["pdf_path"], session=job.get("session")), scheduler.batch():
+                txt_path = job.get("txt_path")
+                text = artifacts.load_text(txt_path) if txt_path and artifacts.exists(txt_path) else None
+                result = ingest_pdf(job["pdf_path"], on_progress=on_progress, resume_from=job["chunks_done"], text=text)
+        except LeaseLost:
+            raise
+        except Exception as e:
+            _update(job, status="failed", error=str(e))
+        else:
+            _update(job, status="completed", namespace=result["namespace"], chunk_count=result["chunks"],
+                    txt_path=result.get("txt_path") or txt_path)
+    except LeaseLost:
+        print(f"Job {job['job_id']} was taken over by another worker, dropping this run.")
+
+
+def _requeue_orphaned() -> None:
+    """
+    Re-queues jobs still marked running whose lease has expired: their worker
+    died mid-job. A job that was already started MAX_ATTEMPTS times (e.g. a
+    PDF that crashes the worker) is marked failed instead.
+    """
+    for job in list_jobs():
+        if job["status"] != "running" or time.time() - job.get("lease", 0) < STALE_AFTER:
+            continue
+        try:
+            if job.get("attempts", 0) >= MAX_ATTEMPTS:
+                error = f"Worker died during each of {job['attempts']} attempts"
+                _update(job, status="failed", error=error, worker=None)
+                try:
+                    namespaces.mark_failed(namespaces.namespace_for_hash(namespaces.file_sha256(job["pdf_path"])), error)
+                except OSError:
+                    pass
+            else:
+                _update(job, status="queued", worker=None)
+        except LeaseLost:
+            pass    # renewed or re-queued by another worker since it was listed
+
+
+def _owns_lock() -> bool:
+    return (read_json(_lock_path()) or {}).get("pid") == os.getpid()
+
+
+def _acquire_lock() -> bool:
+    """
+    Takes the worker lock if no live worker holds it. The O_EXCL claim file
+    is held until the lock has been written and read back, and liveness is
+    re-checked after winning the claim, so a spawner that passed an earlier
+    alive check cannot also start.
+    """
+    if worker_alive():
+        return False
+    claim = _lock_path().with_suffix(".claim")
+    try:
+        fd = os.open(claim, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        try:
+            stale = time.time() - claim.stat().st_mtime >= STALE_AFTER
+        except FileNotFoundError:
+            return _acquire_lock()
+        if not stale:
+            return False
+        claim.unlink(missing_ok=True)
+        return _acquire_lock()
+    try:
+        os.close(fd)
+        if worker_alive():
+            return False
+        write_json(_lock_path(), {"pid": os.getpid(), "heartbeat": time.time()})
+        return _owns_lock()
+    finally:
+        claim.unlink(missing_ok=True)
+
+
+def run_worker() -> None:
+    """
+    Worker loop: picks up queued jobs (and jobs orphaned by a dead worker),
+    runs at most MAX_WORKERS at a time and exits after being idle.
+    """
+    if not _acquire_lock():
+        print("Another ingestion worker is running. Exiting.")
+        return
+
+    print(f"Ingestion worker {os.getpid()} started with {MAX_WORKERS} threads.")
+    worker = uuid.uuid4().hex
+    running = {}
+    idle_since = time.time()
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while True:
+            running = {job_id: f for job_id, f in running.items() if not f.done()}
+            for job_id in running:
+                _renew(job_id, worker)
+
+            # A worker that stalled past STALE_AFTER may have been replaced: it
+            # stops taking jobs but keeps renewing the ones it is still running
+            if not _owns_lock():
+                if not running:
+                    print(f"Ingestion worker {os.getpid()} lost the lock, exiting.")
+                    return
+                time.sleep(HEARTBEAT_INTERVAL)
+                continue
+            write_json(_lock_path(), {"pid": os.getpid(), "heartbeat": time.time()})
+
+            _requeue_orphaned()
+            for job in list_jobs():
+                if len(running) >= MAX_WORKERS:
+                    break
+                if job["status"] == "queued" and job["job_id"] not in running:
+                    running[job["job_id"]] = pool.submit(_run_job, job, worker)
+
+            if running:
+                idle_since = time.time()
+            elif time.time() - idle_since > IDLE_EXIT_AFTER:
+                break
+
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    if _owns_lock():
+        _lock_path().unlink(missing_ok=True)
+        print(f"Ingestion worker {os.getpid()} idle, exiting.")
+
+
+if __name__ == "__main__":
+    run_worker()
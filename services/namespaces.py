@@ -0,0 +1,352 @@
+"""
+Registry of the Pinecone namespaces this server has created.
+
+PDF namespaces are derived from the file's SHA-256 (`pdf_<hash>`), so the
+same document uploaded twice, under any temp file name and by any user,
+maps to one namespace and is embedded once. Video namespaces are
+`yt_<video_id>`.
+
+Each entry records the content hash, source, size, vector count, the local
+artifacts that belong to it, and one reference per owner (the usage
+session) with that owner's last access. An owner's reference expires after
+TTL_DAYS without access, or when it is released. A namespace with no live
+references is evicted: its vectors are deleted from Pinecone and its
+artifacts are removed. When the registry holds more than MAX_VECTORS,
+least recently used namespaces are evicted as well, unreferenced ones
+first.
+
+The registry is <state>/namespaces/registry.json; every change is made
+under its cross-process lock (`utils.state.locked`), since stdio server
+processes, the jobs worker and bulk ingestion all write it. Eviction runs
+in a background thread of the server, at most once per GC_INTERVAL across
+all processes (see `start_background_eviction`).
+
+Environment:
+    NAMESPACE_TTL_DAYS        days an owner's reference lives without access (default 14)
+    NAMESPACE_MAX_VECTORS     vectors kept across all namespaces, 0 = unlimited (default 300000)
+    NAMESPACE_GC_INTERVAL     seconds between background eviction runs (default 3600)
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from pinecone import Pinecone
+
+from services import artifacts
+from utils import metrics, usage
+from utils.state import locked, read_json, state_dir, update_json
+
+TTL_DAYS = float(os.getenv("NAMESPACE_TTL_DAYS", "14"))
+MAX_VECTORS = int(os.getenv("NAMESPACE_MAX_VECTORS", "300000"))
+GC_INTERVAL = float(os.getenv("NAMESPACE_GC_INTERVAL", "3600"))
+TOUCH_INTERVAL = 300    # queries refresh last_access at most every 5 minutes per namespace
+
+_last_touch = {}
+_gc_thread = None
+
+
+def _registry_path() -> Path:
+    return state_dir("namespaces") / "registry.json"
+
+
+def _gc_path() -> Path:
+    return state_dir("namespaces") / "gc.json"
+
+
+def _owner(owner: str | None) -> str:
+    return owner or usage.current_scope()["session"]
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file's bytes, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def namespace_for_hash(sha: str) -> str:
+    """Namespace of a PDF with this content hash."""
+    return f"pdf_{sha[:32]}"
+
+
+def get(namespace: str) -> dict | None:
+    return read_json(_registry_path(), {}).get(namespace)
+
+
+def refcount(entry: dict, now: float | None = None) -> int:
+    """Owners whose reference has not expired."""
+    cutoff = (now or time.time()) - TTL_DAYS * 86400
+    return sum(1 for last in entry["owners"].values() if last >= cutoff)
+
+
+def acquire(namespace: str, kind: str, content_hash: str, source: str, size_bytes: int = 0,
+            owner: str | None = None) -> dict:
+    """
+    Adds (or refreshes) the caller's reference to a namespace, creating the
+    entry with status "ingesting" if it is new (or failed, or being purged).
+
+    Args:
+        namespace (str): Pinecone namespace
+        kind (str): "pdf" or "youtube"
+        content_hash (str): SHA-256 of the PDF, or the video ID
+        source (str): File name or URL, for display
+        size_bytes (int): Size of the source document
+        owner (str | None): Reference holder (default: the usage session)
+
+    Returns:
+        dict: The registry entry
+    """
+    now = time.time()
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None or entry["status"] in ("purging", "failed"):
+            entry = {
+                "namespace": namespace,
+                "kind": kind,
+                "content_hash": content_hash,
+                "source": source,
+                "size_bytes": size_bytes,
+                "vectors": 0,
+                "status": "ingesting",
+                "artifacts": [],
+                "owners": {},
+                "created_at": datetime.now().isoformat()
+            }
+        entry["owners"][_owner(owner)] = now
+        entry["last_access"] = now
+        registry[namespace] = entry
+    return entry
+
+
+def reuse(namespace: str, owner: str | None = None) -> dict | None:
+    """
+    The entry of a fully ingested namespace, with the caller's reference
+    added; None if the namespace is unknown or not ready yet.
+    """
+    with locked(_registry_path()):
+        entry = get(namespace)
+        if not entry or entry["status"] != "ready":
+            return None
+        entry = acquire(namespace, entry["kind"], entry["content_hash"], entry["source"], entry["size_bytes"], owner)
+    metrics.inc("namespace_reused")
+    return entry
+
+
+def mark_ready(namespace: str, vectors: int) -> None:
+    """Records a completed ingestion."""
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None:
+            return
+        entry["status"] = "ready"
+        entry["vectors"] = vectors
+        entry["ready_at"] = datetime.now().isoformat()
+
+
+def mark_failed(namespace: str, error: str, owner: str | None = None) -> None:
+    """
+    Records a failed ingestion and drops the caller's reference, so the
+    namespace is not reused and is evicted (with any partial vectors)
+    once nobody else references it.
+    """
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None or entry["status"] == "ready":
+            return
+        entry["status"] = "failed"
+        entry["error"] = error
+        entry["owners"].pop(_owner(owner), None)
+
+
+def attach_artifacts(namespace: str, keys: list[str]) -> None:
+    """Artifacts deleted together with the namespace (e.g. the extracted text)."""
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None:
+            return
+        entry["artifacts"] = sorted(set(entry["artifacts"]) | set(keys))
+
+
+def touch(namespace: str, owner: str | None = None) -> None:
+    """Marks a namespace (and the caller's reference) as used; throttled per process."""
+    now = time.time()
+    if now - _last_touch.get(namespace, 0) < TOUCH_INTERVAL:
+        return
+    _last_touch[namespace] = now
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None:
+            return
+        entry["owners"][_owner(owner)] = now
+        entry["last_access"] = now
+
+
+def release(namespace: str, owner: str | None = None) -> int | None:
+    """
+    Drops the caller's reference. Returns the remaining reference count
+    (None if the namespace is unknown). Unreferenced namespaces are deleted
+    by the next eviction run.
+    """
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None:
+            return None
+        entry["owners"].pop(_owner(owner), None)
+    return refcount(entry)
+
+
+def list_namespaces() -> list[dict]:
+    """All registry entries with their live reference count, most recently used first."""
+    now = time.time()
+    entries = [{**e, "refcount": refcount(e, now)} for e in read_json(_registry_path(), {}).values()]
+    return sorted(entries, key=lambda e: e.get("last_access", 0), reverse=True)
+
+
+def _delete_vectors(namespace: str) -> None:
+    # Imported here: pdf_ingestion itself uses this registry
+    from services.pdf.pdf_ingestion import API_KEY, INDEX_NAME
+
+    index = Pinecone(api_key=API_KEY).Index(INDEX_NAME)
+    try:
+        index.delete(delete_all=True, namespace=namespace)
+    except Exception as e:
+        # Deleting a namespace Pinecone no longer has is not an error
+        if getattr(e, "status", None) != 404 and getattr(e, "status_code", None) != 404:
+            raise
+
+
+def purge(namespace: str, force: bool = False, unused_since: float | None = None) -> dict:
+    """
+    Deletes a namespace's vectors and artifacts and removes it from the registry.
+
+    The entry is re-checked and marked "purging" under the registry lock, so
+    a namespace that was referenced in the meantime is never deleted by a
+    decision made on older data. A namespace acquired while its vectors are
+    being deleted starts over as a new ingestion. If the deletion fails, the
+    entry gets its previous status back and the error is raised.
+
+    Args:
+        namespace (str): Namespace to delete
+        force (bool): Delete even if owners still reference it
+        unused_since (float | None): Only delete if the namespace has not
+            been accessed after this time (used by LRU eviction)
+
+    Returns:
+        dict: {"namespace", "purged", "vectors", "artifacts"} or {"error"}
+    """
+    with update_json(_registry_path(), {}) as registry:
+        entry = registry.get(namespace)
+        if entry is None:
+            return {"error": f"Unknown namespace: {namespace}"}
+        if entry["status"] == "purging":
+            return {"error": f"Namespace {namespace} is already being purged"}
+        live = refcount(entry)
+        if live and not force:
+            return {"error": f"Namespace {namespace} is referenced by {live} owner(s); use force to delete it anyway"}
+        if unused_since is not None and entry.get("last_access", 0) > unused_since:
+            return {"error": f"Namespace {namespace} was used since the eviction decision"}
+        previous = entry["status"]
+        entry["status"] = "purging"
+
+    try:
+        with metrics.timed("namespace_purge"):
+            _delete_vectors(namespace)
+            removed_artifacts = sum(1 for key in entry["artifacts"] if artifacts.delete(key))
+    except Exception:
+        # Not left "purging" for good: the next purge or eviction pass retries it
+        with update_json(_registry_path(), {}) as registry:
+            current = registry.get(namespace)
+            if current is not None and current["status"] == "purging":
+                current["status"] = previous
+        raise
+    with update_json(_registry_path(), {}) as registry:
+        current = registry.get(namespace)
+        if current is not None and current["status"] == "purging":
+            registry.pop(namespace)
+    _last_touch.pop(namespace, None)
+    metrics.inc("namespaces_evicted")
+    return {"namespace": namespace, "purged": True, "vectors": entry["vectors"], "artifacts": removed_artifacts}
+
+
+def evict(max_vectors: int = MAX_VECTORS) -> dict:
+    """
+    Purges namespaces without live references, then the least recently used
+    ones until at most `max_vectors` vectors remain (0 = no size limit).
+    Each decision is re-checked by `purge` under the registry lock.
+
+    Returns:
+        dict: Purged namespaces, errors and the remaining totals
+    """
+    now = time.time()
+    entries = sorted(read_json(_registry_path(), {}).values(), key=lambda e: e.get("last_access", 0))
+    total = sum(e["vectors"] for e in entries)
+
+    # Unreferenced first (oldest first), then everything else in LRU order
+    candidates = [e for e in entries if not refcount(e, now)] + [e for e in entries if refcount(e, now)]
+    purged, errors = [], []
+    for entry in candidates:
+        unreferenced = not refcount(entry, now)
+        over_limit = max_vectors and total > max_vectors
+        if not unreferenced and not over_limit:
+            continue
+        if entry["status"] != "ready" and not unreferenced:
+            continue        # never evict a live ingestion to make room
+        try:
+            # Unreferenced: purge re-checks the refcount. LRU: only if still unused since the snapshot.
+            if unreferenced:
+                result = purge(entry["namespace"])
+            else:
+                result = purge(entry["namespace"], force=True, unused_since=entry.get("last_access", 0))
+        except Exception as e:
+            errors.append({"namespace": entry["namespace"], "error": str(e)})
+            continue
+        if "error" in result:
+            continue        # referenced or used meanwhile: keep it
+        purged.append(entry["namespace"])
+        total -= entry["vectors"]
+
+    return {"purged": purged, "errors": errors, "namespaces": len(entries) - len(purged), "vectors": total}
+
+
+def _claim_gc_run(interval: float) -> bool:
+    """True if no process has run eviction in the last `interval` seconds (and records this run)."""
+    now = time.time()
+    with update_json(_gc_path(), {}) as gc_state:
+        if now - gc_state.get("last_run", 0) < interval:
+            return False
+        gc_state["last_run"] = now
+    return True
+
+
+def start_background_eviction(interval: float = GC_INTERVAL) -> None:
+    """
+    Runs `evict` on a daemon thread every `interval` seconds. Every stdio
+    tool call starts a server process, so a run is skipped unless no process
+    has evicted in the last `interval` seconds (timestamp in <state>/namespaces/gc.json).
+    """
+    global _gc_thread
+    if _gc_thread is not None:
+        return
+
+    def loop():
+        while True:
+            try:
+                if not _claim_gc_run(interval):
+                    time.sleep(interval)
+                    continue
+                result = evict()
+                if result["purged"] or result["errors"]:
+                    print(f"[namespaces] evicted {len(result['purged'])}, errors {len(result['errors'])}", file=sys.stderr)
+            except Exception as e:
+                print(f"[namespaces] eviction failed: {e}", file=sys.stderr)
+            time.sleep(interval)
+
+    _gc_thread = threading.Thread(target=loop, name="namespace-eviction", daemon=True)
+    _gc_thread.start()
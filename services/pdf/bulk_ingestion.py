@@ -0,0 +1,309 @@
+"""
+Bulk ingestion of a whole PDF corpus into Pinecone.
+
+Text extraction and chunking run on a process pool (pypdf is CPU bound), while
+the main process feeds one shared embedding/upsert pipeline. Records from all
+documents go into the same buffer, so a folder of one-page PDFs still sends
+full BATCH_SIZE embedding requests. Namespaces are content hashes, and
+files whose namespace is already ready in the namespace registry are
+skipped (the caller just gets a reference to them).
+
+A failed embedding or upsert batch fails only the documents it carried:
+they are listed under "errors" and their namespaces marked failed, and the
+rest of the corpus carries on.
+
+Usage:
+    python -m services.pdf.bulk_ingestion ./contracts
+    python -m services.pdf.bulk_ingestion "./reports/**/*.pdf" --workers 8
+    python -m services.pdf.bulk_ingestion customer_docs.zip
+
+Zip archives are extracted into a per-run folder of the state directory that
+is removed when the run ends; archives with more than BULK_MAX_ZIP_MEMBERS
+PDFs or BULK_MAX_ZIP_MB of uncompressed PDFs are rejected before extraction.
+"""
+
+import argparse
+import glob
+import multiprocessing
+import os
+import shutil
+import time
+import uuid
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator
+
+from pinecone import Pinecone
+
+from services.pdf.chunker import chunk_text
+from services.pdf.loader import extract_text_from_pdf
+from services.pdf.pdf_ingestion import (
+    API_KEY, BATCH_SIZE, INDEX_NAME, _embed_passages, _ensure_index, _upsert
+)
+from services import namespaces
+from services.namespaces import file_sha256
+from utils import metrics, scheduler
+from utils.state import state_path
+
+MAX_ZIP_MEMBERS = int(os.getenv("BULK_MAX_ZIP_MEMBERS", "1000"))
+MAX_ZIP_BYTES = int(os.getenv("BULK_MAX_ZIP_MB", "2048")) * 1024 * 1024
+
+
+@contextmanager
+def resolve_sources(source: str) -> Iterator[list[Path]]:
+    """
+    Expands a directory, glob pattern or .zip archive into a list of PDF paths.
+    Zip archives are extracted into a folder of the state directory that is
+    removed when the block exits.
+
+    Raises:
+        ValueError: If a zip archive exceeds MAX_ZIP_MEMBERS or MAX_ZIP_BYTES
+    """
+    path = Path(source)
+
+    if path.is_file() and zipfile.is_zipfile(path):
+        target = state_path("bulk_extract", uuid.uuid4().hex)
+        try:
+            yield _extract_zip(path, target)
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+    elif path.is_dir():
+        yield sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf")
+    elif path.is_file():
+        yield [path]
+    else:
+        yield sorted(Path(p) for p in glob.glob(source, recursive=True) if p.lower().endswith(".pdf"))
+
+
+def _extract_zip(path: Path, target: Path) -> list[Path]:
+    with zipfile.ZipFile(path) as archive:
+        members = [m for m in archive.infolist() if not m.is_dir() and m.filename.lower().endswith(".pdf")]
+        # Declared sizes are binding: zipfile stops reading a member at its file_size
+        if len(members) > MAX_ZIP_MEMBERS:
+            raise ValueError(f"Archive has {len(members)} PDFs, more than the limit of {MAX_ZIP_MEMBERS}")
+        size = sum(m.file_size for m in members)
+        if size > MAX_ZIP_BYTES:
+            raise ValueError(f"Archive expands to {size} bytes of PDFs, more than the limit of {MAX_ZIP_BYTES}")
+
+        target.mkdir(parents=True, exist_ok=True)
+        for member in members:
+            # Guard against "../" entries escaping the extraction folder
+            if not (target / member.filename).resolve().is_relative_to(target):
+                continue
+            archive.extract(member, target)
+    return sorted(p for p in target.rglob("*") if p.suffix.lower() == ".pdf")
+
+
+def _extract_and_chunk(pdf_path: str) -> dict:
+    """Process pool worker: extract text and split it into chunks."""
+    try:
+        text, status = extract_text_from_pdf(pdf_path)
+        if not status:
+            return {"pdf_path": pdf_path, "error": text}
+        return {
+            "pdf_path": pdf_path,
+            "pages": text.count("--- Page "),
+            "chunks": chunk_text(text)
+        }
+    finally:
+        # Pool workers exit without running atexit handlers
+        metrics.flush()
+
+
+@scheduler.batch()
+def bulk_ingest(source: str, workers: int = 0, on_progress=None) -> dict:
+    """
+    Ingests every new PDF found in `source`.
+
+    Args:
+        source (str): Directory, glob pattern or .zip archive
+        workers (int): Extraction processes (0 = os.cpu_count())
+        on_progress (callable | None): Called as on_progress(done_files, total_files)
+
+    Returns:
+        dict: Per-document results and throughput statistics
+    """
+    started = time.perf_counter()
+    with resolve_sources(source) as files:
+        return _ingest_files(source, files, workers, on_progress, started)
+
+
+def _ingest_files(source: str, files: list[Path], workers: int, on_progress, started: float) -> dict:
+    # Hash first so duplicate files inside the same batch are only ingested once
+    todo = {}
+    skipped = []
+    for f in files:
+        sha = file_sha256(str(f))
+        if sha in todo or namespaces.reuse(namespaces.namespace_for_hash(sha)):
+            skipped.append(str(f))
+        else:
+            todo[sha] = str(f)
+
+    stats = {
+        "source": source,
+        "files_found": len(files),
+        "files_skipped": len(skipped),
+        "files_ingested": 0,
+        "files_failed": 0,
+        "pages": 0,
+        "chunks": 0,
+        "embed_batches": 0,
+        "documents": [],
+        "errors": []
+    }
+    if not todo:
+        return _finish(stats, started)
+
+    pc = Pinecone(api_key=API_KEY)
+    _ensure_index(pc)
+    index = pc.Index(INDEX_NAME)
+
+    buffer = []
+    remaining = {}          # sha -> chunks of that document not yet upserted
+    documents = {}          # sha -> result entry
+    completed = set()       # shas marked ready in the namespace registry
+    failed = set()          # shas whose namespace was marked failed
+
+    def fail(sha: str, pdf_path: str, error: Exception | str):
+        if sha in failed:
+            return
+        failed.add(sha)
+        remaining.pop(sha, None)
+        stats["files_failed"] += 1
+        stats["errors"].append({"pdf_path": pdf_path, "error": str(error)})
+        if sha in documents:
+            namespaces.mark_failed(documents[sha]["namespace"], str(error))
+
+    def flush():
+        if not buffer:
+            return
+        batch = [r for r in buffer if r["sha"] not in failed]
+        buffer.clear()
+        if not batch:
+            return
+        try:
+            embeddings = _embed_passages(pc, [r["text"] for r in batch])
+        except Exception as e:
+            for sha in {r["sha"] for r in batch}:
+                fail(sha, documents[sha]["pdf_path"], e)
+            return
+        by_namespace = defaultdict(list)
+        for i, r in enumerate(batch):
+            by_namespace[r["namespace"]].append(r | {"values": embeddings[i]["values"]})
+        stats["embed_batches"] += 1
+
+        for namespace, records in by_namespace.items():
+            sha = records[0]["sha"]
+            try:
+                _upsert(index, [{"id": r["id"], "values": r["values"], "metadata": r["metadata"]} for r in records], namespace)
+            except Exception as e:
+                fail(sha, documents[sha]["pdf_path"], e)
+                continue
+            if sha not in failed:
+                remaining[sha] -= len(records)
+        _record_completed(remaining, documents, completed)
+
+    workers = workers or os.cpu_count() or 1
+    try:
+        # Spawned, not forked: the caller (the server) already runs threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = {pool.submit(_extract_and_chunk, path): sha for sha, path in todo.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                sha = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"pdf_path": todo[sha], "error": str(e)}
+
+                if "error" in result:
+                    fail(sha, result["pdf_path"], result["error"])
+                else:
+                    try:
+                        pdf_file = Path(result["pdf_path"])
+                        namespace = namespaces.namespace_for_hash(sha)
+                        namespaces.acquire(namespace, "pdf", sha, pdf_file.name, pdf_file.stat().st_size)
+                        stats["pages"] += result["pages"]
+                        stats["chunks"] += len(result["chunks"])
+                        documents[sha] = {
+                            "pdf_path": result["pdf_path"],
+                            "namespace": namespace,
+                            "page_count": result["pages"],
+                            "chunk_count": len(result["chunks"]),
+                            "ingested_at": datetime.now().isoformat()
+                        }
+                        # Count first: a flush in the middle of this loop must not see
+                        # the document as complete while chunks are still being added
+                        non_empty = [(i, chunk) for i, chunk in enumerate(result["chunks"]) if chunk.strip()]
+                        remaining[sha] = len(non_empty)
+                        for i, chunk in non_empty:
+                            if sha in failed:
+                                break
+                            buffer.append({
+                                "sha": sha,
+                                "namespace": namespace,
+                                "id": f"{namespace}_{i}",
+                                "text": chunk,
+                                "metadata": {"pdf_name": pdf_file.name, "chunk_index": i, "text": chunk}
+                            })
+                            if len(buffer) >= BATCH_SIZE:
+                                flush()
+                    except Exception as e:
+                        fail(sha, result["pdf_path"], e)
+                    _record_completed(remaining, documents, completed)
+
+                if on_progress:
+                    on_progress(done, len(todo))
+
+        flush()
+    finally:
+        # Interrupted run: nothing may stay "ingesting" in the registry
+        for sha in documents.keys() - completed - failed:
+            namespaces.mark_failed(documents[sha]["namespace"], "bulk ingestion interrupted")
+
+    stats["files_ingested"] = len(completed)
+    stats["documents"] = [documents[d] for d in documents if d in completed]
+    return _finish(stats, started)
+
+
+def _record_completed(remaining: dict, documents: dict, completed: set) -> None:
+    for sha, left in remaining.items():
+        if left == 0 and sha not in completed:
+            namespaces.mark_ready(documents[sha]["namespace"], documents[sha]["chunk_count"])
+            completed.add(sha)
+
+
+def _finish(stats: dict, started: float) -> dict:
+    elapsed = time.perf_counter() - started
+    stats["elapsed_s"] = round(elapsed, 2)
+    stats["pages_per_s"] = round(stats["pages"] / elapsed, 2) if elapsed else 0.0
+    stats["chunks_per_s"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest PDFs into Pinecone")
+    parser.add_argument("source", help="Directory, glob pattern or .zip archive")
+    parser.add_argument("--workers", type=int, default=0, help="Extraction processes (default: CPU count)")
+    args = parser.parse_args()
+
+    stats = bulk_ingest(
+        args.source,
+        workers=args.workers,
+        on_progress=lambda done, total: print(f"Extracted {done}/{total} files", flush=True)
+    )
+
+    print(f"\nFiles: {stats['files_found']} found, {stats['files_ingested']} ingested, "
+          f"{stats['files_skipped']} skipped (already ingested), {stats['files_failed']} failed")
+    print(f"Pages: {stats['pages']} | Chunks: {stats['chunks']} | Embed batches: {stats['embed_batches']}")
+    print(f"Elapsed: {stats['elapsed_s']}s | {stats['pages_per_s']} pages/s | {stats['chunks_per_s']} chunks/s")
+    for err in stats["errors"]:
+        print(f"  ❌ {err['pdf_path']}: {err['error']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+from utils import metrics
+
+
+@metrics.timed("chunking")
 def chunk_text(
     text: str,
     chunk_size: int = 2000,
@@ -25,3 +29,61 @@ def chunk_text(
         start = end - overlap
 
     return chunks
+
+
+@metrics.timed("chunking")
+def chunk_segments(
+    segments: list[dict],
+    chunk_size: int = 200,
+    overlap: int = 40
+) -> list[dict]:
+    """
+    Groups timed segments (e.g. transcript snippets) into overlapping chunks
+    of about `chunk_size` words, keeping the time span of each chunk.
+    Segments are never split, so chunk boundaries fall on segment boundaries.
+
+    Args:
+        segments (list[dict]): Items with "text", "start" and "duration" (seconds)
+        chunk_size (int): Target number of words per chunk
+        overlap (int): Approximate number of words repeated from the previous chunk
+
+    Returns:
+        list[dict]: Chunks with "text", "start" and "end"
+    """
+    chunks = []
+    current = []
+    words = 0
+
+    for segment in segments:
+        text = segment["text"].strip()
+        if not text:
+            continue
+        current.append(segment)
+        words += len(text.split())
+
+        if words >= chunk_size:
+            chunks.append(_segment_chunk(current))
+            # Carry the trailing segments that fit in `overlap` words into the next chunk
+            carried = []
+            carried_words = 0
+            for previous in reversed(current):
+                n = len(previous["text"].split())
+                if carried_words + n > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_words += n
+            current, words = carried, carried_words
+
+    if current and (not chunks or words > overlap):
+        chunks.append(_segment_chunk(current))
+
+    return chunks
+
+
+def _segment_chunk(segments: list[dict]) -> dict:
+    last = segments[-1]
+    return {
+        "text": " ".join(s["text"].strip() for s in segments),
+        "start": segments[0]["start"],
+        "end": last["start"] + last.get("duration", 0)
+    }
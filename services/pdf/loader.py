@@ -1,6 +1,59 @@
 from pathlib import Path
-from typing import Union
+from typing import Iterator, Union
 import pypdf
+from utils import metrics, tracing
+
+
+def parse_page_numbers(page_numbers: Union[str, list[int]], page_count: int) -> list[int]:
+    """
+    Converts a page selection into 0-based page indexes.
+
+    Args:
+        page_numbers (str | list[int]): "all", a list of 1-based page numbers,
+            or a string of numbers and ranges such as "1,3,5-8"
+        page_count (int): Number of pages in the document
+
+    Returns:
+        list[int]: 0-based indexes (out-of-range pages are dropped)
+    """
+    if page_numbers == "all":
+        return list(range(page_count))
+
+    if isinstance(page_numbers, list):
+        pages = [p - 1 for p in page_numbers]
+    else:
+        pages = []
+        for part in page_numbers.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" in part:
+                start, end = part.split("-", 1)
+                # Clamped before expanding: "1-999999999" must not build a huge list
+                first, last = max(int(start), 1), min(int(end), page_count)
+                if first <= last:
+                    pages.extend(range(first - 1, last))
+            else:
+                pages.append(int(part) - 1)
+
+    return [p for p in pages if 0 <= p < page_count]
+
+
+def iter_pdf_pages(reader: pypdf.PdfReader, pages: list[int]) -> Iterator[tuple[int, str]]:
+    """
+    Lazily yields (1-based page number, text) for the selected pages,
+    skipping pages without text. Only the pages asked for are parsed.
+    """
+    for page_num in pages:
+        with metrics.timed("pdf_page_extract"):
+            page_text = reader.pages[page_num].extract_text()
+        metrics.inc("pdf_pages_extracted")
+        if page_text:
+            yield page_num + 1, page_text
+
+
+def _format_pages(pages: Iterator[tuple[int, str]]) -> str:
+    return "".join(f"--- Page {num} ---\n{text}\n\n" for num, text in pages)
 
 
 def extract_text_from_pdf(
@@ -12,7 +65,8 @@ def extract_text_from_pdf(
 
     Args:
         pdf_path (str): Path to the PDF file
-        page_numbers (str | list[int]): "all" or list of page numbers (1-based)
+        page_numbers (str | list[int]): "all", list of page numbers (1-based)
+            or a string such as "1,3,5-8"
 
     Returns:
         str: Extracted text or error message
@@ -24,27 +78,93 @@ def extract_text_from_pdf(
         return f"Error: PDF file not found at {pdf_path}",status
 
     try:
-        reader = pypdf.PdfReader(pdf_file)
+        with metrics.timed("pdf_open"):
+            reader = pypdf.PdfReader(pdf_file)
         status=True
         # Determine pages to extract
-        if page_numbers == "all":
-            pages = range(len(reader.pages))
-        elif isinstance(page_numbers, list):
-            pages = [p - 1 for p in page_numbers]
-        else:
-            pages = [int(p.strip()) - 1 for p in page_numbers.split(",")]
-
-        extracted_text = ""
+        pages = parse_page_numbers(page_numbers, len(reader.pages))
 
-        for page_num in pages:
-            if 0 <= page_num < len(reader.pages):
-                page_text = reader.pages[page_num].extract_text()
-                if page_text:
-                    extracted_text += f"--- Page {page_num + 1} ---\n"
-                    extracted_text += page_text + "\n\n"
+        with tracing.span("pdf_extract_pages", pages=len(pages)):
+            extracted_text = _format_pages(iter_pdf_pages(reader, pages))
 
         return extracted_text.strip() if extracted_text else "No text extracted.",status
 
     except Exception as e:
         status=False
         return f"Error while extracting PDF text: {e}",status
+
+
+def read_pdf_page_window(pdf_path: str, start_page: int, page_limit: int) -> dict:
+    """
+    Extracts a window of consecutive pages, for paginated reads.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        start_page (int): First page to read (1-based)
+        page_limit (int): Maximum number of pages to read
+
+    Returns:
+        dict: content, first_page, last_page, page_count and next_page
+        (None when the end of the document was reached)
+    """
+    pdf_file = Path(pdf_path)
+    if not pdf_file.exists():
+        raise FileNotFoundError(f"PDF file not found at {pdf_path}")
+
+    with metrics.timed("pdf_open"):
+        reader = pypdf.PdfReader(pdf_file)
+    page_count = len(reader.pages)
+    first = max(1, start_page)
+    last = min(page_count, first + page_limit - 1)
+    content = _format_pages(iter_pdf_pages(reader, list(range(first - 1, last))))
+
+    return {
+        "content": content.strip() if content else "No text extracted.",
+        "first_page": first,
+        "last_page": last,
+        "page_count": page_count,
+        "next_page": last + 1 if last < page_count else None
+    }
+
+
+def format_page_numbers(pages: list[int]) -> str:
+    """Formats 1-based page numbers as a compact selection such as "1,3,5-8"."""
+    parts = []
+    for page in pages:
+        if parts and page == parts[-1][1] + 1:
+            parts[-1][1] = page
+        else:
+            parts.append([page, page])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in parts)
+
+
+def read_pdf_selection(pdf_path: str, page_numbers: Union[str, list[int]], page_limit: int) -> dict:
+    """
+    Extracts at most `page_limit` pages of a page selection.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        page_numbers (str | list[int]): Selection as accepted by `parse_page_numbers`
+        page_limit (int): Maximum number of pages to read
+
+    Returns:
+        dict: content, pages (1-based numbers read), page_count and
+        remaining (selection of the pages not read, "" when none are left)
+    """
+    pdf_file = Path(pdf_path)
+    if not pdf_file.exists():
+        raise FileNotFoundError(f"PDF file not found at {pdf_path}")
+
+    with metrics.timed("pdf_open"):
+        reader = pypdf.PdfReader(pdf_file)
+    selected = parse_page_numbers(page_numbers, len(reader.pages))
+    pages, rest = selected[:page_limit], selected[page_limit:]
+    with tracing.span("pdf_extract_pages", pages=len(pages)):
+        content = _format_pages(iter_pdf_pages(reader, pages))
+
+    return {
+        "content": content.strip() if content else "No text extracted.",
+        "pages": [p + 1 for p in pages],
+        "page_count": len(reader.pages),
+        "remaining": format_page_numbers([p + 1 for p in rest])
+    }
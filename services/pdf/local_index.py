@@ -0,0 +1,89 @@
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+from services import artifacts
+from services.pdf.chunker import chunk_text
+from utils import metrics
+
+PASSAGE_SIZE = 300      # words per passage
+PASSAGE_OVERLAP = 50
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+@metrics.timed("local_index_build")
+def build_local_index(text: str) -> dict:
+    """
+    Builds a BM25 passage index for mid-size documents, so Q&A can send only
+    the relevant passages to the LLM without paying for embeddings.
+
+    Args:
+        text (str): Full document text
+
+    Returns:
+        dict: JSON-serialisable index (passages, term frequencies, document frequencies)
+    """
+    passages = [p for p in chunk_text(text, PASSAGE_SIZE, PASSAGE_OVERLAP) if p.strip()]
+    term_freqs = [dict(Counter(_tokenize(p))) for p in passages]
+    lengths = [sum(tf.values()) for tf in term_freqs]
+
+    doc_freqs = Counter()
+    for tf in term_freqs:
+        doc_freqs.update(tf.keys())
+
+    return {
+        "passages": passages,
+        "term_freqs": term_freqs,
+        "lengths": lengths,
+        "avg_length": sum(lengths) / len(lengths) if lengths else 0,
+        "doc_freqs": dict(doc_freqs)
+    }
+
+
+def save_local_index(index: dict, source: str) -> str:
+    """Stores the index in the artifact store and returns its key."""
+    return artifacts.put_text(json.dumps(index), source=source, kind="passage_index")
+
+
+@lru_cache(maxsize=16)
+def load_local_index(index_ref: str) -> dict:
+    # Artifact keys are content hashes, so a parsed index never goes stale
+    return json.loads(artifacts.load_text(index_ref))
+
+
+@metrics.timed("local_index_search")
+def search_local_index(index: dict, query: str, top_k: int = 4) -> list[str]:
+    """
+    Returns the `top_k` passages with the highest BM25 score for `query`,
+    in document order.
+    """
+    n = len(index["passages"])
+    if n == 0:
+        return []
+
+    terms = set(_tokenize(query))
+    scores = []
+    for i, tf in enumerate(index["term_freqs"]):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * index["lengths"][i] / (index["avg_length"] or 1))
+        score = 0.0
+        for term in terms:
+            freq = tf.get(term)
+            if not freq:
+                continue
+            df = index["doc_freqs"][term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * freq * (BM25_K1 + 1) / (freq + norm)
+        if score > 0:
+            scores.append((score, i))
+
+    best = sorted(scores, reverse=True)[:top_k]
+    return [index["passages"][i] for _, i in sorted(best, key=lambda s: s[1])]
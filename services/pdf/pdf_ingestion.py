@@ -1,8 +1,11 @@
 from pinecone import Pinecone,ServerlessSpec
 from pathlib import Path
-import uuid,time
+import sys
+import time
 from services.pdf.chunker import chunk_text
 from services.pdf.loader import extract_text_from_pdf
+from services import artifacts, namespaces
+from utils import metrics, scheduler, usage
 
 MODEL_NAME = "llama-text-embed-v2"
 BATCH_SIZE = 96
@@ -10,14 +13,105 @@ API_KEY = "xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"
 INDEX_NAME = "mcp-server"
 DIMENSION = 1024
 
-async def ingest_pdf_to_pinecone(pdf_path: str):
-    pc = Pinecone(api_key=API_KEY)
+def ingest_pdf(pdf_path: str, on_progress=None, resume_from: int = 0, text: str | None = None) -> dict:
+    """
+    Extracts, chunks, embeds and upserts a PDF into Pinecone.
+
+    The namespace is derived from the file's content hash and registered in
+    the namespace registry. A document that is already fully ingested (by
+    anyone) is not embedded again; the caller just gets a reference to it.
+    Chunk IDs are deterministic (`<namespace>_<chunk_index>`), so re-running
+    an interrupted ingestion with `resume_from` only upserts the missing
+    chunks and never duplicates vectors.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        on_progress (callable | None): Called as on_progress(stage, done, total)
+            with stage "pages" after extraction and "chunks" after every upsert
+        resume_from (int): Number of chunks already upserted by a previous run
+        text (str | None): Already extracted text, skips re-reading the PDF.
+            Text extracted here is stored as an artifact attached to the namespace.
+
+    Returns:
+        dict: {"namespace": str, "chunks": int, "reused": bool, "txt_path": str | None}
+    """
+    pdf_file = Path(pdf_path)
 
-    # Check if index exists, if not create it
+    if not pdf_file.exists():
+        raise FileNotFoundError("PDF not found")
 
+    sha = namespaces.file_sha256(pdf_path)
+    namespace = namespaces.namespace_for_hash(sha)
+    existing = namespaces.reuse(namespace)
+    if existing:
+        txt_key = existing["artifacts"][0] if existing["artifacts"] else None
+        return {"namespace": namespace, "chunks": existing["vectors"], "reused": True, "txt_path": txt_key}
+    namespaces.acquire(namespace, "pdf", sha, pdf_file.name, pdf_file.stat().st_size)
+
+    try:
+        pc = Pinecone(api_key=API_KEY)
+        _ensure_index(pc)
+        index = pc.Index(INDEX_NAME)
+        txt_key = None
+        if text is None:
+            text,status = extract_text_from_pdf(pdf_path)
+            if not status:
+                raise RuntimeError(text)
+            # Keep the text with the namespace (readable via file://, evicted with it)
+            txt_key = artifacts.put_text(text, source=str(pdf_file), kind="pdf_text")
+            namespaces.attach_artifacts(namespace, [txt_key])
+        if on_progress:
+            page_count = text.count("--- Page ")
+            on_progress("pages", page_count, page_count)
+
+        chunks = chunk_text(text)
+        total = len(chunks)
+
+        records = []
+        for i, chunk in enumerate(chunks):
+            if i < resume_from or not chunk.strip():
+                continue
+
+            records.append({
+                "id": f"{namespace}_{i}",
+                "text": chunk,
+                "metadata": {
+                    "pdf_name": pdf_file.name,
+                    "chunk_index": i,
+                    "text": chunk
+                }
+            })
+
+            if len(records) >= BATCH_SIZE:
+                _embed_and_upsert(records, pc, index, namespace)
+                records = []
+                if on_progress:
+                    on_progress("chunks", i + 1, total)
+
+        if records:
+            _embed_and_upsert(records, pc, index, namespace)
+        if on_progress:
+            on_progress("chunks", total, total)
+    except Exception as e:
+        # Not left "ingesting": the namespace (and any partial vectors) is evicted once unreferenced
+        namespaces.mark_failed(namespace, str(e))
+        raise
+    namespaces.mark_ready(namespace, total)
+
+    return {
+        "namespace": namespace,
+        "chunks": total,
+        "reused": False,
+        "txt_path": txt_key
+    }
+
+
+def _ensure_index(pc):
+    # Check if index exists, if not create it
     existing_indexes = pc.list_indexes().names()
     if INDEX_NAME not in existing_indexes:
-        print(f"Creating index '{INDEX_NAME}'...")
+        # stderr: stdout is the JSON-RPC channel of a stdio server
+        print(f"Creating index '{INDEX_NAME}'...", file=sys.stderr)
         pc.create_index(
             name=INDEX_NAME,
             dimension=DIMENSION,
@@ -30,59 +124,45 @@ async def ingest_pdf_to_pinecone(pdf_path: str):
         # Wait for index to be initialized
         while not pc.describe_index(INDEX_NAME).status['ready']:
             time.sleep(1)
-        print("Index created successfully.")
+        print("Index created successfully.", file=sys.stderr)
     else:
-        print(f"Index '{INDEX_NAME}' already exists.")
+        print(f"Index '{INDEX_NAME}' already exists.", file=sys.stderr)
 
-    pdf_file = Path(pdf_path)
-    print("pdf_file : ",pdf_file.name)
 
-    if not pdf_file.exists():
-        raise FileNotFoundError("PDF not found")
+def _embed_passages(pc, texts):
+    usage.check_embedding_budget(len(texts))
+    embeddings = scheduler.run(
+        "pinecone", MODEL_NAME,
+        lambda: _embed(pc, texts, "passage", "embed_batch"),
+        tokens=sum(usage.estimate_tokens(t) for t in texts),
+        actual_tokens=usage.embedding_tokens
+    )
+    usage.record_embedding(MODEL_NAME, len(texts), usage.embedding_tokens(embeddings))
+    return embeddings
 
-    namespace = pdf_file.stem.replace(" ", "_")
-    index = pc.Index(INDEX_NAME)
-    text,status = extract_text_from_pdf(pdf_path)
-    # text = extract_text_from_pdf(pdf_path)
-
-    chunks = chunk_text(text)
-
-    records = []
-    for i, chunk in enumerate(chunks):
-        if not chunk.strip():
-            continue
-
-        records.append({
-            "id": f"{namespace}_{uuid.uuid4()}",
-            "text": chunk,
-            "metadata": {
-                "pdf_name": pdf_file.name,
-                "chunk_index": i,
-                "text": chunk
-            }
-        })
-
-        if len(records) >= BATCH_SIZE:
-            _embed_and_upsert(records, pc, index, namespace)
-            records = []
 
-    if records:
-        _embed_and_upsert(records, pc, index, namespace)
+def _embed(pc, texts, input_type, stage):
+    with metrics.timed(stage):
+        return pc.inference.embed(
+            model=MODEL_NAME,
+            inputs=texts,
+            parameters={"input_type": input_type}
+        )
 
-    return {
-        "namespace": namespace,
-        "chunks": len(chunks)
-    }
+
+def _upsert(index, vectors, namespace):
+    def upsert():
+        with metrics.timed("upsert"):
+            index.upsert(vectors=vectors, namespace=namespace)
+
+    scheduler.run("pinecone", "upsert", upsert)
+    metrics.inc("chunks_upserted", len(vectors))
 
 
 def _embed_and_upsert(records, pc, index, namespace):
     texts = [r["text"] for r in records]
 
-    embeddings = pc.inference.embed(
-        model=MODEL_NAME,
-        inputs=texts,
-        parameters={"input_type": "passage"}
-    )
+    embeddings = _embed_passages(pc, texts)
 
     vectors = [
         {
@@ -93,6 +173,5 @@ def _embed_and_upsert(records, pc, index, namespace):
         for i, r in enumerate(records)
     ]
 
-    index.upsert(vectors=vectors, namespace=namespace)
-
+    _upsert(index, vectors, namespace)
 
@@ -0,0 +1,77 @@
+import os
+
+# Token thresholds for choosing how a PDF is processed. Override with env vars.
+SIMPLE_MAX_TOKENS = int(os.getenv("PDF_SIMPLE_MAX_TOKENS", "6000"))
+LOCAL_INDEX_MAX_TOKENS = int(os.getenv("PDF_LOCAL_INDEX_MAX_TOKENS", "60000"))
+CHARS_PER_TOKEN = 4
+# Pages read to estimate the size of a document queued for background processing
+SAMPLE_PAGES = int(os.getenv("PDF_STRATEGY_SAMPLE_PAGES", "5"))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English text),
+    good enough to compare against thresholds without loading a tokenizer.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def choose_strategy(text: str, page_count: int) -> dict:
+    """
+    Decides how a PDF should be processed from the size of its extracted text.
+
+    - simple: whole text fits comfortably in one LLM prompt
+    - local:  too big for one prompt, small enough for an on-disk passage index
+    - vector: large documents go to Pinecone
+
+    Args:
+        text (str): Extracted PDF text
+        page_count (int): Number of pages (recorded only, not used to decide)
+
+    Returns:
+        dict: processing_type, token_count, thresholds and a human-readable reason
+    """
+    return _strategy_for(estimate_tokens(text), page_count)
+
+
+def estimate_strategy(sample_text: str, sampled_pages: int, page_count: int) -> dict:
+    """
+    Like `choose_strategy`, but from the text of the first `sampled_pages`
+    pages extrapolated to the whole document, so a large PDF can be queued
+    without extracting all of it first.
+
+    Returns:
+        dict: Same fields as `choose_strategy`, plus "estimated" and "sampled_pages"
+    """
+    tokens = estimate_tokens(sample_text) * page_count // max(1, sampled_pages)
+    strategy = _strategy_for(tokens, page_count)
+    strategy.update(
+        estimated=True,
+        sampled_pages=sampled_pages,
+        reason=f"~{strategy['reason']} (estimated from {sampled_pages} of {page_count} pages)"
+    )
+    return strategy
+
+
+def _strategy_for(tokens: int, page_count: int) -> dict:
+    if tokens <= SIMPLE_MAX_TOKENS:
+        processing_type = "simple"
+        reason = f"{tokens} tokens <= {SIMPLE_MAX_TOKENS}: full text fits in the prompt"
+    elif tokens <= LOCAL_INDEX_MAX_TOKENS:
+        processing_type = "local"
+        reason = f"{tokens} tokens <= {LOCAL_INDEX_MAX_TOKENS}: local passage index"
+    else:
+        processing_type = "vector"
+        reason = f"{tokens} tokens > {LOCAL_INDEX_MAX_TOKENS}: vector ingestion"
+
+    return {
+        "processing_type": processing_type,
+        "token_count": tokens,
+        "page_count": page_count,
+        "tokens_per_page": round(tokens / page_count, 1) if page_count else 0,
+        "thresholds": {
+            "simple_max_tokens": SIMPLE_MAX_TOKENS,
+            "local_index_max_tokens": LOCAL_INDEX_MAX_TOKENS
+        },
+        "reason": reason
+    }
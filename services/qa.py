@@ -1,8 +1,11 @@
 from pinecone import Pinecone,ServerlessSpec
-from pathlib import Path
 import uuid,time
-from prompts import QA_prompt
-from utils import llm_call
+from prompts import QA_prompt, youtube_qa_prompt
+from utils import llm_call, metrics, scheduler, usage
+from services import artifacts, namespaces
+from services.pdf.local_index import load_local_index, search_local_index
+from services.pdf.pdf_ingestion import _embed
+from services.transcripts import format_timestamp
 
 
 MODEL_NAME = "llama-text-embed-v2"
@@ -10,6 +13,35 @@ BATCH_SIZE = 96
 API_KEY = "xxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx"  
 INDEX_NAME = "mcp-server"
 DIMENSION = 1024
+LOCAL_TOP_K = 4
+YOUTUBE_TOP_K = 4
+
+def _retrieve(question: str, namespace: str, top_k: int) -> list[dict]:
+    """Embeds the question and returns the closest matches in `namespace`."""
+    namespaces.touch(namespace)
+    pc = Pinecone(api_key=API_KEY)
+    index = pc.Index(INDEX_NAME)
+
+    usage.check_embedding_budget(1)
+    query_embedding = scheduler.run(
+        "pinecone", MODEL_NAME,
+        lambda: _embed(pc, [question], "query", "embed_query"),
+        tokens=usage.estimate_tokens(question),
+        actual_tokens=usage.embedding_tokens
+    )
+    usage.record_embedding(MODEL_NAME, 1, usage.embedding_tokens(query_embedding))
+
+    def query():
+        with metrics.timed("vector_query"):
+            return index.query(
+                namespace=namespace,
+                vector=query_embedding[0]["values"],
+                top_k=top_k,
+                include_metadata=True
+            )
+
+    results = scheduler.run("pinecone", "query", query)
+    return results.get("matches") or []
 
 def _pdf_qa_vector(question: str, pdf_info: dict) -> str:
     """
@@ -17,34 +49,20 @@ def _pdf_qa_vector(question: str, pdf_info: dict) -> str:
     Retrieves relevant chunks from Pinecone, concatenates them,
     and passes them to the LLM to generate an answer.
     """
-    pc = Pinecone(api_key=API_KEY)
     # file_path = Path(pdf_path)
     # namespace = file_path.stem.replace(" ", "_")
     namespace = pdf_info['namespace']
-    index = pc.Index(INDEX_NAME)
 
     try:
-        # 1. Embed the query
-        query_embedding = pc.inference.embed(
-            model=MODEL_NAME,
-            inputs=[question],
-            parameters={"input_type": "query"}
-        )
-
-        # 2. Query vector DB
-        results = index.query(
-            namespace=namespace,
-            vector=query_embedding[0]["values"],
-            top_k=2,
-            include_metadata=True
-        )
+        # 1-2. Embed the query and query the vector DB
+        matches = _retrieve(question, namespace, top_k=2)
 
-        if not results.get("matches"):
+        if not matches:
             return "No relevant information found in the document."
 
         # 3. Concatenate retrieved chunks
         all_chunks = []
-        for match in results["matches"]:
+        for match in matches:
             meta = match.get("metadata", {})
             text = meta.get("text", "")
             if text:
@@ -69,9 +87,6 @@ def _pdf_qa_vector(question: str, pdf_info: dict) -> str:
         return f"Error in vector Q&A: {str(e)}"
 
 
-from pathlib import Path
-
-
 def _pdf_qa_simple(question: str, pdf_info: dict) -> str:
     """
     Internal function: Q&A for simple PDFs using full extracted text.
@@ -80,9 +95,8 @@ def _pdf_qa_simple(question: str, pdf_info: dict) -> str:
         # Load content
         txt_path = pdf_info.get("txt_path")
 
-        if txt_path and Path(txt_path).exists():
-            with open(txt_path, "r", encoding="utf-8") as f:
-                content = f.read()
+        if txt_path and artifacts.exists(txt_path):
+            content = artifacts.load_text(txt_path)
         else:
             content = pdf_info.get("content", "")
 
@@ -102,6 +116,81 @@ def _pdf_qa_simple(question: str, pdf_info: dict) -> str:
     except Exception as e:
         return f"Error in simple Q&A: {str(e)}"
 
+def _pdf_qa_local(question: str, pdf_info: dict) -> str:
+    """
+    Internal function: Q&A for mid-size PDFs using the local passage index.
+    Only the best-matching passages are sent to the LLM.
+    """
+    try:
+        index_path = pdf_info.get("index_path")
+        if not index_path or not artifacts.exists(index_path):
+            # Index missing (e.g. deleted): fall back to the full text
+            return _pdf_qa_simple(question, pdf_info)
+
+        passages = search_local_index(load_local_index(index_path), question, top_k=LOCAL_TOP_K)
+        if not passages:
+            return "No relevant information found in the document."
+
+        response = llm_call.llm_call(
+            QA_prompt.format(
+                content="\n\n".join(passages),
+                question=question
+            )
+        )
+
+        return response
+
+    except Exception as e:
+        return f"Error in local Q&A: {str(e)}"
+
+def _qa_from_web_index(question: str, index_path: str) -> str:
+    """
+    Internal function: Q&A over crawled sites using their local passage index.
+    """
+    try:
+        passages = search_local_index(load_local_index(index_path), question, top_k=LOCAL_TOP_K)
+        if not passages:
+            return "No relevant information found in the crawled pages."
+
+        response = llm_call.llm_call(
+            QA_prompt.format(
+                content="\n\n".join(passages),
+                question=question
+            )
+        )
+
+        return response
+
+    except Exception as e:
+        return f"Error in web Q&A: {str(e)}"
+
+def _youtube_qa(question: str, namespace: str, video_id: str) -> str:
+    """
+    Internal function: Q&A over an indexed video transcript.
+    Only the best-matching transcript chunks are sent to the LLM, with their
+    timestamps, so the prompt size does not grow with the video length.
+    """
+    try:
+        matches = _retrieve(question, namespace, top_k=YOUTUBE_TOP_K)
+        segments = [m.get("metadata", {}) for m in matches]
+        segments = sorted((s for s in segments if s.get("text")), key=lambda s: s.get("start", 0))
+        if not segments:
+            return "No relevant information found in the video transcript."
+
+        content = "\n\n".join(
+            f"[{format_timestamp(s['start'])} - {format_timestamp(s['end'])}] {s['text']}" for s in segments
+        )
+        answer = llm_call.llm_call(youtube_qa_prompt.format(transcript=content, question=question))
+
+        sources = "\n".join(
+            f"- [{format_timestamp(s['start'])}](https://www.youtube.com/watch?v={video_id}&t={int(s['start'])}s)"
+            for s in segments
+        )
+        return f"{answer}\n\nSources:\n{sources}"
+
+    except Exception as e:
+        return f"Error in YouTube Q&A: {str(e)}"
+
 def _qa_from_web(question: str, content: str) -> str:
     """
     Internal function: Q&A for simple PDFs using full extracted text.
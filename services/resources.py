@@ -0,0 +1,303 @@
+"""
+Server-side registry of the resources users add in the app (PDFs, YouTube
+videos, websites), shared by every session and user.
+
+Resources are keyed by content, not by name:
+    pdf       SHA-256 of the file
+    youtube   video ID (any URL form of the same video), or the playlist/channel URL
+    website   URL normalized like the fetcher and crawler do (`services.web.urls.normalize_url`)
+
+Adding a resource that is already known returns its stored metadata
+(namespace, txt_path, transcript, ...) instead of processing it again. Each
+entry has a stable `id` and one reference per owner (the usage session),
+so an app session can restore its resources after a page reload.
+
+PDFs are copied to <state>/resources/pdfs/<sha>.pdf, so the stored path
+stays valid after the uploader's temp file is gone. An entry whose
+artifacts or vector namespace have been evicted is stale: lookups drop it
+and the resource is processed again.
+
+The registry is <state>/resources/registry.json; every change is made
+under its cross-process lock (`utils.state.locked`).
+
+Environment:
+    RESOURCE_TTL_DAYS     days an unreferenced resource is kept (default 30)
+"""
+
+import copy
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from services import artifacts, jobs, namespaces
+from services.transcripts import extract_playlist_id, extract_video_id
+from services.web.urls import normalize_url
+from utils import metrics, usage
+from utils.state import read_json, state_dir, update_json
+
+TTL_DAYS = float(os.getenv("RESOURCE_TTL_DAYS", "30"))
+KINDS = ("pdf", "youtube", "website")
+
+def _registry_path() -> Path:
+    return state_dir("resources") / "registry.json"
+
+
+def _pdf_copy_path(sha: str) -> Path:
+    return state_dir("resources", "pdfs") / f"{sha}.pdf"
+
+
+def store_pdf(path: str, sha: str) -> Path:
+    """Durable copy of a PDF under <state>/resources/pdfs, named by its content hash."""
+    target = _pdf_copy_path(sha)
+    if not target.exists():
+        tmp = target.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    return target
+
+
+def _owner(owner: str | None) -> str:
+    return owner or usage.current_scope()["session"]
+
+
+def resource_key(kind: str, value: str) -> str:
+    """
+    Registry key of a resource.
+
+    Args:
+        kind (str): "pdf", "youtube" or "website"
+        value (str): SHA-256 of the PDF, or the URL
+
+    Returns:
+        str: e.g. "pdf:<sha>", "youtube:<video_id>", "website:<normalized url>"
+
+    Raises:
+        ValueError: Unknown kind
+    """
+    if kind == "pdf":
+        return f"pdf:{value}"
+    if kind == "youtube":
+        try:
+            return f"youtube:{extract_video_id(value)}"
+        except ValueError:
+            playlist_id = extract_playlist_id(value)
+            return f"youtube:list={playlist_id}" if playlist_id else f"youtube:{normalize_url(value) or value.strip()}"
+    if kind == "website":
+        return f"website:{normalize_url(value) or value.strip()}"
+    raise ValueError(f"Unknown resource kind: {kind} (expected one of {', '.join(KINDS)})")
+
+
+def is_video_key(key: str) -> bool:
+    """True for "youtube:<video_id>" (not a playlist ID or channel URL)."""
+    return key.startswith("youtube:") and not key.startswith("youtube:list=") and "://" not in key
+
+
+def get(key: str) -> dict | None:
+    """The entry for a key, without validating or referencing it."""
+    return read_json(_registry_path(), {}).get(key)
+
+
+def _refresh(entry: dict, owner: str) -> dict | None:
+    """
+    Checks that everything an entry points to still exists and brings
+    background ingestion results into its metadata. Returns None if stale.
+    """
+    metadata = entry["metadata"]
+    for field in ("txt_path", "index_path"):
+        if metadata.get(field) and not artifacts.exists(metadata[field]):
+            return None
+    if entry["type"] == "pdf" and not Path(entry["path"]).exists():
+        return None
+    if entry["type"] == "youtube" and metadata.get("collection") and is_video_key(entry["key"]):
+        return None     # a playlist stub stored under a video's key
+
+    namespace = metadata.get("namespace")
+    if entry["type"] == "pdf" and namespace:
+        registered = namespaces.get(namespace)
+        job = jobs.get_job(metadata["job_id"]) if metadata.get("job_id") else None
+        if registered is None or (job and job["status"] == "failed"):
+            return None
+        if registered["status"] == "ready":
+            namespaces.reuse(namespace, owner)
+            if metadata.get("status") == "queued":
+                _complete(metadata, registered["vectors"], registered["artifacts"][0] if registered["artifacts"] else None)
+        else:
+            namespaces.acquire(namespace, "pdf", registered["content_hash"], registered["source"], owner=owner)
+
+    if entry["type"] == "youtube" and metadata.get("video_id") and not namespace:
+        # youtube_qa indexes the transcript on first use
+        indexed = namespaces.get(f"yt_{metadata['video_id']}")
+        if indexed and indexed["status"] == "ready":
+            metadata["namespace"] = indexed["namespace"]
+    return entry
+
+
+def _complete(metadata: dict, chunk_count: int, txt_path: str | None) -> None:
+    """Turns queued process_pdf metadata into the result of a finished ingestion."""
+    metadata.update(status="success", chunk_count=chunk_count)
+    if txt_path and not metadata.get("txt_path"):
+        metadata["txt_path"] = txt_path
+    metadata.pop("job_id", None)
+
+
+def record_ingestion(job: dict) -> dict | None:
+    """
+    Writes a completed background ingestion job into the entry that queued
+    it (status "success", chunk_count, txt_path). Returns the updated entry,
+    None if no entry is waiting for this job.
+    """
+    with update_json(_registry_path(), {}) as registry:
+        for entry in registry.values():
+            if entry["metadata"].get("job_id") == job["job_id"]:
+                _complete(entry["metadata"], job["chunk_count"], job.get("txt_path"))
+                return entry
+    return None
+
+
+def _drop(registry: dict, key: str) -> None:
+    """Removes an entry (and its PDF copy); the caller holds the registry lock."""
+    entry = registry.pop(key, None)
+    if entry and entry["type"] == "pdf" and entry.get("path"):
+        Path(entry["path"]).unlink(missing_ok=True)
+
+
+def _is_stale(entry: dict) -> bool:
+    """Whether an entry points at an artifact or vector namespace that no longer exists."""
+    metadata = entry["metadata"]
+    return (
+        any(metadata.get(f) and not artifacts.exists(metadata[f]) for f in ("txt_path", "index_path"))
+        or (entry["type"] == "pdf" and bool(metadata.get("namespace"))
+            and namespaces.get(metadata["namespace"]) is None)
+    )
+
+
+def lookup(key: str, owner: str | None = None) -> dict | None:
+    """
+    The entry of a known, still valid resource with the caller's reference
+    added; None if the resource is unknown or stale (stale entries are removed).
+    """
+    entry = get(key)
+    if entry is None:
+        metrics.inc("resource_miss")
+        return None
+    owner = _owner(owner)
+    snapshot = entry["metadata"]
+    # Validation reads other registries and job files: done outside the lock
+    refreshed = _refresh(copy.deepcopy(entry), owner)
+
+    now = time.time()
+    with update_json(_registry_path(), {}) as registry:
+        current = registry.get(key)
+        if current is None:
+            metrics.inc("resource_miss")
+            return None
+        # Only act on the validation if nobody re-registered the entry meanwhile
+        if current["metadata"] == snapshot:
+            if refreshed is None:
+                _drop(registry, key)
+                metrics.inc("resource_stale")
+                return None
+            current["metadata"] = refreshed["metadata"]
+        current["owners"][owner] = now
+        current["last_used"] = now
+        current["hits"] += 1
+    metrics.inc("resource_hit")
+    return current
+
+
+def register(kind: str, value: str, name: str, metadata: dict, path: str = "", url: str = "",
+             owner: str | None = None) -> dict:
+    """
+    Stores (or updates) a processed resource and adds the caller's reference.
+
+    Args:
+        kind (str): "pdf", "youtube" or "website"
+        value (str): SHA-256 of the PDF, or the URL (see `resource_key`)
+        name (str): Display name
+        metadata (dict): Result of the processing tool
+        path (str): PDF file; copied into the state directory
+        url (str): Source URL (youtube, website)
+        owner (str | None): Reference holder (default: the usage session)
+
+    Returns:
+        dict: The entry: id, key, type, name, path/url, metadata, owners, ...
+    """
+    key = resource_key(kind, value)
+    metadata = dict(metadata)
+    now = time.time()
+    if kind == "pdf":
+        # Copied before taking the lock: a large PDF can take longer to copy
+        # than the registry lock is held before others treat it as stale
+        source, path = path, str(store_pdf(path, value))
+        metadata["pdf_path"] = path
+    with update_json(_registry_path(), {}) as registry:
+        if kind == "pdf" and not Path(path).exists():
+            # Dropped by a concurrent release/gc of the same PDF since the copy
+            store_pdf(source, value)
+        entry = registry.get(key) or {
+            "id": uuid.uuid4().hex,
+            "key": key,
+            "type": kind,
+            "owners": {},
+            "hits": 0,
+            "created_at": datetime.now().isoformat()
+        }
+        entry.update(name=name or entry.get("name") or value, metadata=metadata, last_used=now)
+        if path:
+            entry["path"] = path
+        if url:
+            entry["url"] = url
+        entry["owners"][_owner(owner)] = now
+        registry[key] = entry
+    metrics.inc("resource_registered")
+    return entry
+
+
+def list_resources(owner: str | None = None, all_owners: bool = False) -> list[dict]:
+    """Entries referenced by `owner` (default: the usage session), or all of them; most recently used first."""
+    entries = list(read_json(_registry_path(), {}).values())
+    if not all_owners:
+        owner = _owner(owner)
+        entries = [e for e in entries if owner in e["owners"]]
+    return sorted(entries, key=lambda e: e.get("last_used", 0), reverse=True)
+
+
+def release(resource_id: str, owner: str | None = None) -> dict | None:
+    """
+    Drops the caller's reference to a resource and to its vector namespace.
+    The entry stays available to other sessions. Returns None if the ID is unknown.
+    """
+    owner = _owner(owner)
+    with update_json(_registry_path(), {}) as registry:
+        entry = next((e for e in registry.values() if e["id"] == resource_id), None)
+        if entry is None:
+            return None
+        entry["owners"].pop(owner, None)
+    namespace = entry["metadata"].get("namespace")
+    if entry["type"] == "pdf" and namespace:
+        namespaces.release(namespace, owner)
+    return entry
+
+
+def gc(ttl_days: float = TTL_DAYS) -> dict:
+    """Removes entries that are stale or have had no owner activity for `ttl_days`."""
+    cutoff = time.time() - ttl_days * 86400
+    # Staleness reads the artifact and namespace stores: checked on a snapshot
+    # outside the lock, like lookup()
+    stale = {
+        key: entry["metadata"]
+        for key, entry in read_json(_registry_path(), {}).items()
+        if _is_stale(entry)
+    }
+    removed = []
+    with update_json(_registry_path(), {}) as registry:
+        for key, entry in list(registry.items()):
+            last = max(entry["owners"].values(), default=entry.get("last_used", 0))
+            # A re-registered entry has new metadata and is no longer known to be stale
+            if (key in stale and entry["metadata"] == stale[key]) or last < cutoff:
+                _drop(registry, key)
+                removed.append(entry["id"])
+    return {"removed": len(removed)}
@@ -1,13 +1,19 @@
 
 from youtube_transcript_api import YouTubeTranscriptApi
 import re
+from utils import metrics
 
 def extract_video_id(url: str) -> str:
-    """Extract YouTube video ID from URL."""
+    """
+    Extract YouTube video ID from URL.
+
+    Handles watch (also with other query parameters first), youtu.be,
+    embed, /v/, shorts and live URLs on www., m., music. and
+    youtube-nocookie.com.
+    """
     patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu\.be\/)([^&\n?]*)',
-        r'youtube\.com\/embed\/([^&\n?]*)',
-        r'youtube\.com\/v\/([^&\n?]*)'
+        r'(?:youtube(?:-nocookie)?\.com\/watch\?(?:[^#]*&)?v=|youtu\.be\/)([\w-]+)',
+        r'youtube(?:-nocookie)?\.com\/(?:embed|v|shorts|live)\/([\w-]+)'
     ]
     for pattern in patterns:
         match = re.search(pattern, url)
@@ -15,13 +21,39 @@ def extract_video_id(url: str) -> str:
             return match.group(1)
     raise ValueError("Invalid YouTube URL")
 
+def extract_playlist_id(url: str) -> str | None:
+    """The `list=` parameter of a playlist or watch URL, if any."""
+    match = re.search(r'youtube\.com\/(?:playlist|watch)\?(?:[^#]*&)?list=([\w-]+)', url)
+    return match.group(1) if match else None
+
+def fetch_transcript_segments(video_url: str) -> tuple[str, list[dict]]:
+    """
+    Fetches a video's transcript with timestamps.
+
+    Returns:
+        tuple[str, list[dict]]: (video_id, segments with "text", "start" and "duration" in seconds)
+    """
+    video_id = extract_video_id(video_url)
+    obj=YouTubeTranscriptApi()
+    with metrics.timed("transcript_fetch"):
+        transcript_list = obj.fetch(video_id, languages=["en", "hi"])
+    segments = [
+        {"text": entry.text, "start": float(entry.start), "duration": float(entry.duration)}
+        for entry in transcript_list
+    ]
+    return video_id, segments
+
+def format_timestamp(seconds: float) -> str:
+    """125 -> "2:05", 3725 -> "1:02:05"."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+def join_segments(segments: list[dict]) -> str:
+    """Plain transcript text of timestamped segments."""
+    return " ".join(s["text"] for s in segments)
+
 def extract_yt_transcript(video_url):       # Extract video ID and get transcript
-        video_id = extract_video_id(video_url)
-        print("video ID : ",video_id)
-        obj=YouTubeTranscriptApi()
-        transcript_list = obj.fetch(video_id, languages=["en", "hi"]) 
-        # for snippet in transcript_list:
-        #         print(snippet.text)
-        # Combine transcript into full text
-        full_transcript = " ".join([entry.text for entry in transcript_list])
-        return full_transcript
\ No newline at end of file
+        _, segments = fetch_transcript_segments(video_url)
+        return join_segments(segments)
\ No newline at end of file
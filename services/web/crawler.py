@@ -0,0 +1,233 @@
+"""
+Concurrent site crawler.
+
+Breadth-first crawl from a seed URL with depth, domain and page limits.
+Fetches run concurrently (through the pooled, caching fetcher) with a
+per-host concurrency cap and a minimum delay between requests to the same
+host; robots.txt rules and Crawl-delay are honoured. URLs are de-duplicated
+after normalization and pages by the hash of their extracted text.
+
+Pages are appended to one combined text file as they arrive, which is then
+stored in the artifact store and indexed with the local passage index so it
+can be searched by web_content_qa.
+"""
+
+import asyncio
+import hashlib
+import sys
+import time
+import uuid
+from urllib import robotparser
+
+import requests
+
+from services import artifacts
+from services.pdf.local_index import build_local_index, save_local_index
+from services.web import extractors, fetcher
+from services.web.urls import host_of, normalize_url
+from utils.state import state_dir
+
+MAX_CONCURRENCY = 16            # total fetches in flight
+PER_HOST_CONCURRENCY = 4
+MIN_DELAY = 0.5                 # seconds between request starts on one host
+SKIP_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp",
+    ".mp3", ".mp4", ".css", ".js", ".ico", ".woff", ".woff2", ".xml", ".json"
+)
+
+
+class _HostLimiter:
+    """Concurrency cap plus minimum spacing between requests to one host."""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+        async with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.delay
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def __aexit__(self, *exc):
+        self.semaphore.release()
+
+
+def _origin(url: str) -> str:
+    """scheme://host[:port], the scope of robots.txt and of a host limiter."""
+    return url.split("/", 3)[0] + "//" + host_of(url)
+
+
+def _load_robots(origin: str) -> robotparser.RobotFileParser:
+    rp = robotparser.RobotFileParser()
+    try:
+        response = fetcher.fetch(f"{origin}/robots.txt", max_bytes=512 * 1024)
+        rp.parse(response["content"].decode("utf-8", errors="replace").splitlines())
+    except requests.exceptions.HTTPError as e:
+        # Like RobotFileParser.read: an access-controlled robots.txt forbids everything
+        status = e.response.status_code if e.response is not None else None
+        if status in (401, 403):
+            rp.disallow_all = True
+        else:
+            rp.parse([])
+    except Exception:
+        # Missing or unreachable robots.txt: everything is allowed
+        rp.parse([])
+    return rp
+
+
+async def crawl(
+    seed_url: str,
+    max_depth: int = 2,
+    max_pages: int = 50,
+    same_domain: bool = True,
+    per_host_concurrency: int = PER_HOST_CONCURRENCY,
+    delay: float = MIN_DELAY,
+    on_page=None
+) -> dict:
+    """
+    Crawls a site, streaming the extracted pages into a spool file that is
+    moved into the artifact store at the end.
+
+    Args:
+        seed_url (str): Start URL
+        max_depth (int): Link depth from the seed (0 = seed only)
+        max_pages (int): Maximum number of pages saved
+        same_domain (bool): Only follow links on the seed's host
+        per_host_concurrency (int): Parallel requests per host
+        delay (float): Minimum seconds between requests to one host
+        on_page (async callable | None): Awaited as on_page(saved, max_pages, url)
+
+    Returns:
+        dict: Crawl statistics, page list and artifact keys of the text (txt_path) and index
+
+    Raises:
+        ValueError: Invalid seed URL or a per-host concurrency below 1
+    """
+    if per_host_concurrency < 1:
+        # A semaphore of 0 would block every request forever
+        raise ValueError("per_host_concurrency must be at least 1")
+    started = time.perf_counter()
+    seed = normalize_url(seed_url)
+    if seed is None:
+        raise ValueError("Invalid URL format")
+    seed_host = host_of(seed)
+
+    seen = {seed}
+    content_hashes = set()
+    limiters = {}
+    robots = {}     # origin -> task loading its robots.txt (and setting up its limiter)
+    queue = asyncio.Queue()
+    queue.put_nowait((seed, 0))
+
+    pages = []
+    stats = {"fetched": 0, "duplicates": 0, "robots_blocked": 0, "errors": 0, "not_html": 0}
+
+    async def load_robots(origin: str):
+        parser = await asyncio.to_thread(_load_robots, origin)
+        crawl_delay = parser.crawl_delay(fetcher.USER_AGENT)
+        limiters[origin] = _HostLimiter(per_host_concurrency, max(delay, float(crawl_delay or 0)))
+        return parser
+
+    async def allowed(url: str) -> bool:
+        origin = _origin(url)
+        # One load per origin; workers on other origins never wait for it
+        if origin not in robots:
+            robots[origin] = asyncio.ensure_future(load_robots(origin))
+        return (await robots[origin]).can_fetch(fetcher.USER_AGENT, url)
+
+    output_path = state_dir("tmp") / f"crawl_{uuid.uuid4().hex}.txt"
+    out = open(output_path, "w", encoding="utf-8")
+
+    async def worker():
+        while True:
+            url, depth = await queue.get()
+            try:
+                if len(pages) >= max_pages:
+                    continue
+                if not await allowed(url):
+                    stats["robots_blocked"] += 1
+                    continue
+
+                async with limiters[_origin(url)]:
+                    response = await asyncio.to_thread(fetcher.fetch, url)
+                stats["fetched"] += 1
+
+                if "html" not in (response["content_type"] or "html").lower():
+                    stats["not_html"] += 1
+                    continue
+
+                title, text, links = await asyncio.to_thread(
+                    extractors.extract_page, response["content"], None, response["encoding"]
+                )
+
+                if not text or len(pages) >= max_pages:
+                    continue
+                digest = hashlib.sha256(text.encode()).hexdigest()
+                if digest in content_hashes:
+                    stats["duplicates"] += 1
+                    continue
+                content_hashes.add(digest)
+
+                out.write(f"--- Page: {url} ---\n{text}\n\n")
+                pages.append({"url": url, "title": title, "depth": depth, "word_count": len(text.split())})
+                if on_page:
+                    await on_page(len(pages), max_pages, url)
+
+                if depth < max_depth:
+                    base = response["final_url"] or url
+                    for href in links:
+                        link = normalize_url(href, base)
+                        if (
+                            link is None
+                            or link in seen
+                            or (same_domain and host_of(link) != seed_host)
+                            or link.lower().endswith(SKIP_EXTENSIONS)
+                        ):
+                            continue
+                        seen.add(link)
+                        queue.put_nowait((link, depth + 1))
+            except Exception as e:
+                stats["errors"] += 1
+                print(f"Crawl error for {url}: {e}", file=sys.stderr)
+            finally:
+                queue.task_done()
+
+    # The spool file is removed however the crawl ends (cancelled, failed or done)
+    try:
+        workers = [asyncio.create_task(worker()) for _ in range(MAX_CONCURRENCY)]
+        try:
+            await queue.join()
+        finally:
+            for w in workers:
+                w.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            out.close()
+
+        # Reading, compressing and indexing the whole crawl stays off the event loop
+        combined = await asyncio.to_thread(output_path.read_text, encoding="utf-8")
+        txt_key = await asyncio.to_thread(artifacts.put_text, combined, source=seed, kind="crawl_text")
+        index = await asyncio.to_thread(build_local_index, combined)
+        index_key = await asyncio.to_thread(save_local_index, index, source=seed)
+    finally:
+        out.close()
+        output_path.unlink(missing_ok=True)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "seed_url": seed,
+        "txt_path": txt_key,
+        "index_path": index_key,
+        "pages_crawled": len(pages),
+        "passage_count": len(index["passages"]),
+        "word_count": len(combined.split()),
+        "elapsed_s": round(elapsed, 2),
+        "pages_per_s": round(len(pages) / elapsed, 2) if elapsed else 0.0,
+        **stats,
+        "pages": pages
+    }
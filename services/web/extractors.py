@@ -0,0 +1,181 @@
+"""
+HTML-to-text extraction engines.
+
+Every engine takes raw HTML (bytes or str) and returns (title, text) where
+text has one non-empty, stripped text node per line and the contents of
+BOILERPLATE_TAGS removed.
+
+- "bs4":  BeautifulSoup with the pure-Python 'html.parser' (baseline).
+- "lxml": libxml2 (C) parser driven through a target object, so boilerplate
+          removal, whitespace stripping and line building happen in the same
+          single streaming pass, without building a tree.
+
+Pick the engine with the HTML_EXTRACTOR env var; by default "lxml" is used
+when installed, otherwise "bs4". Compare them with:
+    python -m benchmarks.html_extraction
+"""
+
+import os
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+from utils import metrics
+
+try:
+    from lxml import etree
+    _HAS_LXML = True
+except ImportError:
+    _HAS_LXML = False
+
+BOILERPLATE_TAGS = ("script", "style", "nav", "footer", "header")
+
+
+def _sniff_encoding(html: bytes, encoding: str | None = None) -> str:
+    """
+    Charset to decode `html` with: the BOM, then <meta charset> / XML
+    declaration, then UTF-8, then the HTTP charset, then windows-1252 - the
+    first one the bytes actually decode with. The HTTP charset comes after
+    UTF-8 because requests reports ISO-8859-1 for any text/* response
+    without a charset parameter.
+    """
+    _, bom = EncodingDetector.strip_byte_order_mark(html)
+    declared = EncodingDetector.find_declared_encoding(html, is_html=True)
+    for candidate in (bom, declared, "utf-8", encoding, "windows-1252"):
+        if not candidate:
+            continue
+        try:
+            html.decode(candidate)
+        except (UnicodeDecodeError, LookupError):
+            continue
+        return candidate
+    return "latin-1"
+
+
+def _bs4_page(html, encoding: str | None = None) -> tuple[str | None, str, list[str]]:
+    if isinstance(html, bytes):
+        soup = BeautifulSoup(html, 'html.parser', from_encoding=_sniff_encoding(html, encoding))
+    else:
+        soup = BeautifulSoup(html, 'html.parser')
+    # Links are collected before boilerplate removal: nav menus are what crawlers follow
+    links = [a["href"] for a in soup.find_all("a", href=True)]
+
+    # Remove script and style elements
+    for script in soup(list(BOILERPLATE_TAGS)):
+        script.decompose()
+
+    # Extract text
+    text = soup.get_text(separator='\n', strip=True)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+
+    title = soup.title.string if soup.title else None
+    return title, '\n'.join(lines), links
+
+
+def extract_bs4(html, encoding: str | None = None) -> tuple[str | None, str]:
+    """Baseline engine: BeautifulSoup + html.parser."""
+    return _bs4_page(html, encoding)[:2]
+
+
+class _TextTarget:
+    """lxml parser target: collects text nodes outside boilerplate tags."""
+
+    def __init__(self):
+        self.lines = []
+        self.pending = []       # data callbacks belonging to the current text node
+        self.skip_depth = 0
+        self.in_title = False
+        self.title = None
+        self.links = []
+
+    def _flush(self):
+        if not self.pending:
+            return
+        node = "".join(self.pending)
+        self.pending = []
+        if self.in_title and self.title is None:
+            self.title = node
+        for line in node.splitlines():
+            line = line.strip()
+            if line:
+                self.lines.append(line)
+
+    def start(self, tag, attrib):
+        self._flush()
+        if tag == "a" and "href" in attrib:
+            self.links.append(attrib["href"])
+        if tag in BOILERPLATE_TAGS:
+            self.skip_depth += 1
+        elif tag == "title":
+            self.in_title = True
+
+    def end(self, tag):
+        self._flush()
+        if tag in BOILERPLATE_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.pending.append(data)
+
+    def close(self):
+        self._flush()
+        return self.title, "\n".join(self.lines), self.links
+
+
+def _lxml_page(html, encoding: str | None = None) -> tuple[str | None, str, list[str]]:
+    # Bytes go to libxml2 as-is with the sniffed charset, so a page declared
+    # only in <meta charset> decodes the same way as in the bs4 engine
+    charset = _sniff_encoding(html, encoding) if isinstance(html, bytes) else None
+    parser = etree.HTMLParser(
+        target=_TextTarget(), remove_comments=True, remove_pis=True, encoding=charset
+    )
+    parser.feed(html)
+    return parser.close()
+
+
+def extract_lxml(html, encoding: str | None = None) -> tuple[str | None, str]:
+    """Fast engine: single streaming pass over libxml2 parser events."""
+    return _lxml_page(html, encoding)[:2]
+
+
+ENGINES = {"bs4": extract_bs4}
+_PAGE_ENGINES = {"bs4": _bs4_page}
+if _HAS_LXML:
+    ENGINES["lxml"] = extract_lxml
+    _PAGE_ENGINES["lxml"] = _lxml_page
+
+DEFAULT_ENGINE = os.getenv("HTML_EXTRACTOR") or ("lxml" if _HAS_LXML else "bs4")
+
+
+def extract_text(html, engine: str | None = None, encoding: str | None = None) -> tuple[str | None, str]:
+    """
+    Extracts (title, text) from HTML with the chosen engine.
+
+    Args:
+        html (bytes | str): Raw HTML
+        engine (str | None): "bs4" or "lxml" (defaults to DEFAULT_ENGINE)
+        encoding (str | None): Charset from the HTTP response, if known
+
+    Returns:
+        tuple[str | None, str]: Page title (None if missing) and extracted text
+    """
+    name = engine or DEFAULT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown HTML extractor '{name}'. Available: {list(ENGINES)}")
+    with metrics.timed("html_parse", engine=name):
+        return ENGINES[name](html, encoding)
+
+
+def extract_page(html, engine: str | None = None, encoding: str | None = None) -> tuple[str | None, str, list[str]]:
+    """
+    Same as `extract_text`, plus the raw href of every <a> tag (including
+    those inside boilerplate such as nav menus), collected in the same pass.
+    """
+    name = engine or DEFAULT_ENGINE
+    if name not in _PAGE_ENGINES:
+        raise ValueError(f"Unknown HTML extractor '{name}'. Available: {list(_PAGE_ENGINES)}")
+    with metrics.timed("html_parse", engine=name):
+        return _PAGE_ENGINES[name](html, encoding)
@@ -0,0 +1,325 @@
+"""
+HTTP fetcher used by the web tools.
+
+- One pooled `requests.Session` per host, so repeated scrapes reuse
+  keep-alive connections. Sessions of the least recently used hosts beyond
+  MAX_SESSIONS are closed.
+- On-disk cache keyed by URL. Cached responses are revalidated with
+  If-None-Match / If-Modified-Since, so an unchanged page costs a 304.
+  Every stored response gets a new body file, written before the metadata
+  that names it, so the validators always belong to the body they point at.
+  A 304 whose body has meanwhile been replaced or collected is refetched
+  without validators.
+- gzip/deflate are always negotiated, brotli when `brotli` or `brotlicffi`
+  is installed (urllib3 decodes it transparently).
+- Bodies are streamed and the download is aborted once MAX_BYTES of decoded
+  content have been read.
+- `gc` bounds the cache by age and total size (run at server start-up).
+
+Environment:
+    FETCH_MAX_BYTES           largest body downloaded (default 10 MB)
+    HTTP_CACHE_MAX_BYTES      total size of cached bodies (default 256 MB)
+    HTTP_CACHE_MAX_AGE_DAYS   entries not used for this long are deleted (default 14)
+"""
+
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import metrics
+from utils.state import locked, read_json, state_dir, write_bytes, write_json
+
+try:
+    import brotli  # noqa: F401
+    _HAS_BROTLI = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        _HAS_BROTLI = True
+    except ImportError:
+        _HAS_BROTLI = False
+
+TIMEOUT = 10
+MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "14"))
+# Bodies not (or no longer) named by a metadata file are left alone this long
+CACHE_GRACE = 60
+POOL_SIZE = 10
+MAX_SESSIONS = 32               # hosts whose connection pools are kept open
+STREAM_CHUNK = 64 * 1024
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+ACCEPT_ENCODING = "gzip, deflate, br" if _HAS_BROTLI else "gzip, deflate"
+
+_sessions = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+class ResponseTooLarge(Exception):
+    """Raised when a response body exceeds MAX_BYTES."""
+
+
+def _session_for(url: str) -> requests.Session:
+    parsed = urlparse(url)
+    host = f"{parsed.scheme}://{parsed.netloc}"
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is not None:
+            _sessions.move_to_end(host)
+        else:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=POOL_SIZE,
+                max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504))
+            )
+            session.mount(host, adapter)
+            session.headers.update({"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING})
+            _sessions[host] = session
+            while len(_sessions) > MAX_SESSIONS:
+                evicted.append(_sessions.popitem(last=False)[1])
+    # Requests still running on an evicted session finish on their connection
+    for old in evicted:
+        old.close()
+    return session
+
+
+def _meta_path(url: str):
+    return state_dir("http_cache") / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+
+def _body_path(meta_path, meta: dict | None):
+    """Body file a metadata record names; None for a missing or pre-pairing record."""
+    name = (meta or {}).get("body")
+    return meta_path.with_name(name) if name else None
+
+
+def _store(meta_path, meta: dict, content: bytes) -> str:
+    """
+    Writes a new body, then the metadata naming it, and deletes the superseded
+    body. Returns the new body's name.
+    """
+    body_path = meta_path.with_name(f"{meta_path.stem}.{uuid.uuid4().hex[:12]}.body")
+    write_bytes(body_path, content)
+    try:
+        with locked(meta_path):
+            previous = _body_path(meta_path, read_json(meta_path))
+            write_json(meta_path, {**meta, "body": body_path.name})
+    except Exception:
+        body_path.unlink(missing_ok=True)
+        raise
+    if previous is not None:
+        previous.unlink(missing_ok=True)
+    return body_path.name
+
+
+def _drop(meta_path) -> None:
+    with locked(meta_path):
+        body_path = _body_path(meta_path, read_json(meta_path))
+        meta_path.unlink(missing_ok=True)
+    if body_path is not None:
+        body_path.unlink(missing_ok=True)
+
+
+def _revalidated(url: str, meta_path, meta: dict) -> dict | None:
+    """The cached response after a 304; None if its body is gone."""
+    body_path = _body_path(meta_path, meta)
+    try:
+        content = body_path.read_bytes()
+    except FileNotFoundError:
+        return None
+    with locked(meta_path):
+        current = read_json(meta_path)
+        if current and current.get("body") == meta["body"]:
+            current["revalidated_at"] = datetime.now().isoformat()
+            write_json(meta_path, current)
+    metrics.inc("http_not_modified")
+    return {
+        "url": url,
+        "final_url": meta["final_url"],
+        "status_code": 304,
+        "content": content,
+        "encoding": meta.get("encoding"),
+        "content_type": meta.get("content_type"),
+        "not_modified": True,
+        "cache_id": meta["body"],
+        "extra": meta.get("extra", {})
+    }
+
+
+@metrics.timed("http_fetch")
+def fetch(url: str, use_cache: bool = True, max_bytes: int = MAX_BYTES) -> dict:
+    """
+    Downloads a URL, revalidating any cached copy with a conditional GET.
+
+    Args:
+        url (str): URL to fetch
+        use_cache (bool): Send conditional headers and store the response on disk
+        max_bytes (int): Abort once this many decoded bytes have been read
+
+    Returns:
+        dict: url, final_url, status_code, content (bytes), encoding,
+        content_type, not_modified (True when served from cache after a 304),
+        cache_id (the stored body, None if not cached; see `remember`) and
+        extra (data attached with `remember`)
+
+    Raises:
+        requests.exceptions.RequestException: network/HTTP errors
+        ResponseTooLarge: the body exceeds max_bytes
+    """
+    meta_path = _meta_path(url)
+    meta = read_json(meta_path) if use_cache else None
+    body_path = _body_path(meta_path, meta)
+    if body_path is None or not body_path.exists():
+        meta = None
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    session = _session_for(url)
+    response = session.get(url, headers=headers, timeout=TIMEOUT, stream=True)
+    if response.status_code == 304:
+        with response:
+            cached = _revalidated(url, meta_path, meta) if meta else None
+        if cached is not None:
+            return cached
+        # The body the validators matched was replaced or collected meanwhile
+        metrics.inc("http_not_modified_refetch")
+        response = session.get(url, timeout=TIMEOUT, stream=True)
+
+    with response:
+        response.raise_for_status()
+        if response.status_code == 304:
+            raise requests.exceptions.HTTPError("304 Not Modified for an unconditional request", response=response)
+
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ResponseTooLarge(f"Response is {declared} bytes (limit {max_bytes})")
+
+        body = bytearray()
+        for block in response.iter_content(chunk_size=STREAM_CHUNK):
+            body.extend(block)
+            if len(body) > max_bytes:
+                raise ResponseTooLarge(f"Response exceeded {max_bytes} bytes")
+
+        content = bytes(body)
+        metrics.inc("http_bytes_downloaded", len(content))
+        result = {
+            "url": url,
+            "final_url": response.url,
+            "status_code": response.status_code,
+            "content": content,
+            "encoding": response.encoding,
+            "content_type": response.headers.get("Content-Type", ""),
+            "not_modified": False,
+            "cache_id": None,
+            "extra": {}
+        }
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if use_cache and (etag or last_modified):
+            result["cache_id"] = _store(meta_path, {
+                "url": url,
+                "final_url": response.url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "encoding": response.encoding,
+                "content_type": result["content_type"],
+                "fetched_at": datetime.now().isoformat(),
+                "extra": {}
+            }, content)
+        elif meta:
+            # Server stopped sending validators: drop the stale entry
+            _drop(meta_path)
+
+        return result
+
+
+def gc(max_bytes: int = CACHE_MAX_BYTES, max_age_days: float = CACHE_MAX_AGE_DAYS) -> dict:
+    """
+    Deletes cached responses not used (fetched or revalidated) for
+    `max_age_days`, then the least recently used ones until the bodies fit in
+    `max_bytes`, plus bodies no metadata file names and metadata files whose
+    body is missing.
+
+    Returns:
+        dict: Number of removed entries, freed bytes and remaining totals
+    """
+    now = time.time()
+    cutoff = now - max_age_days * 86400
+    cache = state_dir("http_cache")
+    files = []
+    for path in cache.iterdir():
+        try:
+            files.append((path, path.stat()))
+        except FileNotFoundError:
+            continue
+
+    entries = []
+    in_use = set()
+    for path, stat in files:
+        if path.suffix == ".json" and not path.name.startswith("."):
+            body = _body_path(path, read_json(path))
+            if body is not None and body.exists():
+                entries.append((stat.st_mtime, path, body))
+                in_use.update((path, body))
+
+    removed = 0
+    freed = 0
+    for path, stat in files:
+        # Orphaned or superseded body, metadata without a body, or a leftover temp file
+        if path not in in_use and now - stat.st_mtime >= CACHE_GRACE:
+            path.unlink(missing_ok=True)
+            freed += stat.st_size
+
+    entries.sort(key=lambda e: e[0])
+    sizes = {}
+    for _, _, body in entries:
+        try:
+            sizes[body] = body.stat().st_size
+        except FileNotFoundError:
+            sizes[body] = 0
+    total = sum(sizes.values())
+    kept = len(entries)
+    for used_at, meta, body in entries:
+        if used_at >= cutoff and total <= max_bytes:
+            break
+        meta.unlink(missing_ok=True)
+        body.unlink(missing_ok=True)
+        total -= sizes[body]
+        freed += sizes[body]
+        removed += 1
+        kept -= 1
+    return {"removed": removed, "freed_bytes": freed, "entries": kept, "cached_bytes": total}
+
+
+def remember(url: str, cache_id: str | None, **extra) -> None:
+    """
+    Attaches derived data (e.g. the scrape result) to a cached response so a
+    later 304 can reuse it without re-parsing. `cache_id` is the one `fetch`
+    returned: a no-op if the URL is not cached or has been refetched since.
+    """
+    if cache_id is None:
+        return
+    meta_path = _meta_path(url)
+    with locked(meta_path):
+        meta = read_json(meta_path)
+        if meta is None or meta.get("body") != cache_id:
+            return
+        meta.setdefault("extra", {}).update(extra)
+        write_json(meta_path, meta)
@@ -0,0 +1,44 @@
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PREFIXES = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid")
+
+
+def normalize_url(url: str, base: str | None = None) -> str | None:
+    """
+    Canonical form of a URL used for de-duplication.
+
+    Resolves relative links against `base`, lowercases scheme and host, drops
+    default ports, fragments and tracking parameters, sorts the query string
+    and removes trailing slashes from non-root paths.
+
+    Returns:
+        str | None: Normalized URL, or None for non-http(s) links (mailto:, javascript:, ...)
+    """
+    url = url.strip()
+    if base:
+        url = urljoin(base, url)
+
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parsed.hostname:
+        return None
+
+    host = parsed.hostname.lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS[scheme]:
+        host = f"{host}:{parsed.port}"
+
+    path = parsed.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+        if not k.lower().startswith(TRACKING_PREFIXES)
+    )
+
+    return urlunparse((scheme, host, path, "", urlencode(query), ""))
+
+
+def host_of(url: str) -> str:
+    return urlparse(url).netloc.lower()
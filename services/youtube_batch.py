@@ -0,0 +1,257 @@
+"""
+Batch summarization of many YouTube videos (a playlist, a channel's latest
+uploads or an explicit list of URLs).
+
+Each video is one task on a bounded thread pool: the transcript fetch and
+the LLM summary are both network bound, so WORKERS videos are in flight at
+once instead of one after the other. Batches run at the scheduler's BATCH
+priority, so chat calls are not starved. A failing video (no transcript,
+private, LLM error) is reported in its own result and never stops the
+batch. Results are handed to `on_result` as soon as each video finishes.
+
+The optional digest combines the per-video summaries. When they do not fit
+in one prompt (DIGEST_MAX_CHARS), groups of summaries are condensed first
+and the partial digests are combined.
+
+Usage:
+    python -m services.youtube_batch "https://www.youtube.com/playlist?list=PL..." --digest
+    python -m services.youtube_batch https://youtu.be/aaa https://youtu.be/bbb --style bullet_points
+"""
+
+import argparse
+import contextvars
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+
+from prompts import youtube_digest_prompt
+from services.summarizer import get_yt_summary
+from services.transcripts import extract_playlist_id, extract_video_id, fetch_transcript_segments
+from services.web import fetcher
+from utils import metrics, scheduler
+from utils.llm_call import llm_call
+
+WORKERS = int(os.getenv("PLAYLIST_WORKERS", "8"))
+MAX_VIDEOS = int(os.getenv("PLAYLIST_MAX_VIDEOS", "200"))
+DIGEST_MAX_CHARS = int(os.getenv("PLAYLIST_DIGEST_MAX_CHARS", "40000"))
+
+# Playlist/channel pages embed their first ~100 entries in the initial JSON
+_PLAYLIST_ENTRY = re.compile(r'"playlistVideoRenderer":\{"videoId":"([A-Za-z0-9_-]{11})"')
+_CHANNEL_ENTRY = re.compile(r'"videoRenderer":\{"videoId":"([A-Za-z0-9_-]{11})"')
+_ANY_ENTRY = re.compile(r'"videoId":"([A-Za-z0-9_-]{11})"')
+_CHANNEL_PATH = re.compile(r"^/(@[^/]+|channel/[^/]+|c/[^/]+|user/[^/]+)")
+
+
+def _unique(ids) -> list[str]:
+    return list(dict.fromkeys(ids))
+
+
+def is_collection(url: str) -> bool:
+    """True for playlist and channel URLs (as opposed to single videos)."""
+    return bool(extract_playlist_id(url) or _CHANNEL_PATH.match(urlparse(url).path))
+
+
+def playlist_video_ids(source_url: str, limit: int = MAX_VIDEOS) -> list[str]:
+    """
+    Video IDs of a playlist URL (any URL with `list=`) or a channel URL
+    (/@handle, /channel/..., /c/..., /user/...; its /videos tab is read).
+    Only the entries embedded in the page are returned, i.e. at most ~100.
+
+    Raises:
+        ValueError: the URL is neither a playlist nor a channel
+    """
+    playlist_id = extract_playlist_id(source_url)
+    if playlist_id:
+        page_url = f"https://www.youtube.com/playlist?list={playlist_id}"
+        entry = _PLAYLIST_ENTRY
+    else:
+        channel = _CHANNEL_PATH.match(urlparse(source_url).path)
+        if not channel:
+            raise ValueError("Not a YouTube playlist or channel URL")
+        page_url = f"https://www.youtube.com/{channel.group(1)}/videos"
+        entry = _CHANNEL_ENTRY
+
+    response = fetcher.fetch(page_url)
+    html = response["content"].decode(response["encoding"] or "utf-8", errors="replace")
+    ids = _unique(entry.findall(html)) or _unique(_ANY_ENTRY.findall(html))
+    return ids[:limit]
+
+
+def resolve_videos(playlist_url: str = "", video_urls: list[str] | None = None, limit: int = MAX_VIDEOS) -> list[dict]:
+    """
+    Expands a playlist/channel URL and/or a list of video URLs into
+    [{"url", "video_id"}], de-duplicated by video ID. URLs that are not
+    recognised get "video_id": None and an "error" instead of failing the batch.
+    """
+    videos = []
+    video_urls = list(video_urls or [])
+    if playlist_url and is_collection(playlist_url):
+        videos = [
+            {"url": f"https://www.youtube.com/watch?v={video_id}", "video_id": video_id}
+            for video_id in playlist_video_ids(playlist_url, limit)
+        ]
+    elif playlist_url:
+        video_urls.insert(0, playlist_url)
+
+    for url in video_urls:
+        try:
+            videos.append({"url": url, "video_id": extract_video_id(url)})
+        except ValueError as e:
+            videos.append({"url": url, "video_id": None, "error": str(e)})
+
+    seen = set()
+    unique = []
+    for video in videos:
+        if video["video_id"] is not None:
+            if video["video_id"] in seen:
+                continue
+            seen.add(video["video_id"])
+        unique.append(video)
+    return unique[:limit]
+
+
+def _summarize_video(video: dict, summary_style: str) -> dict:
+    started = time.perf_counter()
+    result = {"url": video["url"], "video_id": video["video_id"]}
+    if video["video_id"] is None:
+        return {**result, "status": "error", "error": video.get("error", "Invalid YouTube URL"), "elapsed_s": 0.0}
+    try:
+        _, segments = fetch_transcript_segments(video["url"])
+        transcript = " ".join(segment["text"] for segment in segments)
+        summary = get_yt_summary(yt_transcript=transcript, level=summary_style)
+        result.update(status="success", summary=summary, transcript_words=len(transcript.split()))
+        metrics.inc("playlist_videos_summarized")
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+        metrics.inc("playlist_videos_failed")
+    result["elapsed_s"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+@scheduler.batch()
+def summarize_videos(videos: list[dict], summary_style: str = "concise", workers: int = 0, on_result=None) -> list[dict]:
+    """
+    Summarizes videos concurrently.
+
+    Args:
+        videos (list[dict]): Output of `resolve_videos`
+        summary_style (str): "concise", "detailed" or "bullet_points"
+        workers (int): Videos processed at once (0 = WORKERS)
+        on_result (callable): Called as on_result(result, done, total) as
+            each video finishes
+
+    Returns:
+        list[dict]: One result per video, in input order, with status
+        "success" (summary) or "error" (error)
+    """
+    workers = workers or WORKERS
+    results = [None] * len(videos)
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(videos) or 1))) as pool:
+        # copy_context: usage attribution and tracing follow each task into the pool
+        futures = {
+            pool.submit(contextvars.copy_context().run, _summarize_video, video, summary_style): i
+            for i, video in enumerate(videos)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            if on_result:
+                on_result(results[i], done, len(videos))
+    return results
+
+
+def _digest_groups(sections: list[str]) -> list[str]:
+    groups, current = [], ""
+    for section in sections:
+        if current and len(current) + len(section) > DIGEST_MAX_CHARS:
+            groups.append(current)
+            current = ""
+        current += section + "\n\n"
+    if current:
+        groups.append(current)
+    return groups
+
+
+@scheduler.batch()
+def build_digest(results: list[dict], workers: int = 0) -> str:
+    """
+    One combined digest of the successful summaries. Oversized inputs are
+    reduced in rounds: each group of summaries is condensed (concurrently)
+    and the partial digests are combined.
+    """
+    sections = [
+        f"### {r['url']}\n{r['summary']}"
+        for r in results if r.get("status") == "success"
+    ]
+    if not sections:
+        raise ValueError("No video was summarized successfully")
+
+    with metrics.timed("playlist_digest"):
+        groups = _digest_groups(sections)
+        while len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=max(1, min(workers or WORKERS, len(groups)))) as pool:
+                futures = [
+                    pool.submit(contextvars.copy_context().run, llm_call, youtube_digest_prompt.format(summaries=group))
+                    for group in groups
+                ]
+                partials = [future.result() for future in futures]
+            regrouped = _digest_groups(partials)
+            if len(regrouped) >= len(groups):      # summaries are not shrinking: stop reducing
+                groups = ["\n\n".join(partials)]
+                break
+            groups = regrouped
+        return llm_call(youtube_digest_prompt.format(summaries=groups[0]))
+
+
+def batch_stats(results: list[dict], started: float) -> dict:
+    """Success/failure counts and throughput of a batch started at `started` (perf_counter)."""
+    elapsed = time.perf_counter() - started
+    succeeded = sum(1 for r in results if r["status"] == "success")
+    return {
+        "videos": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "elapsed_s": round(elapsed, 2),
+        "videos_per_min": round(len(results) / elapsed * 60, 2) if elapsed else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a YouTube playlist, channel or list of videos")
+    parser.add_argument("sources", nargs="+", help="Playlist/channel URL or video URLs")
+    parser.add_argument("--style", default="concise", help="concise, detailed or bullet_points")
+    parser.add_argument("--workers", type=int, default=0, help=f"Videos in flight (default {WORKERS})")
+    parser.add_argument("--max-videos", type=int, default=MAX_VIDEOS)
+    parser.add_argument("--digest", action="store_true", help="Also write a combined digest")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    collections = [s for s in args.sources if is_collection(s)]
+    if len(collections) > 1:
+        parser.error("Pass at most one playlist or channel URL")
+    videos = resolve_videos(
+        collections[0] if collections else "",
+        [s for s in args.sources if s not in collections],
+        args.max_videos
+    )
+
+    def on_result(result, done, total):
+        status = "✅" if result["status"] == "success" else f"❌ {result['error']}"
+        print(f"[{done}/{total}] {result['url']} {status}", flush=True)
+
+    results = summarize_videos(videos, args.style, args.workers, on_result)
+    for r in results:
+        if r["status"] == "success":
+            print(f"\n## {r['url']}\n{r['summary']}")
+    if args.digest:
+        print(f"\n# Digest\n{build_digest(results, args.workers)}")
+
+    stats = batch_stats(results, started)
+    print(f"\nVideos: {stats['videos']} | {stats['succeeded']} summarized | {stats['failed']} failed | "
+          f"{stats['elapsed_s']}s ({stats['videos_per_min']} videos/min)")
+
+
+if __name__ == "__main__":
+    main()
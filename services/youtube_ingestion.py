@@ -0,0 +1,91 @@
+from pinecone import Pinecone
+
+from services import namespaces
+from services.pdf.chunker import chunk_segments
+from services.pdf.pdf_ingestion import (
+    API_KEY, BATCH_SIZE, INDEX_NAME, _embed_passages, _ensure_index, _upsert
+)
+from services.transcripts import extract_video_id, fetch_transcript_segments
+
+# ~200 words is about 80 s of speech: small enough to cite a precise moment
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+
+def namespace_for_video(video_id: str) -> str:
+    """Pinecone namespace used for a video's transcript."""
+    return f"yt_{video_id}"
+
+
+def vector_count(index, namespace: str) -> int:
+    stats = index.describe_index_stats()
+    by_namespace = stats["namespaces"] if stats else {}
+    entry = by_namespace.get(namespace) if by_namespace else None
+    if entry is None:
+        return 0
+    return entry["vector_count"] if isinstance(entry, dict) else getattr(entry, "vector_count", 0)
+
+
+def index_youtube_transcript(video_url: str, force: bool = False, segments: list[dict] | None = None) -> dict:
+    """
+    Chunks a video transcript with its timestamps and upserts it into
+    Pinecone under `yt_<video_id>`, registered in the namespace registry.
+    Videos that are already indexed are skipped unless `force` is set; a
+    failed run marks the namespace failed, and a partial index is redone.
+
+    Args:
+        video_url (str): YouTube video URL
+        force (bool): Re-index even if the namespace already has vectors
+        segments (list[dict] | None): Stored transcript segments; fetched if None
+
+    Returns:
+        dict: {"video_id", "namespace", "chunks", "already_indexed"}
+    """
+    video_id = extract_video_id(video_url)
+    namespace = namespace_for_video(video_id)
+
+    existing = None if force else namespaces.reuse(namespace)
+    if existing:
+        return {"video_id": video_id, "namespace": namespace, "chunks": existing["vectors"], "already_indexed": True}
+    namespaces.acquire(namespace, "youtube", video_id, video_url)
+
+    pc = Pinecone(api_key=API_KEY)
+    _ensure_index(pc)
+    index = pc.Index(INDEX_NAME)
+
+    try:
+        if segments is None:
+            _, segments = fetch_transcript_segments(video_url)
+        chunks = chunk_segments(segments, chunk_size=CHUNK_WORDS, overlap=CHUNK_OVERLAP)
+
+        # Indexed before the registry knew about it. A partial index left by a
+        # failed run is redone: chunk IDs are deterministic, so upserts overwrite.
+        count = 0 if force else vector_count(index, namespace)
+        if count and count == len(chunks):
+            namespaces.mark_ready(namespace, count)
+            return {"video_id": video_id, "namespace": namespace, "chunks": count, "already_indexed": True}
+
+        for batch_start in range(0, len(chunks), BATCH_SIZE):
+            batch = chunks[batch_start:batch_start + BATCH_SIZE]
+            embeddings = _embed_passages(pc, [c["text"] for c in batch])
+            vectors = [
+                {
+                    "id": f"{namespace}_{batch_start + i}",
+                    "values": embeddings[i]["values"],
+                    "metadata": {
+                        "video_id": video_id,
+                        "chunk_index": batch_start + i,
+                        "start": chunk["start"],
+                        "end": chunk["end"],
+                        "text": chunk["text"]
+                    }
+                }
+                for i, chunk in enumerate(batch)
+            ]
+            _upsert(index, vectors, namespace)
+    except Exception as e:
+        namespaces.mark_failed(namespace, str(e))
+        raise
+    namespaces.mark_ready(namespace, len(chunks))
+
+    return {"video_id": video_id, "namespace": namespace, "chunks": len(chunks), "already_indexed": False}
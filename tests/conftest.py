@@ -0,0 +1,27 @@
+import atexit
+
+import pytest
+
+from utils import metrics, state
+
+
+@pytest.fixture(autouse=True, scope="session")
+def no_metrics_flush_at_exit():
+    """The test process must not leave <cwd>/.analyzer_state/metrics/<pid>.json behind."""
+    atexit.unregister(metrics.flush)
+
+
+@pytest.fixture(autouse=True)
+def state_root(tmp_path, monkeypatch):
+    """Every test runs against its own empty state directory."""
+    root = tmp_path / "state"
+    monkeypatch.setattr(state, "STATE_DIR", root)
+    return root
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(monkeypatch):
+    """Metrics recorded by one test are not seen (or flushed) by the next."""
+    monkeypatch.setattr(metrics, "_histograms", {})
+    monkeypatch.setattr(metrics, "_counters", {})
+    monkeypatch.setattr(metrics, "_gauges", {})
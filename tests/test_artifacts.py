@@ -0,0 +1,108 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from services import artifacts
+from utils import state
+
+
+def _age(path, seconds):
+    old = time.time() - seconds
+    os.utime(path, (old, old))
+
+
+def test_put_text_is_content_addressed():
+    a = artifacts.put_text("same text", source="a", kind="pdf_text")
+    b = artifacts.put_text("same text", source="b", kind="pdf_text")
+
+    assert a == b
+    assert artifacts.load_text(a) == "same text"
+
+
+def test_gc_drops_least_recently_used_over_the_size_limit():
+    old = artifacts.put_text("old " * 1000, source="a", kind="t")
+    time.sleep(0.01)
+    new = artifacts.put_text("new " * 1000, source="b", kind="t")
+    size = artifacts.describe(new)["stored_size"]
+
+    result = artifacts.gc(max_bytes=size, max_age_days=30)
+
+    assert result["removed"] == 1
+    assert not artifacts.exists(old)
+    assert artifacts.exists(new)
+
+
+def test_gc_sweeps_blobs_missing_from_the_index():
+    key = artifacts.put_text("kept", source="a", kind="t")
+    orphan = artifacts._store_dir() / "ab" / "orphaned.zst"
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b"x")
+    fresh = orphan.with_name("in-flight.tmp")
+    fresh.write_bytes(b"x")
+    _age(orphan, artifacts.ORPHAN_GRACE + 1)
+
+    assert artifacts.gc()["orphans"] == 1
+    assert not orphan.exists()
+    assert fresh.exists()
+    assert artifacts.exists(key)
+
+
+def test_reads_refresh_the_blob_without_rewriting_the_index():
+    key = artifacts.put_text("read me", source="a", kind="t")
+    blob = artifacts._blob_path(key, artifacts.describe(key)["codec"])
+    shard = artifacts._shard_path(key)
+    _age(blob, 3600)
+    _age(shard, 3600)
+    artifacts._cache.clear()
+
+    assert artifacts.get_text(key) == "read me"
+    assert artifacts.put_text("read me", source="b", kind="t") == key
+
+    assert time.time() - blob.stat().st_mtime < 60
+    assert time.time() - shard.stat().st_mtime > 3000
+
+
+def test_entries_of_a_single_index_file_are_moved_into_shards():
+    key = artifacts.put_text("legacy entry", source="a", kind="t")
+    entry = artifacts.describe(key)
+    artifacts._shard_path(key).unlink()
+    state.write_json(artifacts._legacy_index_path(), {key: entry})
+
+    assert artifacts.exists(key)
+    assert not artifacts._legacy_index_path().exists()
+    assert artifacts.describe(key) == entry
+
+
+def _put_many(root, worker):
+    state.STATE_DIR = root
+    for i in range(25):
+        artifacts.put_text(f"worker {worker} text {i}", source=str(worker), kind="t")
+
+
+def test_concurrent_writers_keep_every_index_entry(state_root):
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_put_many, args=(state_root, w)) for w in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=60)
+
+    assert len(artifacts._entries()) == 100
+
+
+def test_load_text_reads_legacy_text_files_only_inside_the_working_directory(tmp_path, monkeypatch):
+    cwd = tmp_path / "cwd"
+    cwd.mkdir()
+    monkeypatch.chdir(cwd)
+    (cwd / "report.txt").write_text("legacy", encoding="utf-8")
+    (cwd / "secrets.env").write_text("KEY=1", encoding="utf-8")
+    (tmp_path / "outside.txt").write_text("outside", encoding="utf-8")
+
+    assert artifacts.load_text("report.txt") == "legacy"
+    assert artifacts.load_text(str(cwd / "report.txt")) == "legacy"
+    for ref in ("secrets.env", "../outside.txt", str(tmp_path / "outside.txt")):
+        assert not artifacts.exists(ref)
+        with pytest.raises(FileNotFoundError):
+            artifacts.load_text(ref)
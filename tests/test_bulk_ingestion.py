@@ -0,0 +1,76 @@
+import zipfile
+
+import pypdf
+import pytest
+
+from benchmarks import fakes
+from services import namespaces
+from services.pdf import bulk_ingestion
+
+
+def _pdf_bytes(tmp_path, pages=1):
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    path = tmp_path / "blank.pdf"
+    writer.write(path)
+    return path.read_bytes()
+
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "docs.zip"
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("a.pdf", _pdf_bytes(tmp_path, 1))
+        z.writestr("nested/b.pdf", _pdf_bytes(tmp_path, 2))
+        z.writestr("notes.txt", "not a pdf")
+    return path
+
+
+def _extract_dirs(state_root):
+    root = state_root / "bulk_extract"
+    return list(root.iterdir()) if root.exists() else []
+
+
+def test_zip_members_are_extracted_and_removed_afterwards(archive, state_root):
+    with bulk_ingestion.resolve_sources(str(archive)) as files:
+        assert sorted(f.name for f in files) == ["a.pdf", "b.pdf"]
+        assert all(f.exists() for f in files)
+
+    assert _extract_dirs(state_root) == []
+
+
+def test_extraction_is_removed_when_the_run_fails(archive, state_root):
+    with pytest.raises(RuntimeError):
+        with bulk_ingestion.resolve_sources(str(archive)):
+            raise RuntimeError("embedding failed")
+
+    assert _extract_dirs(state_root) == []
+
+
+def test_oversized_archives_are_rejected_before_extraction(archive, state_root, monkeypatch):
+    monkeypatch.setattr(bulk_ingestion, "MAX_ZIP_MEMBERS", 1)
+    with pytest.raises(ValueError, match="2 PDFs"):
+        with bulk_ingestion.resolve_sources(str(archive)):
+            pass
+
+    monkeypatch.setattr(bulk_ingestion, "MAX_ZIP_MEMBERS", 10)
+    monkeypatch.setattr(bulk_ingestion, "MAX_ZIP_BYTES", 100)
+    with pytest.raises(ValueError, match="bytes"):
+        with bulk_ingestion.resolve_sources(str(archive)):
+            pass
+
+    assert _extract_dirs(state_root) == []
+
+
+def test_bulk_ingest_of_a_zip_marks_every_document_ready(archive, state_root, monkeypatch):
+    # Spawned extraction workers read the state directory from the environment
+    monkeypatch.setenv("ANALYZER_STATE_DIR", str(state_root))
+    monkeypatch.setattr(fakes, "LATENCY_SCALE", 0)
+
+    with fakes.installed():
+        stats = bulk_ingestion.bulk_ingest(str(archive), workers=2)
+
+    assert (stats["files_found"], stats["files_ingested"], stats["files_failed"]) == (2, 2, 0)
+    assert all(namespaces.get(d["namespace"])["status"] == "ready" for d in stats["documents"])
+    assert _extract_dirs(state_root) == []
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+from services.web import crawler, fetcher
+
+SITE = {
+    "https://a.test/robots.txt": "User-agent: *\nDisallow: /private",
+    "https://a.test/": '<a href="/page">p</a> <a href="/private">x</a> '
+                       '<a href="https://b.test/x">b</a> <a href="https://c.test/y">c</a>',
+    "https://a.test/page": "<p>page</p>",
+    "https://a.test/private": "<p>secret</p>",
+    "https://b.test/x": "<p>on b</p>",
+    "https://c.test/y": "<p>on c</p>",
+}
+
+
+def _response(url, body):
+    return {"url": url, "final_url": url, "status_code": 200, "content": body.encode(),
+            "encoding": "utf-8", "content_type": "text/html", "not_modified": False, "cache_id": None, "extra": {}}
+
+
+def _not_found(url):
+    response = requests.Response()
+    response.status_code = 404
+    return requests.exceptions.HTTPError(f"404 for {url}", response=response)
+
+
+@pytest.fixture
+def site(monkeypatch):
+    """Serves SITE through fetcher.fetch; records requested URLs."""
+    requested = []
+    hooks = {}      # url -> callable run before the response is returned
+
+    def fetch(url, use_cache=True, max_bytes=fetcher.MAX_BYTES):
+        requested.append(url)
+        if url in hooks:
+            hooks[url]()
+        if url not in SITE:
+            raise _not_found(url)
+        return _response(url, SITE[url])
+
+    monkeypatch.setattr(fetcher, "fetch", fetch)
+    return requested, hooks
+
+
+def _spool_files(state_root):
+    return list((state_root / "tmp").glob("crawl_*.txt")) if (state_root / "tmp").exists() else []
+
+
+def test_robots_txt_is_loaded_once_per_origin_and_applied(site, state_root):
+    requested, _ = site
+
+    result = asyncio.run(crawler.crawl("https://a.test/", max_depth=1, same_domain=False, delay=0))
+
+    assert sorted(p["url"] for p in result["pages"]) == [
+        "https://a.test/", "https://a.test/page", "https://b.test/x", "https://c.test/y"]
+    assert result["robots_blocked"] == 1
+    assert "https://a.test/private" not in requested
+    assert sorted(u for u in requested if u.endswith("/robots.txt")) == [
+        "https://a.test/robots.txt", "https://b.test/robots.txt", "https://c.test/robots.txt"]
+    assert _spool_files(state_root) == []
+
+
+def test_a_slow_robots_txt_does_not_hold_up_other_origins(site):
+    _, hooks = site
+    b_fetched = threading.Event()
+    hooks["https://b.test/x"] = b_fetched.set
+    # c's robots.txt only answers once b's page was fetched
+    hooks["https://c.test/robots.txt"] = lambda: b_fetched.wait(timeout=5)
+
+    started = time.monotonic()
+    result = asyncio.run(crawler.crawl("https://a.test/", max_depth=1, same_domain=False, delay=0))
+
+    assert b_fetched.is_set() and time.monotonic() - started < 5
+    assert result["pages_crawled"] == 4
+
+
+def test_a_cancelled_crawl_removes_its_spool_file(site, state_root):
+    _, hooks = site
+    fetching, release = threading.Event(), threading.Event()
+    hooks["https://a.test/page"] = lambda: (fetching.set(), release.wait(timeout=5))
+
+    async def run():
+        task = asyncio.create_task(crawler.crawl("https://a.test/", max_depth=1, delay=0))
+        while not fetching.is_set():
+            await asyncio.sleep(0.01)
+        assert len(_spool_files(state_root)) == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()       # lets asyncio.run's executor shutdown finish
+
+    try:
+        asyncio.run(run())
+    finally:
+        release.set()
+    assert _spool_files(state_root) == []
+
+
+@pytest.mark.parametrize("concurrency", [0, -1])
+def test_a_per_host_concurrency_below_one_is_rejected(site, concurrency):
+    with pytest.raises(ValueError, match="per_host_concurrency"):
+        asyncio.run(asyncio.wait_for(crawler.crawl("https://a.test/", per_host_concurrency=concurrency), timeout=5))
@@ -0,0 +1,25 @@
+import pytest
+
+from services.web import extractors
+
+SHIFT_JIS_PAGE = (
+    '<html><head><meta charset="Shift_JIS"><title>見出し</title></head>'
+    '<body><p>日本語のテキスト</p></body></html>'
+).encode("shift_jis")
+
+
+@pytest.mark.parametrize("engine", list(extractors.ENGINES))
+def test_meta_charset_wins_over_the_default_http_charset(engine):
+    title, text = extractors.extract_text(SHIFT_JIS_PAGE, engine, encoding="ISO-8859-1")
+
+    assert title == "見出し"
+    assert text.splitlines() == ["見出し", "日本語のテキスト"]
+
+
+@pytest.mark.parametrize("engine", list(extractors.ENGINES))
+def test_undeclared_bytes_fall_back_from_utf8_to_the_http_charset(engine):
+    utf8 = "<html><body><p>café</p></body></html>".encode("utf-8")
+    latin1 = "<html><body><p>café</p></body></html>".encode("latin-1")
+
+    assert extractors.extract_text(utf8, engine, encoding="ISO-8859-1")[1] == "café"
+    assert extractors.extract_text(latin1, engine, encoding="ISO-8859-1")[1] == "café"
@@ -0,0 +1,172 @@
+import os
+import time
+
+import pytest
+
+from services.web import fetcher
+from utils import state
+from utils.state import write_json
+
+
+def _cached(url, body=b"x" * 100, age=0, etag='"v1"'):
+    meta = fetcher._meta_path(url)
+    body_path = meta.with_name(f"{meta.stem}.v1.body")
+    body_path.write_bytes(body)
+    write_json(meta, {"url": url, "final_url": url, "etag": etag, "encoding": "utf-8", "body": body_path.name})
+    old = time.time() - age
+    os.utime(meta, (old, old))
+    os.utime(body_path, (old, old))
+    return meta, body_path
+
+
+def test_gc_drops_entries_unused_for_too_long():
+    old, _ = _cached("https://example.com/old", age=3 * 86400)
+    new, _ = _cached("https://example.com/new")
+
+    result = fetcher.gc(max_age_days=1)
+
+    assert result["removed"] == 1
+    assert not old.exists() and new.exists()
+
+
+def test_gc_drops_least_recently_used_over_the_size_limit():
+    first, _ = _cached("https://example.com/1", age=300)
+    second, _ = _cached("https://example.com/2", age=200)
+    third, _ = _cached("https://example.com/3", age=100)
+
+    result = fetcher.gc(max_bytes=250)
+
+    assert (result["removed"], result["cached_bytes"]) == (1, 200)
+    assert not first.exists() and second.exists() and third.exists()
+
+
+def test_gc_removes_unnamed_bodies_after_the_grace_period():
+    meta, current = _cached("https://example.com/page", age=fetcher.CACHE_GRACE + 1)
+    superseded = meta.with_name(f"{meta.stem}.v0.body")
+    writing = meta.with_name(f"{meta.stem}.v2.body")
+    for body in (superseded, writing):
+        body.write_bytes(b"body")
+    old = time.time() - fetcher.CACHE_GRACE - 1
+    os.utime(superseded, (old, old))
+
+    fetcher.gc()
+
+    assert meta.exists() and current.exists() and writing.exists()
+    assert not superseded.exists()
+
+
+class _Response:
+    url = "https://example.com/page"
+    encoding = "utf-8"
+
+    def __init__(self, body, status_code=200, etag='"v2"'):
+        self.body = body
+        self.status_code = status_code
+        self.headers = {"ETag": etag, "Content-Type": "text/html"}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        yield self.body
+
+
+def test_a_failed_cache_write_keeps_the_previous_body(monkeypatch):
+    url = "https://example.com/page"
+    _, body_path = _cached(url, body=b"old body")
+    session = type("Session", (), {"get": lambda self, *a, **k: _Response(b"new body")})()
+    monkeypatch.setattr(fetcher, "_session_for", lambda url: session)
+
+    def interrupted(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(state.os, "replace", interrupted)
+    with pytest.raises(OSError):
+        fetcher.fetch(url)
+
+    assert body_path.read_bytes() == b"old body"
+    assert [p.name for p in body_path.parent.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_sessions_of_least_recently_used_hosts_are_closed(monkeypatch):
+    monkeypatch.setattr(fetcher, "_sessions", fetcher.OrderedDict())
+    monkeypatch.setattr(fetcher, "MAX_SESSIONS", 2)
+    a = fetcher._session_for("https://a.example/1")
+    fetcher._session_for("https://b.example/1")
+    fetcher._session_for("https://a.example/2")          # a is now the most recent
+    closed = []
+    monkeypatch.setattr(fetcher._sessions["https://b.example"], "close", lambda: closed.append("b"))
+
+    fetcher._session_for("https://c.example/1")
+
+    assert list(fetcher._sessions) == ["https://a.example", "https://c.example"]
+    assert closed == ["b"]
+    assert fetcher._session_for("https://a.example/3") is a
+
+
+class _Server:
+    """Answers conditional requests for the current ETag with a 304."""
+
+    def __init__(self, body, etag):
+        self.body, self.etag = body, etag
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        if headers.get("If-None-Match") == self.etag:
+            return _Response(b"", status_code=304, etag=self.etag)
+        return _Response(self.body, etag=self.etag)
+
+
+def test_a_stored_response_keeps_its_validators_and_body_together(monkeypatch):
+    url = "https://example.com/page"
+    meta, old_body = _cached(url, body=b"old body")
+    server = _Server(b"new body", '"v2"')
+    monkeypatch.setattr(fetcher, "_session_for", lambda url: server)
+
+    first = fetcher.fetch(url)
+    second = fetcher.fetch(url)
+
+    assert (first["content"], first["not_modified"]) == (b"new body", False)
+    assert (second["content"], second["not_modified"]) == (b"new body", True)
+    assert first["cache_id"] == second["cache_id"] != old_body.name
+    assert not old_body.exists()
+    assert [h.get("If-None-Match") for h in server.requests] == ['"v1"', '"v2"']
+
+
+def test_a_304_without_the_cached_body_is_refetched_unconditionally(monkeypatch):
+    url = "https://example.com/page"
+    _, body_path = _cached(url, body=b"page", etag='"v1"')
+    server = _Server(b"page", '"v1"')
+    get = server.get
+
+    def get_after_gc(url, headers=None, **kwargs):
+        body_path.unlink(missing_ok=True)      # collected while the request was in flight
+        return get(url, headers, **kwargs)
+    monkeypatch.setattr(fetcher, "_session_for", lambda url: type("Session", (), {"get": staticmethod(get_after_gc)})())
+
+    result = fetcher.fetch(url)
+
+    assert (result["content"], result["status_code"], result["not_modified"]) == (b"page", 200, False)
+    assert server.requests == [{"If-None-Match": '"v1"'}, {}]
+
+
+def test_remember_only_attaches_to_the_response_it_was_derived_from(monkeypatch):
+    url = "https://example.com/page"
+    server = _Server(b"v2 body", '"v2"')
+    monkeypatch.setattr(fetcher, "_session_for", lambda url: server)
+    outdated = fetcher.fetch(url)["cache_id"]
+    server.body, server.etag = b"v3 body", '"v3"'
+    current = fetcher.fetch(url)["cache_id"]
+
+    fetcher.remember(url, outdated, scrape_result={"title": "v2"})
+    assert fetcher.fetch(url)["extra"] == {}
+
+    fetcher.remember(url, current, scrape_result={"title": "v3"})
+    assert fetcher.fetch(url)["extra"] == {"scrape_result": {"title": "v3"}}
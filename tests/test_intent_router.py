@@ -0,0 +1,122 @@
+import hashlib
+import json
+
+import pytest
+
+from utils import intent_router
+
+VIDEO = {"type": "youtube", "url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "metadata": {}}
+PDF = {"type": "pdf", "path": "/docs/report.pdf", "metadata": {"processing_type": "simple"}}
+
+
+@pytest.fixture(autouse=True)
+def auto_mode(monkeypatch):
+    monkeypatch.setattr(intent_router, "ROUTER_MODE", "auto")
+
+
+def _tool(message, resource=None, **kwargs):
+    routed = intent_router.route(message, resource, **kwargs)
+    return routed and routed["tool"]
+
+
+@pytest.mark.parametrize("message, resource, tool", [
+    ("give me the transcript", VIDEO, "get_youtube_transcript"),
+    ("summarize this", VIDEO, "youtube_summary"),
+    ("who is the author?", PDF, "pdf_qa"),
+    ("show page 3", PDF, "extract_pdf_text"),
+    ("summarize pages 2 to 4", PDF, "extract_pdf_text"),
+])
+def test_single_keyword_rules_route_locally(message, resource, tool):
+    assert _tool(message, resource) == tool
+
+
+def test_a_registered_video_from_a_playlist_is_summarized_as_a_video():
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL1"
+    video = {"type": "youtube", "url": url, "metadata": {"video_id": "dQw4w9WgXcQ"}}
+    playlist = {"type": "youtube", "url": url, "metadata": {}}
+    assert _tool("summarize this", video) == "youtube_summary"
+    assert _tool("summarize this", playlist) == "youtube_batch_summary"
+
+
+@pytest.mark.parametrize("message, resource", [
+    ("What does the speaker say in the transcript about pricing?", VIDEO),
+    ("Can you read the document and tell me who the author is?", PDF),
+    ("Read the document and tell me who the author is", PDF),
+    ("Summarize the transcript", VIDEO),
+])
+def test_keywords_inside_questions_or_several_rules_are_ambiguous(message, resource):
+    assert _tool(message, resource) is None
+
+
+def test_rules_take_precedence_over_the_classifier():
+    decision = intent_router.classify("give me a recap")
+    assert (decision["intent"], decision["source"]) == ("summary", "rule")
+
+    decision = intent_router.classify("condense it")
+    assert decision["source"] == "classifier"
+
+
+def test_question_rule_applies_when_no_keyword_fires():
+    decision = intent_router.classify("why did they choose this approach")
+    assert (decision["intent"], decision["rules"]) == ("question", ["question"])
+
+
+def test_parse_pages():
+    assert intent_router.parse_pages("show pages 2 to 4 and 7") == "2-4,7"
+    assert intent_router.parse_pages("show the first page") is None
+
+
+def test_urls_stop_before_trailing_punctuation():
+    message = "summarize https://youtu.be/dQw4w9WgXcQ. and (https://www.youtube.com/watch?v=abc-_12&list=PL1), thanks"
+    assert intent_router._YOUTUBE_URL.findall(message) == [
+        "https://youtu.be/dQw4w9WgXcQ",
+        "https://www.youtube.com/watch?v=abc-_12&list=PL1",
+    ]
+    assert intent_router._URL.findall("scrape https://example.com/a?b=1.") == ["https://example.com/a?b=1"]
+
+
+def test_scrape_keyword_needs_a_confident_intent():
+    assert intent_router.classify("scrape https://example.com/a.")["intent"] is None
+    assert _tool("scrape https://example.com/a.") is None
+    assert _tool("what is on https://example.com/a? fetch it") is None
+    assert _tool("fetch the full text of https://example.com/a") == "scrape_web_url"
+
+
+def test_video_url_in_general_chat_keeps_its_id():
+    routed = intent_router.route("Summarize https://youtu.be/dQw4w9WgXcQ!")
+    assert routed["args"]["video_url"] == "https://youtu.be/dQw4w9WgXcQ"
+
+
+def test_unavailable_tool_falls_back_and_is_logged_as_such(state_root):
+    assert _tool("summarize this", VIDEO, available={"youtube_qa"}) is None
+
+    last = (state_root / "router" / "decisions.jsonl").read_text().splitlines()[-1]
+    assert '"outcome": "llm_fallback"' in last
+    assert '"reason": "tool_unavailable"' in last
+
+
+def test_log_keeps_a_hash_and_prefix_of_the_message(state_root):
+    message = "summarize this " + "secret " * 100
+    intent_router.log_decision(message, VIDEO, {"outcome": "local"})
+
+    entry = json.loads((state_root / "router" / "decisions.jsonl").read_text().splitlines()[-1])
+    assert entry["message_prefix"] == message[:intent_router.LOG_MESSAGE_CHARS]
+    assert entry["message_sha256"] == hashlib.sha256(message.encode()).hexdigest()[:16]
+    assert "message" not in entry
+
+
+def test_log_is_trimmed_to_its_newer_half(state_root, monkeypatch):
+    monkeypatch.setattr(intent_router, "LOG_MAX_BYTES", 2000)
+    for i in range(100):
+        intent_router.log_decision(f"message {i}", None, {"outcome": "local", "n": i})
+
+    path = state_root / "router" / "decisions.jsonl"
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert path.stat().st_size <= 2000
+    assert lines[-1]["n"] == 99
+    assert [e["n"] for e in lines] == list(range(lines[0]["n"], 100))
+
+
+def test_llm_mode_never_routes_locally(monkeypatch):
+    monkeypatch.setattr(intent_router, "ROUTER_MODE", "llm")
+    assert _tool("give me the transcript", VIDEO) is None
@@ -0,0 +1,124 @@
+import multiprocessing
+import os
+import time
+
+from services import artifacts, jobs, namespaces
+from utils import state
+from utils.state import write_json
+
+
+def _claim(root, barrier, results):
+    state.STATE_DIR = root
+    barrier.wait()
+    results.put(jobs._acquire_lock())
+
+
+def test_acquire_lock_has_one_winner_across_processes(state_root):
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(8)
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_claim, args=(state_root, barrier, results)) for _ in range(8)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=30)
+
+    assert sorted(results.get(timeout=5) for _ in processes) == [False] * 7 + [True]
+    assert not jobs._lock_path().with_suffix(".claim").exists()
+
+
+def test_acquire_lock_respects_a_live_worker():
+    write_json(jobs._lock_path(), {"pid": -1, "heartbeat": time.time()})
+
+    assert jobs.worker_alive()
+    assert not jobs._acquire_lock()
+
+
+def test_acquire_lock_takes_over_a_stale_worker():
+    write_json(jobs._lock_path(), {"pid": -1, "heartbeat": time.time() - jobs.STALE_AFTER - 1})
+
+    assert jobs._acquire_lock()
+    assert jobs._owns_lock()
+
+
+def test_acquire_lock_clears_an_abandoned_claim():
+    claim = jobs._lock_path().with_suffix(".claim")
+    claim.touch()
+    old = time.time() - jobs.STALE_AFTER - 1
+    os.utime(claim, (old, old))
+
+    assert jobs._acquire_lock()
+    assert not claim.exists()
+
+
+def test_worker_embeds_the_text_process_pdf_already_extracted(monkeypatch):
+    calls = []
+    def ingest(pdf_path, on_progress=None, resume_from=0, text=None):
+        calls.append(text)
+        return {"namespace": "pdf_abc", "chunks": 3, "reused": False, "txt_path": None}
+    monkeypatch.setattr(jobs, "ingest_pdf", ingest)
+    monkeypatch.setattr(jobs, "ensure_worker", lambda: None)
+    txt_key = artifacts.put_text("--- Page 1 ---\nextracted", source="report.pdf", kind="pdf_text")
+
+    job = jobs.enqueue_ingestion("report.pdf", txt_path=txt_key)
+    jobs._run_job(job, "w1")
+
+    assert calls == ["--- Page 1 ---\nextracted"]
+    assert jobs.get_job(job["job_id"])["status"] == "completed"
+    assert jobs.get_job(job["job_id"])["txt_path"] == txt_key
+
+
+def test_a_job_that_keeps_killing_the_worker_is_failed(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "ensure_worker", lambda: None)
+    pdf = tmp_path / "crash.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    namespace = namespaces.namespace_for_hash(namespaces.file_sha256(str(pdf)))
+    namespaces.acquire(namespace, "pdf", "sha", "crash.pdf")
+    job = jobs.enqueue_ingestion(str(pdf))
+
+    for attempt in range(1, jobs.MAX_ATTEMPTS + 1):
+        jobs._update(job, status="running", attempts=attempt)      # the worker died mid-job
+        jobs._requeue_orphaned()
+        job = jobs.get_job(job["job_id"])
+
+    assert job["status"] == "failed"
+    assert namespaces.get(namespace)["status"] == "failed"
+
+
+def test_an_orphaned_job_with_attempts_left_is_requeued(monkeypatch):
+    monkeypatch.setattr(jobs, "ensure_worker", lambda: None)
+    job = jobs.enqueue_ingestion("report.pdf")
+    jobs._update(job, status="running", attempts=1)
+
+    jobs._requeue_orphaned()
+
+    assert jobs.get_job(job["job_id"])["status"] == "queued"
+
+
+def test_a_running_job_with_a_fresh_lease_is_left_to_its_worker(monkeypatch):
+    monkeypatch.setattr(jobs, "ensure_worker", lambda: None)
+    job = jobs.enqueue_ingestion("report.pdf")
+    jobs._claim(job["job_id"], "w1")
+
+    jobs._requeue_orphaned()
+    assert jobs.get_job(job["job_id"])["status"] == "running"
+    assert jobs._claim(job["job_id"], "w2") is None
+
+
+def test_a_worker_drops_the_result_of_a_job_taken_over_by_another(monkeypatch):
+    monkeypatch.setattr(jobs, "ensure_worker", lambda: None)
+    job = jobs.enqueue_ingestion("report.pdf")
+
+    def ingest(pdf_path, on_progress=None, resume_from=0, text=None):
+        # w1 stalls past its lease: another worker re-queues and claims the job
+        jobs._update(jobs.get_job(job["job_id"]), lease=0)
+        jobs._requeue_orphaned()
+        jobs._claim(job["job_id"], "w2")
+        return {"namespace": "pdf_abc", "chunks": 3, "reused": False}
+    monkeypatch.setattr(jobs, "ingest_pdf", ingest)
+
+    jobs._run_job(job, "w1")
+
+    stored = jobs.get_job(job["job_id"])
+    assert (stored["status"], stored["worker"], stored["attempts"]) == ("running", "w2", 2)
+    assert stored["chunk_count"] is None
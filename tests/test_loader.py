@@ -0,0 +1,36 @@
+import pypdf
+
+from services.pdf import loader
+
+
+def _blank_pdf(path, pages):
+    writer = pypdf.PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(100, 100)
+    writer.write(path)
+    return str(path)
+
+
+def test_explicit_ranges_are_capped_and_return_the_rest(tmp_path):
+    pdf = _blank_pdf(tmp_path / "doc.pdf", 50)
+
+    window = loader.read_pdf_selection(pdf, "1-5000", 20)
+
+    assert window["pages"] == list(range(1, 21))
+    assert window["remaining"] == "21-50"
+
+
+def test_remaining_selection_keeps_gaps(tmp_path):
+    pdf = _blank_pdf(tmp_path / "doc.pdf", 50)
+
+    window = loader.read_pdf_selection(pdf, "1,3,5-30,45", 20)
+
+    assert window["pages"][-1] == 22
+    assert window["remaining"] == "23-30,45"
+    assert loader.read_pdf_selection(pdf, window["remaining"], 20)["remaining"] == ""
+
+
+def test_huge_and_reversed_ranges_are_clamped_to_the_document():
+    assert loader.parse_page_numbers("1-999999999", 3) == [0, 1, 2]
+    assert loader.parse_page_numbers("0-2,5-4,2", 3) == [0, 1, 1]
+    assert loader.parse_page_numbers("7-999999999", 3) == []
@@ -0,0 +1,72 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import metrics, state
+
+
+def _serve_calls(root):
+    state.STATE_DIR = root
+    metrics._histograms.clear()
+    metrics._counters.clear()
+    metrics._gauges.clear()
+    for _ in range(3):
+        with metrics.tool_call("pdf_qa", {}):
+            metrics.inc("pages_extracted", 10)
+    os._exit(0)     # like a stdio server killed with its session: no atexit flush
+
+
+def test_metrics_of_exited_processes_are_kept(state_root):
+    ctx = multiprocessing.get_context("fork")
+    for _ in range(2):
+        p = ctx.Process(target=_serve_calls, args=(state_root,))
+        p.start()
+        p.join(timeout=30)
+    metrics.inc("pages_extracted", 1)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["tool{tool=pdf_qa}"]["count"] == 6
+    assert snapshot["counters"]["pages_extracted"] == 61
+    assert snapshot["gauges"] == {}
+    prometheus = metrics.render_prometheus()
+    assert 'analyzer_tool_seconds_count{tool="pdf_qa"} 6' in prometheus
+    assert "analyzer_pages_extracted_total 61" in prometheus
+
+    # Exited processes were folded into the totals
+    files = sorted(p.name for p in (state_root / "metrics").iterdir())
+    assert "totals.json" in files
+    assert metrics.snapshot()["counters"]["pages_extracted"] == 61
+
+
+def _pool_task(_):
+    metrics.observe("tool", 0.01, tool="x")
+    metrics.flush()
+
+
+def test_forked_pool_workers_do_not_report_the_parents_metrics(state_root):
+    for _ in range(100):
+        metrics.observe("tool", 0.01, tool="x")
+    metrics.flush()
+
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork")) as pool:
+        list(pool.map(_pool_task, range(4)))
+
+    assert metrics.snapshot()["stages"]["tool{tool=x}"]["count"] == 104
+
+
+def test_a_process_that_recorded_nothing_writes_no_file(state_root):
+    metrics.flush()
+    assert not (state_root / "metrics").exists() or not any((state_root / "metrics").iterdir())
+
+
+def test_counters_already_named_total_keep_their_name():
+    metrics.inc("tool_errors_total", tool="pdf_qa")
+    assert 'analyzer_tool_errors_total{tool="pdf_qa"} 1' in metrics.render_prometheus()
+
+
+def test_quantiles_interpolate_inside_buckets():
+    for _ in range(100):
+        metrics.observe("stage", 0.015)
+    stage = metrics.snapshot()["stages"]["stage"]
+    assert stage["count"] == 100
+    assert 10 <= stage["p50_ms"] <= 25
@@ -0,0 +1,137 @@
+import multiprocessing
+import time
+
+import pytest
+
+from services import namespaces
+from utils import state
+from utils.state import update_json
+
+
+@pytest.fixture(autouse=True)
+def deleted(monkeypatch):
+    """Namespaces whose vectors were deleted (instead of calling Pinecone)."""
+    calls = []
+    monkeypatch.setattr(namespaces, "_delete_vectors", calls.append)
+    return calls
+
+
+def _ready(namespace, owner, vectors=10):
+    namespaces.acquire(namespace, "pdf", namespace, f"{namespace}.pdf", owner=owner)
+    namespaces.mark_ready(namespace, vectors)
+
+
+def test_acquire_and_release_count_owners():
+    namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s1")
+    entry = namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s2")
+
+    assert entry["status"] == "ingesting"
+    assert namespaces.refcount(entry) == 2
+    assert namespaces.release("pdf_a", owner="s1") == 1
+    assert namespaces.release("pdf_a", owner="s2") == 0
+    assert namespaces.release("pdf_unknown", owner="s1") is None
+
+
+def test_reuse_only_returns_ready_namespaces():
+    namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s1")
+    assert namespaces.reuse("pdf_a", owner="s2") is None
+
+    namespaces.mark_ready("pdf_a", 42)
+    entry = namespaces.reuse("pdf_a", owner="s2")
+    assert entry["vectors"] == 42
+    assert set(entry["owners"]) == {"s1", "s2"}
+
+
+def test_failed_ingestion_starts_over_on_acquire():
+    namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s1")
+    namespaces.mark_failed("pdf_a", "boom", owner="s1")
+    assert namespaces.get("pdf_a")["status"] == "failed"
+    assert namespaces.get("pdf_a")["owners"] == {}
+
+    entry = namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s2")
+    assert entry["status"] == "ingesting"
+    assert "error" not in entry
+
+
+def test_evict_purges_unreferenced_namespaces_only(deleted):
+    _ready("pdf_kept", "s1")
+    _ready("pdf_released", "s2")
+    namespaces.release("pdf_released", owner="s2")
+
+    result = namespaces.evict(max_vectors=0)
+
+    assert result["purged"] == ["pdf_released"]
+    assert deleted == ["pdf_released"]
+    assert namespaces.get("pdf_released") is None
+    assert namespaces.get("pdf_kept") is not None
+
+
+def test_evict_drops_least_recently_used_over_the_vector_limit(deleted):
+    _ready("pdf_old", "s1", vectors=60)
+    time.sleep(0.01)
+    _ready("pdf_new", "s2", vectors=60)
+
+    result = namespaces.evict(max_vectors=100)
+
+    assert result["purged"] == ["pdf_old"]
+    assert result["vectors"] == 60
+
+
+def test_evict_never_drops_a_live_ingestion_for_room(deleted):
+    namespaces.acquire("pdf_ingesting", "pdf", "x", "x.pdf", owner="s1")
+    with update_json(namespaces._registry_path(), {}) as registry:
+        registry["pdf_ingesting"]["vectors"] = 500
+
+    assert namespaces.evict(max_vectors=100)["purged"] == []
+    assert deleted == []
+
+
+def test_purge_rechecks_references_under_the_lock(deleted):
+    _ready("pdf_a", "s1")
+
+    assert "error" in namespaces.purge("pdf_a")
+    decided_at = namespaces.get("pdf_a")["last_access"]
+    time.sleep(0.01)
+    namespaces.acquire("pdf_a", "pdf", "a", "a.pdf", owner="s2")
+    assert "error" in namespaces.purge("pdf_a", force=True, unused_since=decided_at)
+    assert deleted == []
+
+    assert namespaces.purge("pdf_a", force=True)["purged"]
+    assert deleted == ["pdf_a"]
+
+
+def test_a_failed_delete_can_be_retried(monkeypatch):
+    _ready("pdf_a", "s1")
+    namespaces.release("pdf_a", owner="s1")
+    def unavailable(namespace):
+        raise ConnectionError("Pinecone unavailable")
+    monkeypatch.setattr(namespaces, "_delete_vectors", unavailable)
+
+    assert namespaces.evict()["errors"] == [{"namespace": "pdf_a", "error": "Pinecone unavailable"}]
+    assert namespaces.get("pdf_a")["status"] == "ready"
+
+    monkeypatch.setattr(namespaces, "_delete_vectors", lambda namespace: None)
+    assert namespaces.evict()["purged"] == ["pdf_a"]
+
+
+def _acquire_many(root, worker):
+    state.STATE_DIR = root
+    for i in range(20):
+        namespaces.acquire("pdf_shared", "pdf", "shared", "shared.pdf", owner=f"w{worker}_{i}")
+
+
+def test_concurrent_acquires_keep_every_owner(state_root):
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_acquire_many, args=(state_root, w)) for w in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join(timeout=60)
+
+    assert len(namespaces.get("pdf_shared")["owners"]) == 80
+
+
+def test_gc_runs_are_rate_limited_across_processes():
+    assert namespaces._claim_gc_run(3600)
+    assert not namespaces._claim_gc_run(3600)
+    assert namespaces._claim_gc_run(0)
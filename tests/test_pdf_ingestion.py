@@ -0,0 +1,41 @@
+import pytest
+
+from services import namespaces
+from services.pdf import pdf_ingestion
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "report.pdf"
+    path.write_bytes(b"%PDF-1.4 report")
+    return path
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(pdf_ingestion, "Pinecone", lambda api_key: type("PC", (), {"Index": lambda self, name: None})())
+    monkeypatch.setattr(pdf_ingestion, "_ensure_index", lambda pc: None)
+
+
+def test_ingestion_marks_the_namespace_ready(pdf, monkeypatch):
+    upserted = []
+    monkeypatch.setattr(pdf_ingestion, "_embed_and_upsert", lambda records, pc, index, ns: upserted.extend(records))
+
+    result = pdf_ingestion.ingest_pdf(str(pdf), text="--- Page 1 ---\n" + "words " * 2000)
+
+    entry = namespaces.get(result["namespace"])
+    assert (entry["status"], entry["vectors"]) == ("ready", result["chunks"])
+    assert len(upserted) == result["chunks"]
+
+
+def test_failed_ingestion_marks_the_namespace_failed(pdf, monkeypatch):
+    def fail(records, pc, index, ns):
+        raise RuntimeError("embedding budget exhausted")
+    monkeypatch.setattr(pdf_ingestion, "_embed_and_upsert", fail)
+
+    with pytest.raises(RuntimeError):
+        pdf_ingestion.ingest_pdf(str(pdf), text="--- Page 1 ---\n" + "words " * 2000)
+
+    entry = namespaces.get(namespaces.namespace_for_hash(namespaces.file_sha256(str(pdf))))
+    assert entry["status"] == "failed"
+    assert entry["owners"] == {}
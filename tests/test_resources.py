@@ -0,0 +1,143 @@
+from pathlib import Path
+
+import pytest
+
+from services import artifacts, namespaces, resources
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.4 test")
+    return path
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "https://m.youtube.com/watch?feature=share&v=dQw4w9WgXcQ",
+    "https://youtu.be/dQw4w9WgXcQ",
+    "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+    "https://www.youtube-nocookie.com/embed/dQw4w9WgXcQ",
+])
+def test_youtube_urls_of_one_video_share_a_key(url):
+    assert resources.resource_key("youtube", url) == "youtube:dQw4w9WgXcQ"
+
+
+def test_playlist_key_uses_the_list_id():
+    url = "https://www.youtube.com/playlist?list=PL123abc"
+    assert resources.resource_key("youtube", url) == "youtube:list=PL123abc"
+
+
+def test_a_video_opened_from_a_playlist_is_keyed_as_the_video():
+    key = resources.resource_key("youtube", "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123abc")
+    assert key == "youtube:dQw4w9WgXcQ"
+    assert resources.is_video_key(key)
+    assert not resources.is_video_key("youtube:list=PL123abc")
+    assert not resources.is_video_key(resources.resource_key("youtube", "https://www.youtube.com/@somechannel"))
+
+
+def test_lookup_drops_a_playlist_stub_stored_under_a_video_key():
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123abc"
+    resources.register("youtube", url, "Playlist", {"status": "success", "collection": True}, url=url, owner="s1")
+
+    assert resources.lookup("youtube:dQw4w9WgXcQ", owner="s1") is None
+
+
+def test_website_key_uses_the_normalized_url():
+    a = resources.resource_key("website", "HTTPS://Example.com:443/docs/?utm_source=x&b=2&a=1#intro")
+    b = resources.resource_key("website", "https://example.com/docs?a=1&b=2")
+    assert a == b == "website:https://example.com/docs?a=1&b=2"
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        resources.resource_key("podcast", "x")
+
+
+def test_registered_pdf_survives_the_upload(pdf):
+    entry = resources.register("pdf", "abc", "Report", {"status": "success"}, path=str(pdf), owner="s1")
+    pdf.unlink()
+
+    found = resources.lookup(resources.resource_key("pdf", "abc"), owner="s2")
+    assert found["id"] == entry["id"]
+    assert Path(found["path"]).exists()
+    assert set(found["owners"]) == {"s1", "s2"}
+    assert found["hits"] == 1
+
+
+def test_the_pdf_is_copied_without_holding_the_registry_lock(pdf, monkeypatch):
+    lock = Path(str(resources._registry_path().resolve()) + ".lock")
+    copied_while_locked = []
+    copyfile = resources.shutil.copyfile
+    def copy(src, dst):
+        copied_while_locked.append(lock.exists())
+        return copyfile(src, dst)
+    monkeypatch.setattr(resources.shutil, "copyfile", copy)
+
+    resources.register("pdf", "abc", "Report", {"status": "success"}, path=str(pdf), owner="s1")
+
+    assert copied_while_locked == [False]
+
+
+def test_lookup_drops_an_entry_whose_artifact_is_gone(pdf):
+    txt_path = artifacts.put_text("hello", source="upload.pdf", kind="pdf_text")
+    entry = resources.register("pdf", "abc", "Report", {"status": "success", "txt_path": txt_path},
+                               path=str(pdf), owner="s1")
+    artifacts.delete(txt_path)
+
+    assert resources.lookup("pdf:abc", owner="s1") is None
+    assert resources.get("pdf:abc") is None
+    assert not Path(entry["path"]).exists()
+
+
+def test_lookup_drops_a_pdf_whose_namespace_was_evicted(pdf):
+    resources.register("pdf", "abc", "Report", {"status": "success", "namespace": "pdf_abc"},
+                       path=str(pdf), owner="s1")
+
+    assert resources.lookup("pdf:abc", owner="s1") is None
+
+
+def test_lookup_completes_a_queued_ingestion(pdf):
+    namespaces.acquire("pdf_abc", "pdf", "abc", "upload.pdf", owner="s1")
+    resources.register("pdf", "abc", "Report", {"status": "queued", "namespace": "pdf_abc", "job_id": "j1"},
+                       path=str(pdf), owner="s1")
+    assert resources.lookup("pdf:abc", owner="s1")["metadata"]["status"] == "queued"
+
+    namespaces.mark_ready("pdf_abc", 12)
+    metadata = resources.lookup("pdf:abc", owner="s1")["metadata"]
+    assert metadata["status"] == "success"
+    assert metadata["chunk_count"] == 12
+    assert "job_id" not in metadata
+
+
+def test_record_ingestion_updates_the_queuing_entry(pdf):
+    resources.register("pdf", "abc", "Report", {"status": "queued", "job_id": "j1"}, path=str(pdf))
+
+    resources.record_ingestion({"job_id": "j1", "chunk_count": 7, "txt_path": "key"})
+    metadata = resources.get("pdf:abc")["metadata"]
+    assert (metadata["status"], metadata["chunk_count"], metadata["txt_path"]) == ("success", 7, "key")
+    assert "job_id" not in metadata
+    assert resources.record_ingestion({"job_id": "j1", "chunk_count": 7}) is None
+
+
+def test_gc_removes_entries_nobody_used_within_the_ttl():
+    resources.register("website", "https://example.com", "Site", {"status": "success"}, owner="s1")
+
+    assert resources.gc(ttl_days=1)["removed"] == 0
+    assert resources.gc(ttl_days=-1)["removed"] == 1
+
+
+def test_gc_removes_stale_entries_but_not_ones_re_registered_meanwhile(monkeypatch):
+    resources.register("website", "https://a.example", "A", {"status": "success", "txt_path": "gone"})
+    resources.register("website", "https://b.example", "B", {"status": "success", "txt_path": "gone"})
+
+    def re_register_b(entry):
+        if entry["name"] == "B":
+            resources.register("website", "https://b.example", "B", {"status": "success"})
+        return True
+
+    monkeypatch.setattr(resources, "_is_stale", re_register_b)
+
+    assert resources.gc()["removed"] == 1
+    assert resources.get(resources.resource_key("website", "https://a.example")) is None
+    assert resources.get(resources.resource_key("website", "https://b.example"))["metadata"] == {"status": "success"}
@@ -0,0 +1,84 @@
+import pytest
+
+from utils import scheduler
+from utils.scheduler import BATCH, INTERACTIVE
+
+LIMIT = (60, 6000)      # one request and 100 tokens per second
+
+
+@pytest.fixture(autouse=True)
+def reserve(monkeypatch):
+    monkeypatch.setattr(scheduler, "INTERACTIVE_RESERVE", 0.2)
+
+
+def _bucket(key="groq:test"):
+    return scheduler.read_json(scheduler._buckets_path(), {})[key]
+
+
+def test_new_bucket_starts_full():
+    bucket = scheduler._refill(None, LIMIT, now=1000.0)
+    assert (bucket["requests"], bucket["tokens"]) == (60.0, 6000.0)
+
+
+def test_refill_is_proportional_to_elapsed_time_and_capped():
+    bucket = {"requests": 0.0, "tokens": 0.0, "updated": 1000.0, "blocked_until": 0, "waiting": {}}
+    bucket = scheduler._refill(bucket, LIMIT, now=1010.0)
+    assert bucket["requests"] == pytest.approx(10.0)
+    assert bucket["tokens"] == pytest.approx(1000.0)
+
+    bucket = scheduler._refill(bucket, LIMIT, now=2000.0)
+    assert (bucket["requests"], bucket["tokens"]) == (60.0, 6000.0)
+
+
+def test_refill_forgets_expired_waiters():
+    bucket = {"requests": 1.0, "tokens": 1.0, "updated": 1000.0, "blocked_until": 0,
+              "waiting": {"gone": 1001.0, "polling": 1100.0}}
+    assert scheduler._refill(bucket, LIMIT, now=1050.0)["waiting"] == {"polling": 1100.0}
+
+
+def test_take_consumes_one_request_and_the_token_cost():
+    assert scheduler._try_take("groq:test", LIMIT, 500, INTERACTIVE, "w1") == 0
+    bucket = _bucket()
+    assert bucket["requests"] == pytest.approx(59.0, abs=0.01)
+    assert bucket["tokens"] == pytest.approx(5500.0, abs=1)
+
+
+def test_wait_is_the_time_to_refill_the_shortfall():
+    scheduler._try_take("groq:test", LIMIT, 5900, INTERACTIVE, "w1")     # 100 tokens left
+
+    wait = scheduler._try_take("groq:test", LIMIT, 400, INTERACTIVE, "w2")
+    assert wait == pytest.approx(3.0, abs=0.05)                          # 300 tokens at 100/s
+    assert "w2" in _bucket()["waiting"]
+
+
+def test_batch_calls_leave_the_interactive_reserve():
+    scheduler._try_take("groq:test", LIMIT, 4000, INTERACTIVE, "w1")     # 2000 tokens left
+
+    # Batch needs its cost plus 20% of the bucket (1200 tokens)
+    assert scheduler._try_take("groq:test", LIMIT, 1000, BATCH, "b1") > 0
+    assert scheduler._try_take("groq:test", LIMIT, 1000, INTERACTIVE, "w2") == 0
+
+
+def test_batch_yields_to_waiting_interactive_calls():
+    scheduler._try_take("groq:test", LIMIT, 6000, INTERACTIVE, "w1")
+    assert scheduler._try_take("groq:test", LIMIT, 1000, INTERACTIVE, "w2") > 0
+
+    assert scheduler._try_take("groq:test", LIMIT, 0, BATCH, "b1") == pytest.approx(0.05)
+
+
+def test_a_429_blocks_the_bucket():
+    scheduler._block("groq:test", LIMIT, 30)
+    assert scheduler._try_take("groq:test", LIMIT, 1, INTERACTIVE, "w1") == pytest.approx(30, abs=0.5)
+
+
+def test_settle_returns_overestimated_tokens():
+    scheduler._try_take("groq:test", LIMIT, 1000, INTERACTIVE, "w1")
+    scheduler._settle("groq:test", LIMIT, estimated=1000, actual=200)
+    assert _bucket()["tokens"] == pytest.approx(5800.0, abs=1)
+
+
+def test_parse_limits():
+    assert scheduler._parse_limits("off") == {}
+    limits = scheduler._parse_limits("groq:model-a=30/1000,pinecone:query=600/0")
+    assert limits["groq:model-a"] == (30, 1000)
+    assert limits["pinecone:query"] == (600, 0)
@@ -0,0 +1,53 @@
+import multiprocessing
+import time
+
+from utils import state
+from utils.state import locked
+
+
+def _hold(root, path, acquired, seconds):
+    state.STATE_DIR = root
+    with locked(path):
+        acquired.set()
+        time.sleep(seconds)
+
+
+def test_a_lock_held_past_the_stale_limit_is_not_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "LOCK_STALE_AFTER", 0.5)
+    monkeypatch.setattr(state, "LOCK_HEARTBEAT", 0.1)
+    path = tmp_path / "registry.json"
+    ctx = multiprocessing.get_context("fork")
+    acquired = ctx.Event()
+    holder = ctx.Process(target=_hold, args=(tmp_path, path, acquired, 1.5))
+    holder.start()
+    assert acquired.wait(timeout=10)
+
+    started = time.monotonic()
+    with locked(path):
+        waited = time.monotonic() - started
+    holder.join(timeout=10)
+
+    assert waited > 1.0
+
+
+def test_a_lock_of_a_dead_process_is_taken_over(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "LOCK_STALE_AFTER", 0.2)
+    path = tmp_path / "registry.json"
+    lock = tmp_path / "registry.json.lock"
+    lock.write_text("token-of-a-dead-process")
+
+    started = time.monotonic()
+    with locked(path):
+        assert lock.read_text() != "token-of-a-dead-process"
+    assert time.monotonic() - started < 5
+    assert not lock.exists()
+
+
+def test_the_holder_leaves_a_lock_file_that_is_no_longer_its_own(tmp_path):
+    path = tmp_path / "registry.json"
+    lock = tmp_path / "registry.json.lock"
+
+    with locked(path):
+        lock.write_text("taken over by another process")
+
+    assert lock.read_text() == "taken over by another process"
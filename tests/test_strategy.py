@@ -0,0 +1,56 @@
+import pytest
+
+from services.pdf import strategy
+from services.pdf.strategy import CHARS_PER_TOKEN, LOCAL_INDEX_MAX_TOKENS, SIMPLE_MAX_TOKENS
+
+
+def _text(tokens):
+    return "x" * (tokens * CHARS_PER_TOKEN)
+
+
+def test_estimate_rounds_partial_tokens_up():
+    assert strategy.estimate_tokens("") == 0
+    assert strategy.estimate_tokens("x") == 1
+    assert strategy.estimate_tokens("x" * (CHARS_PER_TOKEN + 1)) == 2
+
+
+@pytest.mark.parametrize("tokens, processing_type", [
+    (SIMPLE_MAX_TOKENS, "simple"),
+    (SIMPLE_MAX_TOKENS + 1, "local"),
+    (LOCAL_INDEX_MAX_TOKENS, "local"),
+    (LOCAL_INDEX_MAX_TOKENS + 1, "vector"),
+])
+def test_thresholds_are_inclusive_upper_bounds(tokens, processing_type):
+    chosen = strategy.choose_strategy(_text(tokens), page_count=10)
+    assert chosen["processing_type"] == processing_type
+    assert chosen["token_count"] == tokens
+    assert "estimated" not in chosen
+
+
+def test_one_extra_character_crosses_the_threshold():
+    assert strategy.choose_strategy(_text(SIMPLE_MAX_TOKENS) + "x", 1)["processing_type"] == "local"
+
+
+def test_estimate_extrapolates_the_sample_to_all_pages():
+    sample = _text(SIMPLE_MAX_TOKENS // 10)     # 5 pages worth of a 50-page document
+    estimated = strategy.estimate_strategy(sample, sampled_pages=5, page_count=50)
+
+    assert estimated["token_count"] == SIMPLE_MAX_TOKENS
+    assert estimated["processing_type"] == "simple"
+    assert estimated["estimated"] is True
+    assert estimated["sampled_pages"] == 5
+    assert estimated["reason"].startswith("~")
+    assert "(estimated from 5 of 50 pages)" in estimated["reason"]
+
+
+def test_estimate_just_past_a_threshold_picks_the_next_strategy():
+    sample = _text(LOCAL_INDEX_MAX_TOKENS // 10 + 1)
+    estimated = strategy.estimate_strategy(sample, sampled_pages=1, page_count=10)
+    assert estimated["token_count"] == LOCAL_INDEX_MAX_TOKENS + 10
+    assert estimated["processing_type"] == "vector"
+
+
+def test_estimate_with_no_sampled_pages_does_not_divide_by_zero():
+    estimated = strategy.estimate_strategy("", sampled_pages=0, page_count=3)
+    assert estimated["token_count"] == 0
+    assert estimated["processing_type"] == "simple"
@@ -0,0 +1,86 @@
+import os
+import time
+
+from utils import tracing
+from utils.state import read_json, write_json
+
+
+def _events(trace_id):
+    events = read_json(tracing._traces_dir() / f"{trace_id}.json")["traceEvents"]
+    return {e["name"]: e["args"] for e in events}
+
+
+def test_nested_spans_record_their_parent():
+    with tracing.trace("tool:demo") as active:
+        with tracing.span("outer"):
+            with tracing.span("inner", page=3):
+                pass
+        with tracing.span("sibling"):
+            pass
+
+    spans = _events(active.trace_id)
+    root = spans["tool:demo"]
+    assert root["parent_id"] is None
+    assert spans["outer"]["parent_id"] == root["span_id"]
+    assert spans["inner"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["inner"]["page"] == "3"
+    assert spans["sibling"]["parent_id"] == root["span_id"]
+
+
+def test_spans_outside_a_trace_are_a_shared_no_op(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_TOOLS", set())
+    monkeypatch.setattr(tracing, "SAMPLE_RATE", 0.0)
+
+    assert tracing.span("stage") is tracing._NOOP
+    assert tracing.tool_trace("pdf_qa", {}) is tracing._NOOP
+    with tracing.tool_trace("pdf_qa", {}):
+        assert tracing.current_trace_id() is None
+    assert not list(tracing._traces_dir().glob("*.json"))
+
+
+def test_a_profiled_trace_writes_a_profile_next_to_it():
+    with tracing.trace("tool:demo", profile=True) as active:
+        sum(range(1000))
+
+    metadata = tracing.load_trace(active.trace_id)
+    assert metadata["profile"] and os.path.exists(metadata["profile"])
+
+
+def test_prune_keeps_the_newest_traces_and_their_profiles(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_FILES", 2)
+    directory = tracing._traces_dir()
+    now = time.time()
+    for i in range(4):
+        for suffix in (".json", ".prof"):
+            path = directory / f"t{i}{suffix}"
+            path.write_text("{}")
+            os.utime(path, (now - 100 + i, now - 100 + i))
+
+    tracing._prune(directory)
+
+    assert sorted(p.name for p in directory.iterdir()) == ["t2.json", "t2.prof", "t3.json", "t3.prof"]
+
+
+def test_load_trace_splits_total_and_self_time_per_stage():
+    def event(name, span_id, parent_id, dur_us):
+        return {"name": name, "ph": "X", "ts": 0, "dur": dur_us, "args": {"span_id": span_id, "parent_id": parent_id}}
+
+    write_json(tracing._traces_dir() / "abc123.json", {
+        "traceEvents": [
+            event("tool:demo", 1, None, 10_000),
+            event("embed", 2, 1, 3_000),
+            event("embed", 3, 1, 2_000),
+            event("llm", 4, 1, 4_000),
+            event("http", 5, 4, 5_000),     # overlaps its parent: self time floors at 0
+        ],
+        "metadata": {"trace_id": "abc123", "name": "tool:demo"}
+    })
+
+    stages = {s["name"]: s for s in tracing.load_trace("abc123")["stages"]}
+
+    assert stages["tool:demo"] == {"name": "tool:demo", "count": 1, "total_ms": 10.0, "self_ms": 1.0}
+    assert (stages["embed"]["count"], stages["embed"]["total_ms"], stages["embed"]["self_ms"]) == (2, 5.0, 5.0)
+    assert stages["llm"]["self_ms"] == 0.0
+    assert stages["http"]["self_ms"] == 5.0
+    assert tracing.load_trace("../etc") is None
+    assert tracing.load_trace("missing") is None
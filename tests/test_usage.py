@@ -0,0 +1,61 @@
+import time
+from types import SimpleNamespace
+
+from services import resources
+from utils import usage
+
+
+def test_session_totals_add_up_llm_and_embedding_usage():
+    with usage.scope("pdf_qa", session="s1"):
+        usage.record_llm("model-a", prompt_tokens=100, completion_tokens=20)
+        usage.record_embedding("embed-a", inputs=3, embed_tokens=30)
+
+    totals = usage.session_totals("s1")
+    assert (totals["llm_tokens"], totals["embed_inputs"], totals["embed_tokens"]) == (120, 3, 30)
+
+
+def test_summary_is_unchanged_by_compaction():
+    with usage.scope("pdf_qa", session="s1"):
+        for _ in range(5):
+            usage.record_llm("model-a", prompt_tokens=10, completion_tokens=1)
+    with usage.scope("youtube_qa", session="s2"):
+        usage.record_embedding("embed-a", inputs=2)
+    before = usage.summary(group_by="tool")
+
+    usage.compact_events()
+
+    assert usage._events_path().stat().st_size == 0
+    assert usage.summary(group_by="tool")["groups"] == before["groups"]
+    assert usage.summary(group_by="session", session="s2")["total"]["embed_inputs"] == 2
+
+
+def test_oversized_log_is_compacted_on_write(monkeypatch):
+    monkeypatch.setattr(usage, "EVENTS_MAX_BYTES", 1)
+    with usage.scope("pdf_qa", session="s1"):
+        usage.record_llm("model-a", prompt_tokens=10, completion_tokens=1)
+        usage.record_llm("model-a", prompt_tokens=10, completion_tokens=1)
+
+    assert usage._events_path().stat().st_size == 0
+    assert usage.summary()["total"]["prompt_tokens"] == 20
+
+
+def test_summary_since_skips_older_events():
+    with usage.scope("pdf_qa", session="s1"):
+        usage.record_llm("model-a", prompt_tokens=10, completion_tokens=0)
+    assert usage.summary(since=time.time() + 1)["total"] == {}
+
+
+def test_list_and_release_tools_resolve_the_session_that_acquired(monkeypatch):
+    monkeypatch.delenv("ANALYZER_SESSION", raising=False)
+    import server
+    ctx = SimpleNamespace(session_id="mcp-session-1")
+    with usage.tool_scope("scrape_web_url", {"ctx": ctx}):
+        entry = resources.register("website", "https://example.com", "Site", {"status": "success"})
+
+    def tool(name):
+        fn = getattr(server, name)
+        return getattr(fn, "fn", fn)
+
+    assert [r["id"] for r in tool("list_resources")(ctx=ctx)["resources"]] == [entry["id"]]
+    assert tool("release_resource")(resource_id=entry["id"], ctx=ctx)["released"]
+    assert tool("list_resources")(ctx=ctx)["resources"] == []
@@ -0,0 +1,136 @@
+import pytest
+
+from benchmarks import fakes
+from benchmarks.synthetic import make_transcript
+from services import youtube_batch
+
+# Shaped like a playlist page: ytInitialData with the playlist entries
+# (one repeated), plus "videoId"s of unrelated recommendations
+PLAYLIST_PAGE = """<!DOCTYPE html><html><head><title>Talks - YouTube</title></head><body>
+<script nonce="x">var ytInitialData = {"contents":{"twoColumnBrowseResultsRenderer":{"tabs":[{"tabRenderer":
+{"content":{"sectionListRenderer":{"contents":[{"itemSectionRenderer":{"contents":[{"playlistVideoListRenderer":
+{"contents":[
+{"playlistVideoRenderer":{"videoId":"aaaaaaaaaa1","thumbnail":{"thumbnails":[]},"title":{"runs":[{"text":"One"}]}}},
+{"playlistVideoRenderer":{"videoId":"bbbbbbbbb-2","thumbnail":{"thumbnails":[]},"title":{"runs":[{"text":"Two"}]}}},
+{"playlistVideoRenderer":{"videoId":"aaaaaaaaaa1","thumbnail":{"thumbnails":[]},"title":{"runs":[{"text":"One again"}]}}},
+{"playlistVideoRenderer":{"videoId":"ccccccccc_3","thumbnail":{"thumbnails":[]},"title":{"runs":[{"text":"Three"}]}}}
+]}}]}}]}}}}]}},"secondaryContents":{"compactVideoRenderer":{"videoId":"zzzzzzzzzz9"}}};</script>
+</body></html>"""
+
+CHANNEL_PAGE = """<html><body><script>var ytInitialData = {"richGridRenderer":{"contents":[
+{"richItemRenderer":{"content":{"videoRenderer":{"videoId":"ddddddddd44","title":{"runs":[{"text":"Latest"}]}}}}},
+{"richItemRenderer":{"content":{"videoRenderer":{"videoId":"eeeeeeeee55","title":{"runs":[{"text":"Older"}]}}}}}
+]},"header":{"videoId":"zzzzzzzzzz9"}};</script></body></html>"""
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    """Serves youtube.com pages through fetcher.fetch; records requested URLs."""
+    served = {}
+    requested = []
+
+    def fetch(url, use_cache=True, max_bytes=None):
+        requested.append(url)
+        return {"content": served[url].encode("utf-8"), "encoding": "utf-8"}
+
+    monkeypatch.setattr(youtube_batch.fetcher, "fetch", fetch)
+    return served, requested
+
+
+def test_playlist_ids_come_from_the_playlist_entries_in_page_order(pages):
+    served, requested = pages
+    served["https://www.youtube.com/playlist?list=PLtalks"] = PLAYLIST_PAGE
+
+    ids = youtube_batch.playlist_video_ids("https://www.youtube.com/watch?v=aaaaaaaaaa1&list=PLtalks")
+
+    assert ids == ["aaaaaaaaaa1", "bbbbbbbbb-2", "ccccccccc_3"]
+    assert requested == ["https://www.youtube.com/playlist?list=PLtalks"]
+    assert youtube_batch.playlist_video_ids("https://www.youtube.com/playlist?list=PLtalks", limit=2) == [
+        "aaaaaaaaaa1", "bbbbbbbbb-2"]
+
+
+def test_channel_ids_come_from_its_videos_tab(pages):
+    served, _ = pages
+    served["https://www.youtube.com/@speaker/videos"] = CHANNEL_PAGE
+
+    assert youtube_batch.playlist_video_ids("https://www.youtube.com/@speaker/featured") == [
+        "ddddddddd44", "eeeeeeeee55"]
+
+
+def test_pages_without_known_renderers_fall_back_to_any_video_id(pages):
+    served, _ = pages
+    served["https://www.youtube.com/playlist?list=PLnew"] = '{"lockupViewModel":{"videoId":"fffffffff66"}}'
+
+    assert youtube_batch.playlist_video_ids("https://www.youtube.com/playlist?list=PLnew") == ["fffffffff66"]
+    with pytest.raises(ValueError):
+        youtube_batch.playlist_video_ids("https://www.youtube.com/results?search_query=talks")
+
+
+@pytest.fixture
+def transcripts(monkeypatch):
+    """Fake Groq/YouTube clients without latency; returns the transcript registry."""
+    monkeypatch.setattr(fakes, "LATENCY_SCALE", 0)
+    fakes.reset()
+    with fakes.installed():
+        yield fakes.TRANSCRIPTS
+    fakes.reset()
+
+
+def test_a_video_without_a_transcript_fails_alone(transcripts):
+    transcripts["aaaaaaaaaa1"] = make_transcript("aaaaaaaaaa1", 2)
+    videos = youtube_batch.resolve_videos(video_urls=[
+        "https://youtu.be/aaaaaaaaaa1", "https://youtu.be/bbbbbbbbbb2", "not a url"])
+
+    results = youtube_batch.summarize_videos(videos, workers=2)
+
+    assert [r["status"] for r in results] == ["success", "error", "error"]
+    assert results[0]["summary"] and results[0]["transcript_words"] > 0
+
+
+def _digest_prompts(monkeypatch):
+    prompts = []
+    llm_call = youtube_batch.llm_call
+
+    def recording(prompt):
+        prompts.append(prompt)
+        return llm_call(prompt)
+
+    monkeypatch.setattr(youtube_batch, "llm_call", recording)
+    return prompts
+
+
+def test_oversized_digests_are_reduced_in_rounds(transcripts, monkeypatch):
+    monkeypatch.setattr(youtube_batch, "DIGEST_MAX_CHARS", 2500)
+    results = [{"status": "success", "url": f"https://youtu.be/{i:011d}", "summary": "word " * 240}
+               for i in range(8)]
+    results.append({"status": "error", "url": "https://youtu.be/failed00000", "error": "private"})
+    prompts = _digest_prompts(monkeypatch)
+
+    digest = youtube_batch.build_digest(results, workers=4)
+
+    first_round = youtube_batch._digest_groups([f"### {r['url']}\n{r['summary']}" for r in results[:8]])
+    assert len(first_round) == 4
+    # 4 groups, then their 4 partial digests in 2 groups, then the final combine
+    assert len(prompts) == 4 + 2 + 1
+    assert digest
+    assert all("failed00000" not in p for p in prompts)
+
+
+def test_digest_reduction_stops_when_partials_do_not_shrink(monkeypatch):
+    monkeypatch.setattr(youtube_batch, "DIGEST_MAX_CHARS", 100)
+    prompts = []
+
+    def verbose(prompt):
+        prompts.append(prompt)
+        return "x" * 500
+
+    monkeypatch.setattr(youtube_batch, "llm_call", verbose)
+    results = [{"status": "success", "url": f"u{i}", "summary": "s" * 80} for i in range(3)]
+
+    assert youtube_batch.build_digest(results) == "x" * 500
+    assert len(prompts) == 3 + 1
+
+
+def test_a_digest_needs_a_successful_summary():
+    with pytest.raises(ValueError):
+        youtube_batch.build_digest([{"status": "error", "url": "u", "error": "private"}])
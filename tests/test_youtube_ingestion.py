@@ -0,0 +1,57 @@
+import pytest
+
+from services import namespaces
+from services import youtube_ingestion as yi
+
+URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+SEGMENTS = [{"text": f"word{i} " * 50, "start": i * 20.0, "duration": 20.0} for i in range(40)]
+
+
+class FakeIndex:
+    def __init__(self):
+        self.vectors = {}
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = FakeIndex()
+    monkeypatch.setattr(yi, "Pinecone", lambda api_key: type("PC", (), {"Index": lambda self, name: index})())
+    monkeypatch.setattr(yi, "_ensure_index", lambda pc: None)
+    monkeypatch.setattr(yi, "vector_count", lambda idx, ns: len(idx.vectors))
+    monkeypatch.setattr(yi, "_embed_passages", lambda pc, texts: [{"values": [0.0]} for _ in texts])
+    monkeypatch.setattr(yi, "_upsert", lambda idx, vectors, ns: idx.vectors.update((v["id"], v) for v in vectors))
+    return index
+
+
+def _chunks():
+    return len(yi.chunk_segments(SEGMENTS, chunk_size=yi.CHUNK_WORDS, overlap=yi.CHUNK_OVERLAP))
+
+
+def test_partial_index_is_redone_not_marked_ready(index):
+    index.vectors = {"yt_dQw4w9WgXcQ_0": {}}
+
+    result = yi.index_youtube_transcript(URL, segments=SEGMENTS)
+
+    assert result["already_indexed"] is False
+    assert result["chunks"] == len(index.vectors) == _chunks()
+    assert namespaces.get("yt_dQw4w9WgXcQ")["status"] == "ready"
+
+
+def test_complete_index_unknown_to_the_registry_is_adopted(index, monkeypatch):
+    yi.index_youtube_transcript(URL, segments=SEGMENTS)
+    monkeypatch.setattr(namespaces, "_delete_vectors", lambda ns: None)
+    namespaces.purge("yt_dQw4w9WgXcQ", force=True)
+
+    assert yi.index_youtube_transcript(URL, segments=SEGMENTS)["already_indexed"] is True
+
+
+def test_failed_upsert_marks_the_namespace_failed(index, monkeypatch):
+    def fail(idx, vectors, ns):
+        raise RuntimeError("429 Too Many Requests")
+    monkeypatch.setattr(yi, "_upsert", fail)
+
+    with pytest.raises(RuntimeError):
+        yi.index_youtube_transcript(URL, segments=SEGMENTS)
+    entry = namespaces.get("yt_dQw4w9WgXcQ")
+    assert entry["status"] == "failed"
+    assert "429" in entry["error"]
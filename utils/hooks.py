@@ -0,0 +1,40 @@
+"""
+Per-tool-call hooks.
+
+A hook is a callable `hook(tool_name, kwargs)` returning a context manager
+that wraps one tool invocation. Register hooks with `register` and decorate
+tool functions with `@with_hooks` (below `@mcp.tool()`) to run them.
+"""
+
+import functools
+import inspect
+from contextlib import ExitStack
+
+_hooks = []
+
+
+def register(hook) -> None:
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def with_hooks(fn):
+    """Wraps a sync or async tool so every registered hook sees the call."""
+    name = fn.__name__
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            with ExitStack() as stack:
+                for hook in _hooks:
+                    stack.enter_context(hook(name, kwargs))
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with ExitStack() as stack:
+            for hook in _hooks:
+                stack.enter_context(hook(name, kwargs))
+            return fn(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,292 @@
+"""
+Local intent router for the chat loop.
+
+Resolves the obvious chat turns without the routing LLM call: the active
+resource type decides which tools make sense, and the message decides the
+intent (transcript, summary, view or question). Intents come from keyword
+rules first and, when no rule fires, from a tiny multinomial naive Bayes
+classifier trained on the phrases below. Anything ambiguous (several rules
+fire, a keyword inside a question, low classifier confidence, no suitable
+or available tool) returns None and the caller falls back to the LLM router.
+
+Every decision, including LLM fallbacks, is appended to
+<state>/router/decisions.jsonl for tuning. Messages are logged as a hash
+plus a short prefix, and the log is cut to its newer half once it
+outgrows ROUTER_LOG_MAX_BYTES.
+
+Environment:
+    ROUTER_MODE               "auto" (default) or "llm" (always use the LLM router)
+    ROUTER_MIN_CONFIDENCE     classifier probability needed to route locally (default 0.8)
+    ROUTER_LOG_MAX_BYTES      size at which decisions.jsonl is trimmed (default 1 MB)
+    ROUTER_LOG_MESSAGE_CHARS  characters of each message kept in the log (default 60, 0 = hash only)
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+
+from utils.state import locked, state_dir, write_bytes
+
+ROUTER_MODE = os.getenv("ROUTER_MODE", "auto")
+MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.8"))
+LOG_MAX_BYTES = int(os.getenv("ROUTER_LOG_MAX_BYTES", str(1024 * 1024)))
+LOG_MESSAGE_CHARS = int(os.getenv("ROUTER_LOG_MESSAGE_CHARS", "60"))
+
+INTENTS = ("transcript", "summary", "view", "question")
+
+RULES = {
+    "transcript": re.compile(r"\b(transcripts?|captions?|subtitles?|word for word|verbatim)\b"),
+    "summary": re.compile(r"\b(summar\w*|tl;?dr|recap|overview|gist|key (points|takeaways)|main points)\b"),
+    "view": re.compile(
+        r"\b(view|show|display|read|extract|print|open)\b.*\b(pages?|content|text|document)\b"
+        r"|\b(full|whole|entire|raw) (content|text|document)\b"
+    ),
+}
+
+TRAINING = {
+    "transcript": [
+        "give me the transcript", "show the transcript", "get the full transcript of this video",
+        "what exactly is said in the video", "captions please", "the subtitles of the video",
+        "raw text of the video", "write down everything the speaker says",
+    ],
+    "summary": [
+        "summarize this", "give me a summary", "tldr", "key points", "main takeaways",
+        "brief overview", "in short what is this about", "bullet points of the main ideas",
+        "recap the video", "what is the gist", "short version please", "condense it",
+    ],
+    "view": [
+        "show page 3", "view full content", "display the text of page 2", "read pages 4 to 6",
+        "extract text from page 1", "show me the content", "print the whole document",
+        "open the first page", "show the raw text",
+    ],
+    "question": [
+        "what does it say about pricing", "who is the author", "when was this published",
+        "how does the algorithm work", "why did they choose this approach", "explain the results",
+        "what is the main argument", "does the document mention security", "list the requirements",
+        "which model performed best", "how many users are mentioned", "what are the risks",
+        "compare the two approaches", "is there a deadline", "what is the conclusion",
+        "tell me about the methodology", "where is the company based",
+    ],
+}
+
+# A question or request clause around a keyword ("what does the speaker say in
+# the transcript about X?", "read the document and tell me who the author is")
+# asks about the content rather than for the keyword's tool: left to the LLM
+QUESTION_RULE = re.compile(
+    r"^\s*(what|who|whom|when|where|why|how|which|does|do|did|is|are|was|were|can|could|should|list|explain|describe)\b"
+    r"|\b(tell me|let me know|explain)\s+(who|whom|what|when|where|why|how|which|whether|if)\b"
+    r"|\?\s*$"
+)
+
+_WORD = re.compile(r"[a-z0-9]+")
+# URLs end on a video-ID/query character, not on the sentence's punctuation
+_YOUTUBE_URL = re.compile(r"https?://(?:www\.|m\.)?(?:youtube\.com|youtu\.be)/[\w\-./?=&@%]*[\w\-=]")
+_URL = re.compile(r"https?://[^\s<>\"'()]*[^\s<>\"'().,;:!?]")
+_YOUTUBE_COLLECTION = re.compile(r"[?&]list=|youtube\.com/(?:@|channel/|c/|user/)")
+_PAGES = re.compile(
+    r"\bpages?\s+(\d+(?:\s*(?:-|to)\s*\d+)?(?:\s*(?:,|and)\s*\d+(?:\s*(?:-|to)\s*\d+)?)*)"
+)
+
+
+def _tokens(text: str) -> list[str]:
+    return _WORD.findall(text.lower())
+
+
+class NaiveBayes:
+    """Multinomial naive Bayes with Laplace smoothing over word counts."""
+
+    def __init__(self, examples: dict[str, list[str]]):
+        self.counts = {label: Counter(t for text in texts for t in _tokens(text)) for label, texts in examples.items()}
+        self.totals = {label: sum(c.values()) for label, c in self.counts.items()}
+        self.vocab = set().union(*self.counts.values())
+        total_docs = sum(len(texts) for texts in examples.values())
+        self.priors = {label: math.log(len(texts) / total_docs) for label, texts in examples.items()}
+
+    def predict(self, text: str) -> tuple[str, float]:
+        """Returns (label, probability)."""
+        tokens = [t for t in _tokens(text) if t in self.vocab]
+        if not tokens:
+            return "question", 0.0
+        scores = {}
+        for label, counts in self.counts.items():
+            denom = self.totals[label] + len(self.vocab)
+            scores[label] = self.priors[label] + sum(math.log((counts[t] + 1) / denom) for t in tokens)
+        best = max(scores, key=scores.get)
+        norm = sum(math.exp(s - scores[best]) for s in scores.values())
+        return best, 1 / norm
+
+
+_classifier = NaiveBayes(TRAINING)
+
+
+def classify(message: str) -> dict:
+    """
+    Intent of a message.
+
+    Returns:
+        dict: intent (None if ambiguous), confidence, source ("rule" or
+        "classifier") and the rules that fired
+    """
+    text = message.lower()
+    fired = [intent for intent, pattern in RULES.items() if pattern.search(text)]
+    question = QUESTION_RULE.search(text) is not None
+    if len(fired) == 1 and not question:
+        return {"intent": fired[0], "confidence": 1.0, "source": "rule", "rules": fired}
+    if fired:
+        return {"intent": None, "confidence": 0.0, "source": "rule", "rules": fired + ["question"] * question}
+    if question:
+        return {"intent": "question", "confidence": 1.0, "source": "rule", "rules": ["question"]}
+
+    intent, confidence = _classifier.predict(text)
+    return {
+        "intent": intent if confidence >= MIN_CONFIDENCE else None,
+        "confidence": round(confidence, 3),
+        "source": "classifier",
+        "rules": []
+    }
+
+
+def parse_pages(message: str) -> str | None:
+    """'pages 2 to 4 and 7' -> '2-4,7' (format of loader.parse_page_numbers)."""
+    match = _PAGES.search(message.lower())
+    if not match:
+        return None
+    pages = re.sub(r"\s*to\s*", "-", match.group(1))
+    pages = re.sub(r"\s*(?:,|and)\s*", ",", pages)
+    return re.sub(r"\s+", "", pages)
+
+
+def _summary_style(message: str) -> str:
+    text = message.lower()
+    if "bullet" in text or "points" in text:
+        return "bullet_points"
+    if re.search(r"\b(detailed|in detail|in depth|long)\b", text):
+        return "detailed"
+    return "concise"
+
+
+def _tool_for(intent: str | None, message: str, resource: dict | None) -> tuple[str, dict] | None:
+    kind = resource.get("type") if resource else None
+
+    if kind == "pdf":
+        metadata = resource.get("metadata") or {}
+        pages = parse_pages(message)
+        if intent == "view" or (intent == "summary" and pages):
+            args = {"pdf_path": resource["path"], "page_numbers": pages or "all"}
+            if intent == "summary":
+                args["summarization"] = True
+            return "extract_pdf_text", args
+        if intent in ("question", "summary") and metadata.get("processing_type"):
+            return "pdf_qa", {"pdf_info": metadata, "question": message}
+        return None
+
+    if kind == "youtube":
+        metadata = resource.get("metadata") or {}
+        # A registered video (even one opened from a playlist) has a video_id
+        collection = metadata.get("collection") or (
+            not metadata.get("video_id") and _YOUTUBE_COLLECTION.search(resource["url"]))
+        if intent in ("transcript", "view"):
+            return "get_youtube_transcript", {"video_url": resource["url"]}
+        if intent == "summary" and collection:
+            return "youtube_batch_summary", {"playlist_url": resource["url"], "summary_style": _summary_style(message)}
+        if intent == "summary":
+            return "youtube_summary", {"video_url": resource["url"], "summary_style": _summary_style(message)}
+        if intent == "question":
+            return "youtube_qa", {"video_url": resource["url"], "question": message}
+        return None
+
+    if kind == "website":
+        metadata = resource.get("metadata") or {}
+        if intent is None or not metadata.get("txt_path"):
+            return None
+        if intent == "view":
+            return "read_content", {"txt_path": metadata["txt_path"]}
+        args = {"txt_path": metadata["txt_path"], "query": message}
+        if metadata.get("index_path"):
+            args["index_path"] = metadata["index_path"]
+        return "web_content_qa", args
+
+    # No active resource: only act on an explicit URL in the message
+    youtube = _YOUTUBE_URL.search(message)
+    if youtube and intent == "summary" and len(_YOUTUBE_URL.findall(message)) > 1:
+        return "youtube_batch_summary", {"video_urls": _YOUTUBE_URL.findall(message), "summary_style": _summary_style(message)}
+    if youtube and intent == "summary" and _YOUTUBE_COLLECTION.search(youtube.group(0)):
+        return "youtube_batch_summary", {"playlist_url": youtube.group(0), "summary_style": _summary_style(message)}
+    if youtube and intent == "transcript":
+        return "get_youtube_transcript", {"video_url": youtube.group(0)}
+    if youtube and intent == "summary":
+        return "youtube_summary", {"video_url": youtube.group(0), "summary_style": _summary_style(message)}
+    # The scrape keyword alone is not enough: the message must also have a
+    # rule match or a confident classification (and not be a question)
+    url = _URL.search(message)
+    if (url and not youtube and intent not in (None, "question")
+            and re.search(r"\b(scrape|fetch|download|save)\b", message.lower())):
+        return "scrape_web_url", {"url": url.group(0)}
+    return None
+
+
+def route(message: str, resource: dict | None = None, available: set[str] | None = None) -> dict | None:
+    """
+    Picks a tool and its arguments for a chat message without an LLM call.
+
+    Args:
+        message (str): The user's chat message
+        resource (dict | None): Active resource from the app's session state
+            (type "pdf", "youtube" or "website"), None for general chat
+        available (set[str] | None): Tools the server exposes; a pick outside
+            it falls back to the LLM router (None = don't check)
+
+    Returns:
+        dict | None: {"tool", "args", "intent", "confidence", "source"}, or
+        None when the message is ambiguous and the LLM router should decide
+    """
+    if ROUTER_MODE == "llm":
+        return None
+
+    started = time.perf_counter()
+    decision = classify(message)
+    target = _tool_for(decision["intent"], message, resource)
+    unavailable = bool(target) and available is not None and target[0] not in available
+
+    routed = None
+    if target and not unavailable:
+        routed = {"tool": target[0], "args": target[1], **decision}
+    log_decision(message, resource, {
+        **decision,
+        "tool": target[0] if target else None,
+        "outcome": "local" if routed else "llm_fallback",
+        **({"reason": "tool_unavailable"} if unavailable else {}),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+    return routed
+
+
+def log_decision(message: str, resource: dict | None, decision: dict) -> None:
+    """
+    Appends one routing decision to <state>/router/decisions.jsonl, keeping
+    only the newer half of the lines once the file exceeds LOG_MAX_BYTES.
+    """
+    entry = {
+        "ts": time.time(),
+        "message_sha256": hashlib.sha256(message.encode("utf-8")).hexdigest()[:16],
+        "message_prefix": message[:LOG_MESSAGE_CHARS],
+        "resource_type": resource.get("type") if resource else None,
+        **decision
+    }
+    path = state_dir("router") / "decisions.jsonl"
+    try:
+        with locked(path):
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+                size = f.tell()
+            if size > LOG_MAX_BYTES:
+                with open(path, "rb") as f:
+                    f.seek(size - LOG_MAX_BYTES // 2)
+                    f.readline()    # drop the partial first line
+                    write_bytes(path, f.read())
+    except OSError:
+        pass
@@ -1,12 +1,51 @@
 from groq import Groq
 import os
+import time
 from dotenv import load_dotenv
+from utils import metrics, scheduler, usage
 load_dotenv()
 
+MODEL_NAME = "openai/gpt-oss-120b"
+
 def llm_call(prompt):
+    # Budget check: may switch to a cheaper model / shorter prompt, or raise BudgetExceeded
+    model, prompt, degraded = usage.plan_llm_call(MODEL_NAME, prompt)
+    if degraded:
+        metrics.inc("llm_degraded_calls")
+
     client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-    completion = client.chat.completions.create(
-        model="openai/gpt-oss-120b",
-        messages=[{"role": "user", "content": prompt}]
+    # Queued behind the Groq RPM/TPM limits; retried on 429
+    text, reported = scheduler.run(
+        "groq", model,
+        lambda: _stream_completion(client, model, prompt),
+        tokens=usage.estimate_tokens(prompt) + scheduler.COMPLETION_TOKENS_ESTIMATE,
+        actual_tokens=lambda result: result[1].prompt_tokens + result[1].completion_tokens if result[1] else 0
     )
-    return completion.choices[0].message.content
\ No newline at end of file
+
+    if reported is not None:
+        usage.record_llm(model, reported.prompt_tokens, reported.completion_tokens)
+    else:
+        usage.record_llm(model, usage.estimate_tokens(prompt), usage.estimate_tokens(text), estimated=True)
+    return text
+
+def _stream_completion(client, model, prompt):
+    # Streamed so time to first token can be measured; the full text is still returned
+    started = time.perf_counter()
+    reported = None
+    with metrics.timed("llm_call", model=model):
+        stream = client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True
+        )
+        parts = []
+        for chunk in stream:
+            # Groq reports token usage on the last chunk
+            x_groq = getattr(chunk, "x_groq", None)
+            reported = getattr(x_groq, "usage", None) or getattr(chunk, "usage", None) or reported
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                if not parts:
+                    metrics.observe("llm_ttft", time.perf_counter() - started, model=model)
+                parts.append(delta)
+    return "".join(parts), reported
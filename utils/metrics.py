@@ -0,0 +1,336 @@
+"""
+Low-overhead, in-process latency histograms, counters and gauges.
+
+Usage:
+    with metrics.timed("embed_batch", records=96):
+        ...
+
+    @metrics.timed("chunking")
+    def chunk_text(...): ...
+
+Each observation is one bisect and three additions under a lock; timed
+stages also become spans of traced tool calls (utils/tracing.py). Results are
+exposed by the server as JSON (`metrics://stages`, `get_metrics`) and in
+Prometheus text format (`metrics://prometheus`).
+
+A stdio server lives only as long as its client session, so every process
+writes its metrics to <state>/metrics/<pid>.json (after each tool call and
+at most every METRICS_FLUSH_INTERVAL seconds otherwise) and the exposed
+views add up all processes. Histograms and counters of processes that have
+exited are folded into <state>/metrics/totals.json; their gauges are dropped.
+
+Forked children start with empty stores. atexit does not run in process
+pool workers, so work run there calls `flush()` itself when it is done.
+
+Environment:
+    METRICS_FLUSH_INTERVAL   seconds between writes outside tool calls (default 5)
+"""
+
+import atexit
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from utils import tracing
+from utils.state import locked, read_json, state_dir, write_json
+
+# Seconds. Wide range: page extraction is ~ms, LLM calls and ingestion are ~s-min.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, math.inf)
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_started_at = time.time()
+_next_flush = 0.0
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate by linear interpolation inside the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if seen + c >= rank and c:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != math.inf else lower * 2 or 1.0
+                return lower + (upper - lower) * (rank - seen) / c
+            seen += c
+        return BUCKETS[-2]
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def observe(stage: str, seconds: float, **labels) -> None:
+    """Records one duration for a stage."""
+    key = _key(stage, labels)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = _Histogram()
+        hist.observe(seconds)
+    _maybe_flush()
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    """Increments a counter (e.g. pages extracted, chunks upserted)."""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+    _maybe_flush()
+
+
+def gauge_add(name: str, delta: float, **labels) -> None:
+    """Moves a gauge up or down (e.g. tool calls in flight)."""
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = _gauges.get(key, 0) + delta
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """
+    Times the block (or decorated function) into the `stage` histogram and,
+    when the current tool call is traced, records it as a span.
+    """
+    started = time.perf_counter()
+    with tracing.span(stage, **labels):
+        try:
+            yield
+        finally:
+            observe(stage, time.perf_counter() - started, **labels)
+
+
+@contextmanager
+def tool_call(tool_name: str, kwargs: dict):
+    """Tool hook: in-flight gauge, latency histogram and error counter per tool."""
+    gauge_add("tool_calls_in_flight", 1)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        inc("tool_errors_total", tool=tool_name)
+        raise
+    finally:
+        gauge_add("tool_calls_in_flight", -1)
+        observe("tool", time.perf_counter() - started, tool=tool_name)
+        flush()
+
+
+# --------------------------------------------------
+# Persistence across processes
+# --------------------------------------------------
+
+def _metrics_dir() -> Path:
+    return state_dir("metrics")
+
+
+def _dump(histograms: dict, counters: dict, gauges: dict) -> dict:
+    return {
+        "histograms": [[n, l, h.counts, h.total, h.count] for (n, l), h in histograms.items()],
+        "counters": [[n, l, v] for (n, l), v in counters.items()],
+        "gauges": [[n, l, v] for (n, l), v in gauges.items()]
+    }
+
+
+def _merge(data: dict, histograms: dict, counters: dict, gauges: dict | None) -> None:
+    """Adds dumped metrics into the given stores (gauges skipped if None)."""
+    for name, labels, counts, total, count in data.get("histograms", []):
+        key = (name, tuple(tuple(pair) for pair in labels))
+        hist = histograms.get(key)
+        if hist is None:
+            hist = histograms[key] = _Histogram()
+        hist.counts = [a + b for a, b in zip(hist.counts, counts)]
+        hist.total += total
+        hist.count += count
+    for store, rows in ((counters, data.get("counters", [])), (gauges, data.get("gauges", []))):
+        if store is None:
+            continue
+        for name, labels, value in rows:
+            key = (name, tuple(tuple(pair) for pair in labels))
+            store[key] = store.get(key, 0) + value
+
+
+def flush() -> None:
+    """
+    Writes this process's metrics to <state>/metrics/<pid>.json. Processes
+    that recorded nothing (e.g. CLIs or tests importing a service) write no file.
+    """
+    global _next_flush
+    with _lock:
+        _next_flush = time.monotonic() + FLUSH_INTERVAL
+        if not (_histograms or _counters or _gauges):
+            return
+        data = {"pid": os.getpid(), "started_at": _started_at, **_dump(_histograms, _counters, _gauges)}
+    try:
+        write_json(_metrics_dir() / f"{os.getpid()}.json", data)
+    except OSError:
+        pass
+
+
+def _maybe_flush() -> None:
+    if time.monotonic() >= _next_flush:
+        flush()
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _collect() -> tuple[dict, dict, dict]:
+    """
+    Metrics of all processes: the folded totals, the files of live
+    processes and this process's own stores. Files of exited processes are
+    folded into the totals on the way.
+    """
+    histograms, counters, gauges = {}, {}, {}
+    directory = _metrics_dir()
+    totals_path = directory / "totals.json"
+    own = f"{os.getpid()}.json"
+    dead = []
+    for path in directory.glob("*.json"):
+        if path.name == own or not path.stem.isdigit():
+            continue
+        if not _pid_alive(int(path.stem)):
+            dead.append(path)
+            continue
+        _merge(read_json(path, {}), histograms, counters, gauges)
+
+    if dead:
+        with locked(totals_path):
+            totals = read_json(totals_path, {})
+            folded = ({}, {}, None)
+            _merge(totals, *folded)
+            for path in dead:
+                data = read_json(path)
+                if data is not None:
+                    _merge(data, *folded)
+            write_json(totals_path, _dump(folded[0], folded[1], {}))
+            for path in dead:
+                path.unlink(missing_ok=True)
+    _merge(read_json(totals_path, {}), histograms, counters, None)
+
+    with _lock:
+        _merge(_dump(_histograms, _counters, _gauges), histograms, counters, gauges)
+    return histograms, counters, gauges
+
+
+def _reset_after_fork() -> None:
+    """
+    A forked child (e.g. a process pool worker) starts with empty stores:
+    the parent's observations are the parent's to flush, under its own pid.
+    """
+    global _lock, _started_at, _next_flush
+    _lock = threading.Lock()
+    _histograms.clear()
+    _counters.clear()
+    _gauges.clear()
+    _started_at = time.time()
+    _next_flush = 0.0
+
+
+atexit.register(flush)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _label_str(labels: tuple) -> str:
+    return ",".join(f"{k}={v}" for k, v in labels)
+
+
+def snapshot() -> dict:
+    """
+    JSON-friendly view, summed over all server processes: per stage (and
+    label set) count, total, mean and estimated p50/p95/p99 in milliseconds,
+    plus counters and gauges.
+    """
+    histograms, counters, gauges = _collect()
+    stages = {}
+    for (name, labels), h in sorted(histograms.items()):
+        key = f"{name}{{{_label_str(labels)}}}" if labels else name
+        stages[key] = {
+            "count": h.count,
+            "total_s": round(h.total, 4),
+            "mean_ms": round(h.total / h.count * 1000, 2) if h.count else 0.0,
+            "p50_ms": round(h.quantile(0.50) * 1000, 2),
+            "p95_ms": round(h.quantile(0.95) * 1000, 2),
+            "p99_ms": round(h.quantile(0.99) * 1000, 2)
+        }
+    return {
+        "uptime_s": round(time.time() - _started_at, 1),
+        "stages": stages,
+        "counters": {(f"{n}{{{_label_str(l)}}}" if l else n): v for (n, l), v in sorted(counters.items())},
+        "gauges": {(f"{n}{{{_label_str(l)}}}" if l else n): v for (n, l), v in sorted(gauges.items())}
+    }
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _prom_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+def render_prometheus(prefix: str = "analyzer") -> str:
+    """
+    Prometheus text exposition format (version 0.0.4). Counter names get the
+    conventional `_total` suffix (namespaces_evicted -> analyzer_namespaces_evicted_total).
+    """
+    lines = []
+    histograms, counters, gauges = _collect()
+    for name in sorted({name for name, _ in histograms}):
+        metric = f"{prefix}_{name}_seconds"
+        lines.append(f"# TYPE {metric} histogram")
+        for (n, labels), h in sorted(histograms.items()):
+            if n != name:
+                continue
+            cumulative = 0
+            for bound, c in zip(BUCKETS, h.counts):
+                cumulative += c
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{metric}_bucket{_prom_labels(labels, (('le', le),))} {cumulative}")
+            lines.append(f"{metric}_sum{_prom_labels(labels)} {h.total}")
+            lines.append(f"{metric}_count{_prom_labels(labels)} {h.count}")
+
+    for kind, store in (("counter", counters), ("gauge", gauges)):
+        for name in sorted({n for n, _ in store}):
+            metric = f"{prefix}_{name}"
+            if kind == "counter" and not name.endswith("_total"):
+                metric += "_total"
+            lines.append(f"# TYPE {metric} {kind}")
+            for (n, labels), v in sorted(store.items()):
+                if n == name:
+                    lines.append(f"{metric}{_prom_labels(labels)} {v}")
+
+    return "\n".join(lines) + "\n"
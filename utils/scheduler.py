@@ -0,0 +1,325 @@
+"""
+Rate-limit-aware scheduler for the Groq and Pinecone quotas.
+
+Every outgoing LLM call, embedding request, upsert and vector query goes
+through `run(provider, model, fn, tokens=...)`. It waits for a slot in a
+token bucket per provider/model. Each bucket has a requests-per-minute and
+a tokens-per-minute limit, and the size of a request is estimated from its
+prompt length. After the call, the estimate is replaced by the usage the
+provider reported. A 429 response blocks the bucket for the provider's
+Retry-After, and the request is retried instead of failing.
+
+Priority classes:
+    INTERACTIVE (default)  chat tools: served first
+    BATCH                  background jobs, bulk ingestion, playlist batches
+Batch requests leave INTERACTIVE_RESERVE of every bucket untouched, and
+they yield while an interactive request is waiting, so chat latency stays
+flat while batch work uses the remaining capacity. Use `with
+scheduler.batch():` around batch work. Within one process, waiting
+requests are served by priority, then first come first served.
+
+The buckets live in <state>/scheduler/buckets.json behind a lock file.
+That way the short-lived stdio server processes and the jobs worker share
+one quota.
+
+Environment:
+    RATE_LIMITS                   "off", or overrides such as
+                                  "groq:openai/gpt-oss-120b=30/8000,pinecone:query=600/0"
+                                  (requests/min / tokens/min, 0 = unlimited)
+    RATE_LIMIT_INTERACTIVE_RESERVE  fraction of each bucket kept for interactive calls (default 0.2)
+    RATE_LIMIT_MAX_WAIT           seconds a request may queue before failing (default 600)
+    RATE_LIMIT_MAX_RETRIES        retries after a 429 (default 5)
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from utils import metrics
+from utils.state import locked, read_json, state_dir, write_json
+
+INTERACTIVE = 0
+BATCH = 1
+_PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+# Free-tier limits of the models this server uses: (requests/min, tokens/min)
+DEFAULT_LIMITS = {
+    "groq:openai/gpt-oss-120b": (30, 8000),
+    "groq:llama-3.1-8b-instant": (30, 6000),
+    "pinecone:llama-text-embed-v2": (500, 250000),
+    "pinecone:query": (6000, 0),
+    "pinecone:upsert": (3000, 0),
+}
+
+INTERACTIVE_RESERVE = float(os.getenv("RATE_LIMIT_INTERACTIVE_RESERVE", "0.2"))
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "600"))
+MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "5"))
+COMPLETION_TOKENS_ESTIMATE = 512    # added to the prompt estimate of an LLM call
+MAX_POLL = 1.0                      # longest sleep before re-checking a bucket
+WAITER_TTL = 5.0                    # an interactive waiter that stops polling is forgotten after this
+
+_priority = contextvars.ContextVar("scheduler_priority", default=INTERACTIVE)
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a request has waited MAX_WAIT seconds for its rate limit."""
+
+
+def _parse_limits(value: str) -> dict:
+    if value.strip().lower() in ("off", "none", "0"):
+        return {}
+    limits = dict(DEFAULT_LIMITS)
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        key, spec = entry.rsplit("=", 1)
+        rpm, _, tpm = spec.partition("/")
+        limits[key.strip()] = (int(rpm or 0), int(tpm or 0))
+    return limits
+
+
+LIMITS = _parse_limits(os.getenv("RATE_LIMITS", ""))
+
+
+# --------------------------------------------------
+# Priority
+# --------------------------------------------------
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def prioritized(priority: int):
+    """Runs the block (and threads started with a copy of its context) at `priority`."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def batch():
+    """Marks the block as background work."""
+    return prioritized(BATCH)
+
+
+# --------------------------------------------------
+# Shared buckets
+# --------------------------------------------------
+
+def _buckets_path():
+    return state_dir("scheduler") / "buckets.json"
+
+
+def _locked():
+    """Cross-process lock around the bucket file."""
+    return locked(_buckets_path())
+
+
+def _refill(bucket: dict, limit: tuple[int, int], now: float) -> dict:
+    rpm, tpm = limit
+    if not bucket:
+        bucket = {"requests": float(rpm), "tokens": float(tpm), "updated": now, "blocked_until": 0, "waiting": {}}
+    elapsed = max(0.0, now - bucket["updated"])
+    bucket["requests"] = min(float(rpm), bucket["requests"] + elapsed * rpm / 60)
+    bucket["tokens"] = min(float(tpm), bucket["tokens"] + elapsed * tpm / 60)
+    bucket["updated"] = now
+    bucket["waiting"] = {w: t for w, t in bucket["waiting"].items() if t > now}
+    return bucket
+
+
+def _try_take(key: str, limit: tuple[int, int], cost: int, priority: int, waiter: str) -> float:
+    """Takes one request and `cost` tokens if available. Returns 0 on success, else seconds to wait."""
+    rpm, tpm = limit
+    now = time.time()
+    with _locked():
+        buckets = read_json(_buckets_path(), {})
+        bucket = _refill(buckets.get(key), limit, now)
+        buckets[key] = bucket
+
+        reserve = INTERACTIVE_RESERVE if priority != INTERACTIVE else 0.0
+        need_requests = min(float(rpm), 1 + reserve * rpm)
+        need_tokens = min(float(tpm), cost + reserve * tpm)
+        interactive_waiting = any(w != waiter for w in bucket["waiting"])
+
+        if bucket["blocked_until"] > now:
+            wait = bucket["blocked_until"] - now
+        elif priority != INTERACTIVE and interactive_waiting:
+            wait = 0.05
+        else:
+            wait = 0.0
+            if rpm and bucket["requests"] < need_requests:
+                wait = max(wait, (need_requests - bucket["requests"]) * 60 / rpm)
+            if tpm and bucket["tokens"] < need_tokens:
+                wait = max(wait, (need_tokens - bucket["tokens"]) * 60 / tpm)
+
+        if wait <= 0:
+            bucket["requests"] -= 1 if rpm else 0
+            bucket["tokens"] -= cost if tpm else 0
+            bucket["waiting"].pop(waiter, None)
+        elif priority == INTERACTIVE:
+            bucket["waiting"][waiter] = now + WAITER_TTL
+        write_json(_buckets_path(), buckets)
+    return wait
+
+
+def _settle(key: str, limit: tuple[int, int], estimated: int, actual: int) -> None:
+    """Replaces the estimated token cost of a finished request by the actual one."""
+    if not limit[1] or actual == estimated:
+        return
+    with _locked():
+        buckets = read_json(_buckets_path(), {})
+        bucket = _refill(buckets.get(key), limit, time.time())
+        bucket["tokens"] = min(float(limit[1]), bucket["tokens"] + estimated - actual)
+        buckets[key] = bucket
+        write_json(_buckets_path(), buckets)
+
+
+def _block(key: str, limit: tuple[int, int], seconds: float) -> None:
+    """After a 429: nobody sends to `key` for `seconds`."""
+    with _locked():
+        buckets = read_json(_buckets_path(), {})
+        now = time.time()
+        bucket = _refill(buckets.get(key), limit, now)
+        bucket["blocked_until"] = max(bucket["blocked_until"], now + seconds)
+        buckets[key] = bucket
+        write_json(_buckets_path(), buckets)
+
+
+# --------------------------------------------------
+# Local queue: priority, then FIFO, within this process
+# --------------------------------------------------
+
+def _queue_for(key: str):
+    with _queues_lock:
+        if key not in _queues:
+            _queues[key] = {"cond": threading.Condition(), "heap": [], "seq": itertools.count()}
+        return _queues[key]
+
+
+def _acquire(key: str, limit: tuple[int, int], cost: int) -> None:
+    priority = current_priority()
+    queue = _queue_for(key)
+    ticket = (priority, next(queue["seq"]))
+    waiter = uuid.uuid4().hex
+    labels = {"key": key, "priority": _PRIORITY_NAMES.get(priority, str(priority))}
+    started = time.monotonic()
+
+    with queue["cond"]:
+        heapq.heappush(queue["heap"], ticket)
+    metrics.gauge_add("ratelimit_queued", 1, **labels)
+    try:
+        while True:
+            with queue["cond"]:
+                while queue["heap"][0] != ticket:
+                    queue["cond"].wait(MAX_POLL)
+            wait = _try_take(key, limit, cost, priority, waiter)
+            if wait <= 0:
+                break
+            if time.monotonic() - started + wait > MAX_WAIT:
+                raise RateLimitTimeout(f"Waited over {MAX_WAIT:.0f}s for the {key} rate limit")
+            time.sleep(min(wait, MAX_POLL))
+    finally:
+        with queue["cond"]:
+            queue["heap"].remove(ticket)
+            heapq.heapify(queue["heap"])
+            queue["cond"].notify_all()
+        metrics.gauge_add("ratelimit_queued", -1, **labels)
+
+    waited = time.monotonic() - started
+    if waited > 0.01:
+        metrics.observe("ratelimit_wait", waited, **labels)
+
+
+# --------------------------------------------------
+# Public API
+# --------------------------------------------------
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for HTTP 429 errors of the Groq and Pinecone clients."""
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(error, "status", None),
+                   getattr(response, "status_code", None)):
+        if status == 429 or status == "429":
+            return True
+    return False
+
+
+def _retry_after(error: Exception) -> float | None:
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def run(provider: str, model: str, fn, tokens: int = 0, actual_tokens=None):
+    """
+    Calls `fn()` once the provider/model rate limit allows it, retrying on 429.
+
+    Args:
+        provider (str): "groq" or "pinecone"
+        model (str): Model name, or the operation for non-model limits ("query", "upsert")
+        fn (callable): The request
+        tokens (int): Estimated tokens of the request (prompt + expected output)
+        actual_tokens (callable | None): Maps fn's result to the tokens the
+            provider actually counted (None/0 keeps the estimate)
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        RateLimitTimeout: the request could not be scheduled within MAX_WAIT
+    """
+    key = f"{provider}:{model}"
+    limit = LIMITS.get(key)
+    cost = min(tokens, limit[1]) if limit and limit[1] else 0
+
+    for attempt in range(MAX_RETRIES + 1):
+        if limit:
+            _acquire(key, limit, cost)
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == MAX_RETRIES:
+                raise
+            delay = _retry_after(e) or min(60.0, 2.0 ** attempt)
+            metrics.inc("ratelimit_429", key=key)
+            if limit:
+                _block(key, limit, delay)
+            else:
+                time.sleep(delay)
+            continue
+
+        if limit and cost and actual_tokens:
+            actual = actual_tokens(result)
+            if actual:
+                _settle(key, limit, cost, actual)
+        return result
+
+
+def status() -> dict:
+    """Configured limits and current bucket levels (shared by all processes)."""
+    buckets = read_json(_buckets_path(), {})
+    now = time.time()
+    result = {}
+    for key, (rpm, tpm) in LIMITS.items():
+        bucket = _refill(buckets.get(key), (rpm, tpm), now)
+        result[key] = {
+            "rpm": rpm,
+            "tpm": tpm,
+            "requests_available": round(bucket["requests"], 2),
+            "tokens_available": round(bucket["tokens"], 1),
+            "blocked_for_s": round(max(0.0, bucket["blocked_until"] - now), 2),
+            "interactive_waiting": len(bucket["waiting"])
+        }
+    return result
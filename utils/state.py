@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+# Every piece of server-side state (job files, caches, registries) lives under
+# this directory so one stdio server process can pick up where the last one left off.
+STATE_DIR = Path(os.getenv("ANALYZER_STATE_DIR", ".analyzer_state"))
+
+# A lock file not refreshed for this long belongs to a process that died while holding it
+LOCK_STALE_AFTER = 10.0
+LOCK_HEARTBEAT = LOCK_STALE_AFTER / 4
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+_held = threading.local()
+_owned = {}                 # lock file -> token written into it, for locks this process holds
+_owned_guard = threading.Lock()
+_heartbeat = None
+
+
+def state_path(*parts: str) -> Path:
+    """
+    Returns a path inside the state directory, creating parent folders.
+
+    Args:
+        *parts (str): Path components relative to STATE_DIR
+
+    Returns:
+        Path: Absolute path inside the state directory
+    """
+    path = STATE_DIR.joinpath(*parts).resolve()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def state_dir(*parts: str) -> Path:
+    """
+    Returns a directory inside the state directory, creating it if needed.
+    """
+    path = STATE_DIR.joinpath(*parts).resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def read_json(path: Path, default=None):
+    """
+    Reads a JSON file, returning `default` if it is missing or corrupt.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_json(path: Path, data) -> None:
+    """
+    Atomically writes JSON (temp file + rename) so readers in other
+    processes never see a half-written file.
+    """
+    write_bytes(path, json.dumps(data, indent=2).encode("utf-8"))
+
+
+def write_bytes(path: Path, data: bytes) -> None:
+    """Atomically writes bytes: a temp file in the same directory, then a rename."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except Exception:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def _lock_token(lock_path: Path) -> str | None:
+    try:
+        return lock_path.read_text(encoding="ascii")
+    except (FileNotFoundError, UnicodeDecodeError):
+        return None
+
+
+def _refresh_locks() -> None:
+    """Heartbeat thread: keeps the mtime of every lock this process holds fresh."""
+    while True:
+        time.sleep(LOCK_HEARTBEAT)
+        with _owned_guard:
+            owned = list(_owned.items())
+        for lock_path, token in owned:
+            if _lock_token(Path(lock_path)) == token:
+                try:
+                    os.utime(lock_path)
+                except FileNotFoundError:
+                    pass
+
+
+def _start_heartbeat() -> None:
+    global _heartbeat
+    with _owned_guard:
+        if _heartbeat is None or not _heartbeat.is_alive():
+            _heartbeat = threading.Thread(target=_refresh_locks, name="state-lock-heartbeat", daemon=True)
+            _heartbeat.start()
+
+
+def _forget_locks_after_fork() -> None:
+    # The child holds none of the parent's locks and has no heartbeat thread
+    global _owned_guard, _heartbeat
+    _owned_guard = threading.Lock()
+    _owned.clear()
+    _heartbeat = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_locks_after_fork)
+
+
+def _remove_if_stale(lock_path: Path) -> None:
+    """Removes a lock file nobody has refreshed for LOCK_STALE_AFTER."""
+    token = _lock_token(lock_path)
+    if time.time() - lock_path.stat().st_mtime <= LOCK_STALE_AFTER:
+        return
+    # Only the file judged stale: not one a faster waiter has created since
+    if _lock_token(lock_path) == token:
+        lock_path.unlink(missing_ok=True)
+
+
+@contextmanager
+def locked(path: Path):
+    """
+    Exclusive lock on a state file, across threads and processes: a
+    `<path>.lock` file created with O_EXCL. Re-entrant within a thread.
+    While held, a heartbeat thread refreshes the lock file's mtime; a lock
+    not refreshed for LOCK_STALE_AFTER (its process died) is taken over.
+    The holder removes the lock file only if it still holds its token.
+
+    Args:
+        path (Path): The state file the lock protects
+    """
+    key = str(Path(path).resolve())
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = set()
+    if key in held:
+        yield
+        return
+
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+    lock_path = Path(key + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    token = uuid.uuid4().hex
+    with thread_lock:
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                break
+            except FileExistsError:
+                try:
+                    _remove_if_stale(lock_path)
+                except FileNotFoundError:
+                    continue
+                time.sleep(0.002)
+        try:
+            os.write(fd, token.encode("ascii"))
+        finally:
+            os.close(fd)
+        with _owned_guard:
+            _owned[str(lock_path)] = token
+        _start_heartbeat()
+        held.add(key)
+        try:
+            yield
+        finally:
+            held.discard(key)
+            with _owned_guard:
+                _owned.pop(str(lock_path), None)
+            if _lock_token(lock_path) == token:
+                lock_path.unlink(missing_ok=True)
+
+
+@contextmanager
+def update_json(path: Path, default=None):
+    """
+    Read-modify-write of a JSON state file under `locked`: yields the
+    current data (or `default`), which is written back when the block exits
+    without an exception.
+
+        with update_json(path, {}) as registry:
+            registry[key] = entry
+    """
+    with locked(path):
+        data = read_json(path, default)
+        yield data
+        write_json(path, data)
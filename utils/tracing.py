@@ -0,0 +1,254 @@
+"""
+Opt-in per-request tracing and profiling.
+
+A traced tool call gets a trace ID and records nested spans for every
+`metrics.timed` stage below it (PDF open and page extraction, chunking,
+embedding, upsert, vector query, LLM call, HTTP fetch, HTML parse, ...) and
+for explicit `tracing.span(...)` blocks. Spans follow the call into
+`asyncio.to_thread` workers because context variables are copied there.
+
+A call is traced when:
+    - the tool is listed in TRACE_TOOLS (comma-separated, "*" = all), or
+    - it is sampled with probability TRACE_SAMPLE_RATE (0..1), or
+    - the request opts in with `_meta: {"trace": true}` ("profile" also
+      captures a cProfile dump).
+TRACE_PROFILE=1 captures a cProfile dump for every traced call. cProfile
+only sees the thread the tool runs on, not `asyncio.to_thread` workers. For
+an async tool that thread is the event loop, so the dump also contains every
+other coroutine (concurrent tool calls, MCP session I/O) that ran while the
+tool was awaiting; the spans of the trace are the per-call breakdown, the
+profile only shows where the loop spent its time. Sync tools block the loop
+while they run, so their profile is theirs alone.
+
+Each trace is written to <state>/traces/<trace_id>.json in Chrome trace
+event format (open in https://ui.perfetto.dev or chrome://tracing for a
+flame chart); profiles go next to it as <trace_id>.prof (snakeviz,
+gprof2dot, pstats). Only the newest TRACE_MAX_FILES traces are kept.
+
+When a call is not traced, `span` returns a shared no-op context manager
+after one context variable lookup.
+"""
+
+import contextvars
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+
+from utils.state import read_json, state_dir, write_json
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_TOOLS = {t.strip() for t in os.getenv("TRACE_TOOLS", "").split(",") if t.strip()}
+PROFILE = os.getenv("TRACE_PROFILE", "0") == "1"
+MAX_FILES = int(os.getenv("TRACE_MAX_FILES", "200"))
+MAX_SPANS = 20_000      # per trace; further spans are counted but not stored
+
+_trace = contextvars.ContextVar("trace", default=None)
+_parent = contextvars.ContextVar("trace_parent", default=None)
+_NOOP = nullcontext()
+
+
+class Trace:
+    __slots__ = ("trace_id", "name", "started", "started_at", "spans", "dropped", "_lock", "_next_id")
+
+    def __init__(self, name: str, trace_id: str | None = None):
+        self.trace_id = trace_id or uuid.uuid4().hex[:16]
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.spans = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def next_id(self) -> int:
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def add(self, span: dict) -> None:
+        with self._lock:
+            if len(self.spans) < MAX_SPANS:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+
+
+def current_trace_id() -> str | None:
+    trace = _trace.get()
+    return trace.trace_id if trace else None
+
+
+def span(name: str, **labels):
+    """Context manager recording a span in the active trace (no-op otherwise)."""
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _span(trace, name, labels)
+
+
+@contextmanager
+def _span(trace: Trace, name: str, labels: dict):
+    span_id = trace.next_id()
+    parent_id = _parent.get()
+    token = _parent.set(span_id)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        ended = time.perf_counter()
+        _parent.reset(token)
+        args = {"span_id": span_id, "parent_id": parent_id, **{k: str(v) for k, v in labels.items()}}
+        if error:
+            args["error"] = error
+        trace.add({
+            "name": name,
+            "cat": "span",
+            "ph": "X",
+            "ts": round((started - trace.started) * 1e6, 1),
+            "dur": round((ended - started) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args
+        })
+
+
+@contextmanager
+def trace(name: str, profile: bool = False, trace_id: str | None = None):
+    """
+    Traces everything inside the block (and optionally profiles it), then
+    writes the trace file. Usable outside tools, e.g. in the jobs worker.
+    """
+    active = Trace(name, trace_id)
+    token = _trace.set(active)
+    profiler = cProfile.Profile() if profile else None
+    if profiler:
+        try:
+            profiler.enable()
+        except ValueError:      # another profiler is already active on this thread
+            profiler = None
+    try:
+        with _span(active, name, {}):
+            yield active
+    finally:
+        if profiler:
+            profiler.disable()
+        _trace.reset(token)
+        _write(active, profiler)
+
+
+def _requested(ctx) -> str | None:
+    """`_meta.trace` of the MCP request: None, "trace" or "profile"."""
+    try:
+        meta = ctx.request_context.meta
+    except Exception:
+        return None
+    value = getattr(meta, "trace", None)
+    if value is None:
+        value = (getattr(meta, "model_extra", None) or {}).get("trace")
+    if not value:
+        return None
+    return "profile" if value == "profile" else "trace"
+
+
+def tool_trace(tool_name: str, kwargs: dict):
+    """Tool hook: traces the call if it is requested, listed or sampled."""
+    requested = _requested(kwargs.get("ctx")) if "ctx" in kwargs else None
+    if requested is None:
+        listed = tool_name in TRACE_TOOLS or "*" in TRACE_TOOLS
+        if not listed and not (SAMPLE_RATE and random.random() < SAMPLE_RATE):
+            return _NOOP
+    return trace(f"tool:{tool_name}", profile=PROFILE or requested == "profile")
+
+
+def _traces_dir():
+    return state_dir("traces")
+
+
+def _write(active: Trace, profiler) -> None:
+    try:
+        directory = _traces_dir()
+        duration_ms = round((time.perf_counter() - active.started) * 1000, 2)
+        profile_path = None
+        if profiler:
+            profile_path = directory / f"{active.trace_id}.prof"
+            profiler.dump_stats(str(profile_path))
+
+        write_json(directory / f"{active.trace_id}.json", {
+            "traceEvents": active.spans,
+            "displayTimeUnit": "ms",
+            "metadata": {
+                "trace_id": active.trace_id,
+                "name": active.name,
+                "started_at": active.started_at,
+                "duration_ms": duration_ms,
+                "spans": len(active.spans),
+                "dropped_spans": active.dropped,
+                "profile": str(profile_path) if profile_path else None
+            }
+        })
+        print(f"[trace] {active.name} {active.trace_id} {duration_ms} ms -> {directory}", file=sys.stderr)
+        _prune(directory)
+    except Exception as e:      # tracing must never fail the traced call
+        print(f"[trace] could not write trace {active.trace_id}: {e}", file=sys.stderr)
+
+
+def _prune(directory) -> None:
+    files = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+    for old in files[:-MAX_FILES] if len(files) > MAX_FILES else []:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def list_traces(limit: int = 20) -> list[dict]:
+    """Metadata of the most recent traces, newest first."""
+    files = sorted(_traces_dir().glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    traces = []
+    for path in files[:limit]:
+        data = read_json(path)
+        if data:
+            traces.append(data["metadata"])
+    return traces
+
+
+def load_trace(trace_id: str) -> dict | None:
+    """
+    Summary of one trace: metadata, time per span name (count, total and
+    self time) sorted by self time, and the path of the full trace file.
+    """
+    if not trace_id.isalnum():
+        return None
+    path = _traces_dir() / f"{trace_id}.json"
+    data = read_json(path)
+    if not data:
+        return None
+
+    events = data["traceEvents"]
+    child_time = {}
+    for e in events:
+        parent = e["args"].get("parent_id")
+        if parent is not None:
+            child_time[parent] = child_time.get(parent, 0) + e["dur"]
+
+    by_name = {}
+    for e in events:
+        entry = by_name.setdefault(e["name"], {"count": 0, "total_ms": 0.0, "self_ms": 0.0})
+        entry["count"] += 1
+        entry["total_ms"] += e["dur"] / 1000
+        entry["self_ms"] += max(0.0, e["dur"] - child_time.get(e["args"]["span_id"], 0)) / 1000
+
+    stages = sorted(
+        ({"name": name, **{k: round(v, 2) if isinstance(v, float) else v for k, v in entry.items()}}
+         for name, entry in by_name.items()),
+        key=lambda s: s["self_ms"],
+        reverse=True
+    )
+    return {**data["metadata"], "stages": stages, "trace_file": str(path)}
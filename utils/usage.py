@@ -0,0 +1,279 @@
+"""
+Token and cost accounting for LLM and embedding calls.
+
+Every call is attributed to the current tool, resource and session (set per
+tool call by the `tool_scope` hook) and appended to an event log under the
+state directory. Per-session running totals are kept next to it so budgets
+can be checked cheaply before each call.
+
+Budgets (0 = unlimited):
+    SESSION_TOKEN_BUDGET   LLM tokens (prompt + completion) per session
+    SESSION_EMBED_BUDGET   Embedding inputs per session
+Once a session passes BUDGET_DEGRADE_AT (fraction) of its LLM budget, calls
+switch to CHEAP_MODEL with prompts trimmed to DEGRADED_MAX_PROMPT_CHARS;
+at 100% calls fail with BudgetExceeded.
+
+The session comes from ANALYZER_SESSION (set by the app per browser session,
+since every stdio connection is a new server process), else the MCP session.
+Several server processes can share a session, so session totals are updated
+under a cross-process lock.
+
+When events.jsonl passes USAGE_EVENTS_MAX_BYTES (default 20 MB) it is
+compacted into rollup.json: per-hour totals for each tool, resource,
+session, model and kind, which is everything `summary` groups or filters by.
+"""
+
+import contextvars
+import json
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from utils.state import locked, read_json, state_dir, update_json
+
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "0"))
+SESSION_EMBED_BUDGET = int(os.getenv("SESSION_EMBED_BUDGET", "0"))
+BUDGET_DEGRADE_AT = float(os.getenv("BUDGET_DEGRADE_AT", "0.8"))
+CHEAP_MODEL = os.getenv("CHEAP_MODEL", "llama-3.1-8b-instant")
+DEGRADED_MAX_PROMPT_CHARS = int(os.getenv("DEGRADED_MAX_PROMPT_CHARS", "12000"))
+CHARS_PER_TOKEN = 4
+EVENTS_MAX_BYTES = int(os.getenv("USAGE_EVENTS_MAX_BYTES", str(20 * 1024 * 1024)))
+_GROUP_FIELDS = ("tool", "resource", "session", "model", "kind")
+_COUNTERS = ("prompt_tokens", "completion_tokens", "inputs", "embed_tokens")
+
+_RESOURCE_ARGS = ("pdf_path", "video_url", "url", "seed_url", "txt_path", "source", "playlist_url")
+
+_scope = contextvars.ContextVar("usage_scope", default=None)
+
+
+class BudgetExceeded(Exception):
+    """Raised when a session has used up its token or embedding budget."""
+
+
+def _usage_dir():
+    return state_dir("usage")
+
+
+def _events_path():
+    return _usage_dir() / "events.jsonl"
+
+
+def _rollup_path():
+    return _usage_dir() / "rollup.json"
+
+
+def _session_path(session: str):
+    safe = "".join(c for c in session if c.isalnum() or c in "-_")[:64] or "default"
+    return _usage_dir() / f"session_{safe}.json"
+
+
+def current_scope() -> dict:
+    return _scope.get() or {
+        "tool": os.getenv("ANALYZER_TOOL", "cli"),
+        "resource": None,
+        "session": os.getenv("ANALYZER_SESSION", "default")
+    }
+
+
+def _resource_from(kwargs: dict) -> str | None:
+    info = kwargs.get("pdf_info")
+    if isinstance(info, dict):
+        return info.get("namespace") or info.get("txt_path") or info.get("pdf_path")
+    for arg in _RESOURCE_ARGS:
+        if kwargs.get(arg):
+            return str(kwargs[arg])
+    return None
+
+
+@contextmanager
+def scope(tool: str, resource: str | None = None, session: str | None = None):
+    """Attributes every call made inside the block to tool/resource/session."""
+    token = _scope.set({
+        "tool": tool,
+        "resource": resource,
+        "session": session or os.getenv("ANALYZER_SESSION", "default")
+    })
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def tool_scope(tool_name: str, kwargs: dict):
+    """Tool hook: sets the usage scope from the tool name and its arguments."""
+    session = os.getenv("ANALYZER_SESSION")
+    if not session:
+        ctx = kwargs.get("ctx")
+        try:
+            session = ctx.session_id if ctx is not None else None
+        except Exception:
+            session = None
+    return scope(tool_name, _resource_from(kwargs), session or "default")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _record(kind: str, model: str, **amounts) -> None:
+    scope_ = current_scope()
+    event = {"ts": time.time(), "kind": kind, "model": model, **scope_, **amounts}
+
+    with locked(_events_path()):
+        with open(_events_path(), "a", encoding="utf-8") as f:
+            f.write(json.dumps(event) + "\n")
+            oversized = f.tell() > EVENTS_MAX_BYTES
+        if oversized:
+            compact_events()
+
+    default = {"session": scope_["session"], "llm_tokens": 0, "embed_inputs": 0, "embed_tokens": 0}
+    with update_json(_session_path(scope_["session"]), default) as totals:
+        totals["llm_tokens"] += amounts.get("prompt_tokens", 0) + amounts.get("completion_tokens", 0)
+        totals["embed_inputs"] += amounts.get("inputs", 0)
+        totals["embed_tokens"] += amounts.get("embed_tokens", 0)
+        totals["updated_at"] = event["ts"]
+
+
+def _events():
+    """Events of the live log (skipping torn lines)."""
+    if not _events_path().exists():
+        return
+    with open(_events_path(), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def compact_events() -> int:
+    """
+    Folds events.jsonl into the hourly totals of rollup.json and empties it.
+    Returns the number of events folded.
+    """
+    with locked(_events_path()):
+        folded = 0
+        with update_json(_rollup_path(), {}) as rollup:
+            for e in _events():
+                hour = int(e.get("ts", 0) // 3600 * 3600)
+                key = json.dumps([hour] + [e.get(field) for field in _GROUP_FIELDS])
+                row = rollup.setdefault(key, {"hour": hour, **{f: e.get(f) for f in _GROUP_FIELDS}, "calls": 0})
+                row["calls"] += 1
+                for counter in _COUNTERS:
+                    row[counter] = row.get(counter, 0) + e.get(counter, 0)
+                folded += 1
+        open(_events_path(), "w").close()
+    return folded
+
+
+def record_llm(model: str, prompt_tokens: int, completion_tokens: int, estimated: bool = False) -> None:
+    _record("llm", model, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, estimated=estimated)
+
+
+def record_embedding(model: str, inputs: int, embed_tokens: int = 0) -> None:
+    _record("embedding", model, inputs=inputs, embed_tokens=embed_tokens)
+
+
+def embedding_tokens(response) -> int:
+    """Token count reported by a Pinecone embed response (0 if absent)."""
+    u = getattr(response, "usage", None)
+    if isinstance(u, dict):
+        return u.get("total_tokens", 0) or 0
+    return getattr(u, "total_tokens", 0) or 0
+
+
+def session_totals(session: str | None = None) -> dict:
+    session = session or current_scope()["session"]
+    return read_json(_session_path(session), {"session": session, "llm_tokens": 0, "embed_inputs": 0, "embed_tokens": 0})
+
+
+def plan_llm_call(model: str, prompt: str) -> tuple[str, str, bool]:
+    """
+    Applies the session's LLM budget before a call.
+
+    Returns:
+        tuple[str, str, bool]: (model, prompt, degraded) to actually use
+
+    Raises:
+        BudgetExceeded: the session has no LLM budget left
+    """
+    if not SESSION_TOKEN_BUDGET:
+        return model, prompt, False
+
+    used = session_totals()["llm_tokens"]
+    if used >= SESSION_TOKEN_BUDGET:
+        raise BudgetExceeded(f"LLM token budget exhausted ({used}/{SESSION_TOKEN_BUDGET} tokens)")
+
+    if used >= BUDGET_DEGRADE_AT * SESSION_TOKEN_BUDGET:
+        if len(prompt) > DEGRADED_MAX_PROMPT_CHARS:
+            # Keep the start (instructions/context) and the end (the question)
+            head = int(DEGRADED_MAX_PROMPT_CHARS * 0.8)
+            tail = DEGRADED_MAX_PROMPT_CHARS - head
+            prompt = prompt[:head] + "\n...\n" + prompt[-tail:]
+        return CHEAP_MODEL, prompt, True
+
+    return model, prompt, False
+
+
+def check_embedding_budget(inputs: int) -> None:
+    """Raises BudgetExceeded if embedding `inputs` more texts would pass the budget."""
+    if not SESSION_EMBED_BUDGET:
+        return
+    used = session_totals()["embed_inputs"]
+    if used + inputs > SESSION_EMBED_BUDGET:
+        raise BudgetExceeded(f"Embedding budget exhausted ({used}+{inputs}/{SESSION_EMBED_BUDGET} inputs)")
+
+
+def summary(group_by: str = "tool", session: str | None = None, since: float = 0) -> dict:
+    """
+    Aggregates the event log.
+
+    Args:
+        group_by (str): "tool", "resource", "session" or "model"
+        session (str | None): Only count this session
+        since (float): Only count events after this UNIX timestamp
+
+    Returns:
+        dict: Totals per group and overall
+    """
+    groups = defaultdict(lambda: {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0,
+                                  "embed_calls": 0, "embed_inputs": 0, "embed_tokens": 0})
+
+    def add(e: dict, calls: int) -> None:
+        g = groups[str(e.get(group_by))]
+        if e["kind"] == "llm":
+            g["llm_calls"] += calls
+            g["prompt_tokens"] += e.get("prompt_tokens", 0)
+            g["completion_tokens"] += e.get("completion_tokens", 0)
+        else:
+            g["embed_calls"] += calls
+            g["embed_inputs"] += e.get("inputs", 0)
+            g["embed_tokens"] += e.get("embed_tokens", 0)
+
+    # Compacted history has hourly resolution: an hour counts if it ends after `since`
+    for row in read_json(_rollup_path(), {}).values():
+        if (session and row.get("session") != session) or row["hour"] + 3600 <= since:
+            continue
+        add(row, row["calls"])
+    for e in _events():
+        if (session and e.get("session") != session) or e.get("ts", 0) < since:
+            continue
+        add(e, 1)
+
+    total = defaultdict(int)
+    for g in groups.values():
+        for k, v in g.items():
+            total[k] += v
+
+    return {
+        "group_by": group_by,
+        "groups": dict(groups),
+        "total": dict(total),
+        "budgets": {
+            "session_token_budget": SESSION_TOKEN_BUDGET,
+            "session_embed_budget": SESSION_EMBED_BUDGET,
+            "degrade_at": BUDGET_DEGRADE_AT,
+            "cheap_model": CHEAP_MODEL
+        }
+    }